@@ -18,6 +18,85 @@ if __name__ == "__main__" or "main" in str(os.sys.modules.get('__main__', '')):
 
 OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+# Кілька серверів OLLAMA: "url[|вага[|модель]]" через кому (якщо порожньо - тільки OLLAMA_API_URL)
+OLLAMA_API_URLS = os.getenv("OLLAMA_API_URLS", "")
+# Інтервал активної перевірки здоров'я endpoint-ів (секунди, 0 - вимкнено)
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", 15))
+# Пул HTTP з'єднань до OLLAMA (одна сесія на endpoint, keep-alive між запитами)
+OLLAMA_CONNECTION_LIMIT = int(os.getenv("OLLAMA_CONNECTION_LIMIT", 16))
+OLLAMA_KEEPALIVE_TIMEOUT = float(os.getenv("OLLAMA_KEEPALIVE_TIMEOUT", 75))
+# Черга генерацій: скільки генерацій OLLAMA виконується одночасно
+# та скільки секунд запит може чекати в черзі, перш ніж отримає детерміновану відповідь
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", 2))
+OLLAMA_QUEUE_WAIT_BUDGET = float(os.getenv("OLLAMA_QUEUE_WAIT_BUDGET", 20))
+# Скільки HTTP-спроб до OLLAMA дозволено на одне питання (разом з регенераціями)
+OLLAMA_RETRY_BUDGET = int(os.getenv("OLLAMA_RETRY_BUDGET", 4))
+# Circuit breaker: кількість помилок поспіль до розмикання та пауза перед пробним запитом
+OLLAMA_BREAKER_THRESHOLD = int(os.getenv("OLLAMA_BREAKER_THRESHOLD", 5))
+OLLAMA_BREAKER_RECOVERY = float(os.getenv("OLLAMA_BREAKER_RECOVERY", 30))
+# Скільки OLLAMA тримає модель у пам'яті після останнього запиту (формат OLLAMA: "30m", "1h", "-1")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Робочі години (год. початку-кінця), коли планувальник тримає модель завантаженою
+OLLAMA_WARM_HOURS = os.getenv("OLLAMA_WARM_HOURS", "7-22")
+# Інтервал (хвилини) між пінгами keep-warm
+OLLAMA_KEEP_WARM_INTERVAL = int(os.getenv("OLLAMA_KEEP_WARM_INTERVAL", 10))
+# Паралельна генерація кандидатів: all - чекати всіх, race - перший хороший перемагає,
+# hedged - наступний кандидат запускається лише якщо попередній не встиг за перцентиль затримки
+OLLAMA_PARALLEL_MODE = os.getenv("OLLAMA_PARALLEL_MODE", "race")
+# Мінімальна оцінка кандидата (0..1), щоб завершити перегони достроково
+OLLAMA_RACE_SCORE_THRESHOLD = float(os.getenv("OLLAMA_RACE_SCORE_THRESHOLD", 0.6))
+# Перцентиль часу генерації, після якого запускається hedged-кандидат
+OLLAMA_HEDGE_PERCENTILE = float(os.getenv("OLLAMA_HEDGE_PERCENTILE", 90))
+# Streaming відповідей у Telegram: плейсхолдер "Думаю..." редагується по мірі генерації
+STREAMING_ANSWERS = os.getenv("STREAMING_ANSWERS", "true").lower() in ("1", "true", "yes")
+# Мінімальний інтервал між редагуваннями повідомлення (ліміти Telegram на edit_text)
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", 1.5))
+# Скільки найповільніших запитів з повною розбивкою за етапами зберігати для адмінів
+TRACE_SLOWEST_N = int(os.getenv("TRACE_SLOWEST_N", 20))
+# load_duration (секунди), з якого вважаємо, що OLLAMA перезавантажила модель у пам'ять
+OLLAMA_RELOAD_THRESHOLD = float(os.getenv("OLLAMA_RELOAD_THRESHOLD", 1.0))
+# Ліміт пам'яті точного кешу відповідей у байтах (LRU-витіснення за розміром записів)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+# Ліміт пам'яті семантичного кешу в байтах (пошук через інвертований індекс, не лінійний)
+SEMANTIC_CACHE_MAX_BYTES = int(os.getenv("SEMANTIC_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+# Час життя записів кешів відповідей (години); зміна вартості навчання інвалідує їх за тегами
+CACHE_TTL_HOURS = float(os.getenv("CACHE_TTL_HOURS", 24))
+# Файл SQLite постійного рівня кешу (у змонтованому томі); порожнє значення вимикає рівень
+PERSISTENT_CACHE_PATH = os.getenv("PERSISTENT_CACHE_PATH", "data/response_cache.sqlite3")
+# Час життя записів постійного кешу (години); зміна бази знань інвалідує їх одразу
+PERSISTENT_CACHE_TTL_HOURS = float(os.getenv("PERSISTENT_CACHE_TTL_HOURS", 168))
+# Скільки записів постійного кешу тримати в пам'яті (решта лише на диску)
+PERSISTENT_CACHE_MAX_ENTRIES = int(os.getenv("PERSISTENT_CACHE_MAX_ENTRIES", 5000))
+# Інтервал відкладеного запису нових записів на диск (секунди)
+PERSISTENT_CACHE_FLUSH_INTERVAL = float(os.getenv("PERSISTENT_CACHE_FLUSH_INTERVAL", 5.0))
+# Спільний кеш відповідей у PostgreSQL для кількох реплік бота
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Час життя записів спільного кешу (години)
+SHARED_CACHE_TTL_HOURS = float(os.getenv("SHARED_CACHE_TTL_HOURS", 24))
+# Максимальне очікування відповіді БД при пошуку в спільному кеші (секунди)
+SHARED_CACHE_TIMEOUT = float(os.getenv("SHARED_CACHE_TIMEOUT", 0.2))
+# Як часто (секунди) репліка читає журнал інвалідацій інших реплік у PostgreSQL (0 - вимкнено)
+CACHE_INVALIDATION_POLL_INTERVAL = float(os.getenv("CACHE_INVALIDATION_POLL_INTERVAL", 10))
+# Прогрів кешу популярними питаннями з message_history: вікно (дні), кількість питань
+# та мінімальна кількість повторів питання
+CACHE_WARM_DAYS = int(os.getenv("CACHE_WARM_DAYS", 7))
+CACHE_WARM_LIMIT = int(os.getenv("CACHE_WARM_LIMIT", 50))
+CACHE_WARM_MIN_COUNT = int(os.getenv("CACHE_WARM_MIN_COUNT", 2))
+# Година щоденного прогріву кешу планувальником (поза піком); -1 вимикає
+CACHE_WARM_HOUR = int(os.getenv("CACHE_WARM_HOUR", 6))
+# Прогрівати кеш при старті бота (у фоні, після прогріву моделі)
+CACHE_WARM_ON_STARTUP = os.getenv("CACHE_WARM_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+# Пошук уривків бази знань (BM25): скільки уривків і скільки токенів контексту додавати в промпт
+PASSAGE_TOP_K = int(os.getenv("PASSAGE_TOP_K", 4))
+PASSAGE_TOKEN_BUDGET = int(os.getenv("PASSAGE_TOKEN_BUDGET", 350))
+# Необов'язковий embedding-пошук уривків (потрібен numpy і індекс: python main.py build_embeddings)
+# Каталог індексу (vectors.npy + manifest.json), модель embeddings в OLLAMA ("hashing" - локальні
+# детерміновані вектори без OLLAMA, для перевірки),
+# мінімальна косинусна подібність уривка та ліміт часу на вектор запиту (секунди)
+EMBEDDING_INDEX_DIR = os.getenv("EMBEDDING_INDEX_DIR", "data/embeddings")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+EMBEDDING_MIN_SCORE = float(os.getenv("EMBEDDING_MIN_SCORE", 0.5))
+EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", 0.5))
 
 DB_CONFIG = {
     "host": os.getenv("DB_HOST", "localhost"),
@@ -29,5 +108,6 @@ DB_CONFIG = {
 
 BOT_NAME = "Інтелектуальний помічник абітурієнта ХДУ"
 UNIVERSITY_NAME = "Херсонський державний університет (ХДУ)"
-RESPONSE_TIMEOUT = 2
+# Кінцевий дедлайн (секунди) на відповідь одному користувачу, включно з усіма регенераціями
+RESPONSE_TIMEOUT = float(os.getenv("RESPONSE_TIMEOUT", 90))
 
@@ -174,6 +174,38 @@ class Database:
                 )
             """)
 
+            # Спільний кеш відповідей AI для всіх реплік бота.
+            # UNLOGGED: без WAL запис дешевший, а втрата вмісту після збою - лише холодний кеш
+            await conn.execute("""
+                CREATE UNLOGGED TABLE IF NOT EXISTS answer_cache (
+                    cache_key VARCHAR(64) PRIMARY KEY,
+                    knowledge_version VARCHAR(32) NOT NULL,
+                    query TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    question_type VARCHAR(50),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    expires_at TIMESTAMP NOT NULL,
+                    hit_count INTEGER DEFAULT 0,
+                    last_hit_at TIMESTAMP,
+                    tags TEXT[] NOT NULL DEFAULT '{}'
+                )
+            """)
+            
+            # Теги залежностей (для існуючих таблиць)
+            await conn.execute("""
+                ALTER TABLE answer_cache ADD COLUMN IF NOT EXISTS tags TEXT[] NOT NULL DEFAULT '{}'
+            """)
+            
+            # Журнал інвалідацій кешу відповідей: кожна репліка застосовує нові записи
+            # до своїх локальних рівнів кешу (пам'ять, SQLite)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS answer_cache_invalidations (
+                    id BIGSERIAL PRIMARY KEY,
+                    tags TEXT[] NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
             # Створюємо індекси для оптимізації запитів
             await self.create_indexes(conn)
             
@@ -283,6 +315,18 @@ class Database:
                 ON admin_settings(admin_id)
             """)
             
+            # Індекс для очищення простроченого кешу відповідей
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_answer_cache_expires_at 
+                ON answer_cache(expires_at)
+            """)
+            
+            # Індекс для інвалідації кешу відповідей за тегами
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_answer_cache_tags 
+                ON answer_cache USING GIN (tags)
+            """)
+            
             print("✅ Індекси створено/перевірено")
         except Exception as e:
             print(f"⚠️ Помилка створення індексів: {e}")
@@ -395,6 +439,29 @@ class Database:
                 LIMIT $2
             """, telegram_id, limit)
 
+    async def get_top_questions(self, days: int = 7, limit: int = 50, min_count: int = 2):
+        """
+        Найчастіші питання за останні дні (нормалізовані: нижній регістр, без зайвих пробілів)
+        Службові записи кнопок ("Вибір факультету: ...", "Перегляд факультетів") не враховуються
+        """
+        if not self.pool:
+            return []
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT
+                    LOWER(TRIM(REGEXP_REPLACE(user_message, '\\s+', ' ', 'g'))) AS question,
+                    COUNT(*) AS asked
+                FROM message_history
+                WHERE created_at > CURRENT_TIMESTAMP - $1 * INTERVAL '1 day'
+                AND user_message NOT LIKE 'Вибір %'
+                AND user_message != 'Перегляд факультетів'
+                GROUP BY 1
+                HAVING COUNT(*) >= $3
+                ORDER BY asked DESC
+                LIMIT $2
+            """, days, limit, min_count)
+            return [dict(row) for row in rows]
+
     async def save_feedback(self, user_id: int, message_history_id: int, feedback_type: str):
         if not self.pool:
             return
@@ -1102,6 +1169,85 @@ class Database:
             """, f"%{specialty_name}%")
             return [dict(row) for row in rows]
 
+    async def get_cached_answer(self, cache_key: str, knowledge_version: str):
+        """Відповідь зі спільного кешу (з підрахунком влучань) або None"""
+        if not self.pool:
+            return None
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval("""
+                UPDATE answer_cache
+                SET hit_count = hit_count + 1, last_hit_at = CURRENT_TIMESTAMP
+                WHERE cache_key = $1
+                AND knowledge_version = $2
+                AND expires_at > CURRENT_TIMESTAMP
+                RETURNING response
+            """, cache_key, knowledge_version)
+
+    async def set_cached_answer(self, cache_key: str, knowledge_version: str, query: str,
+                                response: str, question_type: str = None, ttl_seconds: int = 86400,
+                                tags: list = None):
+        """Збереження відповіді в спільний кеш (перезаписує запис з тим самим ключем)"""
+        if not self.pool:
+            return
+        async with self.pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO answer_cache
+                    (cache_key, knowledge_version, query, response, question_type, expires_at, tags)
+                VALUES ($1, $2, $3, $4, $5, CURRENT_TIMESTAMP + $6 * INTERVAL '1 second', $7)
+                ON CONFLICT (cache_key)
+                DO UPDATE SET
+                    knowledge_version = EXCLUDED.knowledge_version,
+                    query = EXCLUDED.query,
+                    response = EXCLUDED.response,
+                    question_type = EXCLUDED.question_type,
+                    created_at = CURRENT_TIMESTAMP,
+                    expires_at = EXCLUDED.expires_at,
+                    tags = EXCLUDED.tags
+            """, cache_key, knowledge_version, query, response, question_type, ttl_seconds,
+                list(tags or []))
+
+    async def invalidate_cached_answers(self, tags: list) -> int:
+        """
+        Видалення відповідей спільного кешу з будь-яким із тегів та запис у журнал
+        інвалідацій для інших реплік; повертає кількість видалених відповідей
+        """
+        if not self.pool or not tags:
+            return 0
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                result = await conn.execute(
+                    "DELETE FROM answer_cache WHERE tags && $1::text[]", list(tags)
+                )
+                await conn.execute(
+                    "INSERT INTO answer_cache_invalidations (tags) VALUES ($1)", list(tags)
+                )
+                # Журнал потрібен лише на час життя записів кешу
+                await conn.execute("""
+                    DELETE FROM answer_cache_invalidations
+                    WHERE created_at < CURRENT_TIMESTAMP - INTERVAL '30 days'
+                """)
+        return int(result.split()[-1])
+
+    async def get_cache_invalidations(self, after_id: int = None, since_seconds: int = 0):
+        """
+        Записи журналу інвалідацій (id, tags): новіші за after_id або, якщо after_id
+        невідомий (щойно запущена репліка), - за останні since_seconds
+        """
+        if not self.pool:
+            return []
+        async with self.pool.acquire() as conn:
+            if after_id is None:
+                return await conn.fetch("""
+                    SELECT id, tags FROM answer_cache_invalidations
+                    WHERE created_at > CURRENT_TIMESTAMP - $1 * INTERVAL '1 second'
+                    ORDER BY id
+                """, since_seconds)
+            return await conn.fetch("""
+                SELECT id, tags FROM answer_cache_invalidations
+                WHERE id > $1
+                ORDER BY id
+            """, after_id)
+
     async def cleanup_old_data(self, days_to_keep: int = 90):
         """Очищення старих даних для зменшення розміру БД"""
         if not self.pool:
@@ -1143,6 +1289,9 @@ class Database:
                     AND created_at < CURRENT_TIMESTAMP - INTERVAL $1 || ' days'
                 """, days_param)
                 
+                # Прострочені записи спільного кешу відповідей
+                await conn.execute("DELETE FROM answer_cache WHERE expires_at <= CURRENT_TIMESTAMP")
+                
                 # Виконуємо VACUUM для оптимізації БД
                 await conn.execute("VACUUM ANALYZE")
                 
@@ -1181,6 +1181,13 @@ async def tuition_delete_handler(callback: CallbackQuery, state: FSMContext):
         success = await db.delete_tuition_price(price_id)
         
         if success:
+            # Кешовані відповіді AI з видаленою вартістю (без даних запису - усі про вартість)
+            from ollama_client import ollama
+            if price:
+                await ollama.invalidate_tuition(price.get('specialty_name'), price.get('specialty_code'))
+            else:
+                await ollama.invalidate_tuition()
+            
             await callback.answer("✅ Вартість видалено")
             
             # Отримуємо дані зі стану для повернення до спеціальності
@@ -1310,6 +1317,9 @@ async def tuition_delete_all_handler(callback: CallbackQuery):
         success = await db.delete_all_tuition_prices()
         
         if success:
+            from ollama_client import ollama
+            await ollama.invalidate_tuition()
+            
             await callback.message.edit_text(
                 "✅ <b>Всі вартості успішно видалено!</b>\n\n"
                 "База даних очищена.",
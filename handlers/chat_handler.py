@@ -3,6 +3,7 @@
 """
 from aiogram import Router, F
 from aiogram.types import Message
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
 from database import db
 from ollama_client import ollama
 from knowledge_base import (
@@ -20,8 +21,15 @@ from keyboards import (
     get_quick_actions_keyboard, get_faculties_keyboard
 )
 from services.response_service import ResponseService
+from services.answer_engine import (
+    answer_engine, StructuredAnswer,
+    KEYBOARD_FACULTIES, KEYBOARD_SPECIALTIES, KEYBOARD_TUITION_BACK,
+)
 from utils.message_parser import MessageParser
+from utils.intent_matcher import intent_matcher
+from utils.intent_taxonomy import emotion_intent
 from handlers.utils import _agent_log, _format_admission_2026, _check_and_fix_forbidden_universities, _convert_markdown_to_html
+from config import STREAMING_ANSWERS, STREAM_EDIT_INTERVAL
 from datetime import datetime
 import asyncio
 import logging
@@ -37,6 +45,84 @@ router = Router()
 response_service = ResponseService()
 message_parser = MessageParser()
 
+# Ліміт Telegram на довжину повідомлення під час streaming (без HTML)
+STREAM_PREVIEW_LIMIT = 4000
+
+
+async def _stream_to_message(bot_message: Message, user_message: str, context_list: list) -> str:
+    """
+    Streaming відповіді OLLAMA у плейсхолдер з обмеженням частоти редагувань
+    
+    Проміжні редагування - простий текст (HTML може бути ще незакритим).
+    Фінальне форматування та клавіатура застосовуються викликачем один раз.
+    
+    Returns:
+        Повна згенерована відповідь
+    """
+    chunks = []
+    # Перший непорожній шматок показується одразу, наступні редагування - не частіше за інтервал
+    last_edit = 0.0
+    last_preview = ""
+    
+    async for chunk in ollama.generate_response_stream(user_message, context_list):
+        chunks.append(chunk)
+        now = time.monotonic()
+        if now - last_edit < STREAM_EDIT_INTERVAL:
+            continue
+        
+        preview = "".join(chunks).strip()
+        if len(preview) > STREAM_PREVIEW_LIMIT:
+            preview = preview[:STREAM_PREVIEW_LIMIT] + "…"
+        if not preview or preview == last_preview:
+            continue
+        
+        try:
+            await bot_message.edit_text(f"{preview} ▌")
+            last_preview = preview
+        except TelegramRetryAfter as e:
+            # Telegram просить зачекати - пропускаємо проміжні редагування до кінця паузи
+            last_edit = now + e.retry_after
+            continue
+        except TelegramBadRequest as e:
+            if "not modified" not in str(e).lower():
+                logger.debug(f"Не вдалося оновити streaming повідомлення: {e}")
+        last_edit = now
+    
+    return "".join(chunks)
+
+
+async def _send_structured_answer(message: Message, user_message: str, answer: StructuredAnswer):
+    """Надсилання шаблонної відповіді AnswerEngine з відповідною клавіатурою"""
+    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+    from keyboards import get_specialties_keyboard
+    
+    message_history_id = await db.save_message_history(message.from_user.id, user_message, answer.text)
+    
+    if answer.keyboard == KEYBOARD_FACULTIES:
+        reply_markup = get_faculties_keyboard(report_id=message_history_id)
+    elif answer.keyboard == KEYBOARD_SPECIALTIES:
+        reply_markup = get_specialties_keyboard(answer.faculty_id, report_id=message_history_id)
+    elif answer.keyboard == KEYBOARD_TUITION_BACK:
+        # Повернення до спеціальностей факультету (якщо визначено) або до факультетів
+        if answer.faculty_id:
+            buttons = [[InlineKeyboardButton(
+                text="⬅️ Повернутись до спеціальностей",
+                callback_data=f"faculty_{answer.faculty_id.split('_')[1]}"
+            )]]
+        else:
+            buttons = [[InlineKeyboardButton(
+                text="⬅️ Повернутись до факультетів",
+                callback_data="back_to_faculties"
+            )]]
+        feedback_kb = get_feedback_keyboard(message_history_id)
+        if feedback_kb and feedback_kb.inline_keyboard:
+            buttons.extend(feedback_kb.inline_keyboard)
+        reply_markup = InlineKeyboardMarkup(inline_keyboard=buttons)
+    else:
+        reply_markup = get_feedback_keyboard(message_history_id) if message_history_id else None
+    
+    await message.answer(answer.display_text, reply_markup=reply_markup, parse_mode="HTML")
+
 
 @router.message()
 async def chat_handler(message: Message):
@@ -108,13 +194,6 @@ async def chat_handler(message: Message):
     if user_message in menu_buttons:
         return
     
-    # Обробка привітань та простих фраз
-    greetings = ["привіт", "вітаю", "добрий день", "доброго дня", "добрий вечір", 
-                "доброго вечора", "доброго ранку", "добрий ранок", "hello", "hi"]
-    
-    # Обробка питань про стан справ
-    how_are_you = ["як справи", "як справи?", "як ти", "як поживаєш", "що нового"]
-    
     # Обробка емоційних повідомлень
     emotional_phrases = {
         "переживаю": "Розумію, що вступ може викликати хвилювання 😔\n\nАле не хвилюйся! Я допоможу тобі з усім необхідним. Задай питання про документи, спеціальності або вступну кампанію - разом все зробимо! 💪",
@@ -126,10 +205,12 @@ async def chat_handler(message: Message):
         "погано": "Шкода, що у тебе погано 😔\n\nЯкщо хочеш поговорити про вступ до ХДУ або маєш питання - я тут, щоб допомогти! 💙",
     }
     
-    user_lower = user_message.lower().strip()
+    # Привітання, питання про стан справ та емоції - один прохід автомата намірів
+    # (ключові фрази - в utils/intent_taxonomy.CHAT_INTENTS та EMOTIONS)
+    intents = intent_matcher.intents(user_message)
     
     # Перевірка привітань
-    if any(greeting in user_lower for greeting in greetings):
+    if "chat.greeting" in intents:
         await message.answer(
             "Привіт! 👋\n\nЧим можу допомогти з вступом до ХДУ? "
             "Можу відповісти на питання про документи, спеціальності, вступну кампанію та інше.",
@@ -138,7 +219,7 @@ async def chat_handler(message: Message):
         return
     
     # Перевірка питань про стан справ
-    if any(phrase in user_lower for phrase in how_are_you):
+    if "chat.how_are_you" in intents:
         await message.answer(
             "Дякую, все добре! 😊\n\nГотовий допомогти тобі з вступом до ХДУ. "
             "Задай питання про документи, спеціальності, вступну кампанію або інше! 📚",
@@ -148,402 +229,32 @@ async def chat_handler(message: Message):
     
     # Перевірка емоційних повідомлень
     for emotion, response in emotional_phrases.items():
-        if emotion in user_lower:
+        if emotion_intent(emotion) in intents:
             await message.answer(response, reply_markup=get_main_menu(user_id=message.from_user.id))
             return
     
-    # ВСІ питання обробляються через OLLAMA - вона сама розпізнає галузі та формує відповіді
-    # Жодної жорсткої логіки розпізнавання - OLLAMA використовує покращений промпт для самостійного розпізнавання
-    
-    # Отримуємо текст повідомлення (якщо ще не визначено)
-    if not user_message:
-        user_message = message.text or ""
-    user_message_lower = user_message.lower()
-    
-    # Перевірка на питання про документи - якщо так, використовуємо правильний список
-    # Уникаємо хибних спрацьовувань на слово "подача" без згадки документів
-    document_keywords = [
-        'документ', 'документи', 'які документи', 'список документів',
-        'потрібні документи', 'що потрібно для вступу'
-    ]
-    is_document_question = any(word in user_message_lower for word in document_keywords)
-    
-    if is_document_question:
-        # Використовуємо правильний список документів з бази знань
-        from knowledge_base import get_documents_text
-        response = get_documents_text()
-        # Конвертуємо markdown в HTML
-        response = _convert_markdown_to_html(response)
-        
-        # Зберігаємо в історію
-        message_history_id = await db.save_message_history(message.from_user.id, user_message, response)
-        
-        # Inline-кнопка для звіту про помилку
-        reply_markup = get_feedback_keyboard(message_history_id) if message_history_id else None
-        
-        # Відправляємо відповідь
-        await message.answer(
-            f"💬 Відповідь:\n\n{response}",
-            reply_markup=reply_markup,
-            parse_mode="HTML"
-        )
-        return
-
-    # Спеціальна обробка для права: одразу відповідаємо, щоб уникнути OLLAMA-галюцинацій (121 тощо)
-    law_keywords = ['право', 'права', 'юрид', 'юриспруд', 'law']
-    if any(k in user_message_lower for k in law_keywords):
-        from tuition_helper import find_tuition_info
-        law_text = (
-            "<b>⚖️ Спеціальність Право (D8)</b>\n\n"
-            "• Рівні: бакалавр, магістр\n"
-            "• Форма: денна / заочна\n"
-            "• Факультет бізнесу і права\n"
-        )
-        tuition = await find_tuition_info(specialty_name="право")
-        if tuition and "немає даних" not in tuition.lower():
-            law_text += "\n" + tuition
-        law_text += (
-            f"\n\n{get_admissions_committee_phones()}\n"
-            "📍 м. Херсон, вул. Університетська, 27"
-        )
-        message_history_id = await db.save_message_history(message.from_user.id, user_message, law_text)
-        await message.answer(
-            law_text,
-            reply_markup=get_feedback_keyboard(message_history_id),
-            parse_mode="HTML"
-        )
-        return
-
-    # ШВИДКА ОБРОБКА ПИТАНЬ ПРО ВАРТІСТЬ (без OLLAMA) — перенесена вище, щоб не перехоплював блок факультетів
-    # Перевірка на питання про конкретну галузь → одразу показуємо відповідний факультет
-    def detect_faculty_by_keywords(text: str) -> str | None:
-        keyword_map = [
-            # Бізнес і право
-            ([
-                "бізнес", "бізнесу", "економ", "право", "права", "юрид", "юриспруд", "юрист", "адвокат",
-                "менедж", "фінанс", "банківсь", "страхуван", "підприємниц", "адмініструван", "маркетинг"
-            ], "faculty_7"),
-            # ІТ / програмування
-            ([
-                "іт", "айті", "айти", "програмув", "програмн", "програміст", "комп'ют", "компют",
-                "інформат", "сисадмін", "data", "дата", "штучний інтелект", "машинне навчання",
-                "f2", "f3", "f6", "121"
-            ], "faculty_8"),
-            # Медицина / здоров'я
-            ([
-                "медиц", "медичн", "медфак", "фармац", "терап", "реабіліт", "ерготерап", "здоров",
-                "фізична терап", "ерго", "медицина", "медик"
-            ], "faculty_3"),
-            # Природничі
-            ([
-                "біолог", "біо", "еколог", "географ", "гео", "хім", "фізик", "природнич", "астрон", "науки про землю"
-            ], "faculty_4"),
-            # Спорт
-            ([
-                "спорт", "спортив", "фізкульт", "фіз вих", "фізична культура", "фк", "олімп"
-            ], "faculty_5"),
-            # Педагогіка / освіта
-            ([
-                "педагог", "дошкіль", "початков", "логопед", "олігофрен", "середня освіта", "вчитель",
-                "учитель", "освіта", "методика", "педфак"
-            ], "faculty_6"),
-            # Психологія / соціальні
-            ([
-                "психолог", "соціолог", "істор", "соц", "суспільн", "соціальна робота", "археолог", "психологія"
-            ], "faculty_2"),
-            # Філологія / мистецтва / журналістика
-            ([
-                "філолог", "філфак", "журналіст", "журфак", "мистецт", "культурол", "музич", "хореограф",
-                "образотвор", "германськ", "мов", "іноземні мови", "переклад", "мовознав", "літератур"
-            ], "faculty_1"),
-        ]
-        for keywords, faculty_id in keyword_map:
-            if any(k in text for k in keywords):
-                return faculty_id
-        return None
-
-    # Перевірка на загальне питання про вартість БЕЗ конкретної спеціальності
-    # Це має бути ПЕРЕД перевіркою на конкретну спеціальність
-    tuition_keywords = ['вартість', 'ціна', 'скільки коштує', 'оплата', 'коштує навчання', 'вартості']
-    # Перевіряємо, чи це загальне питання про вартість (без конкретної спеціальності/факультету)
-    has_tuition_keyword = any(word in user_message_lower for word in tuition_keywords)
-    
-    # Список слів, які вказують на конкретну спеціальність/факультет
-    specific_keywords = [
-        'спеціальність', 'спеціальності', 'факультет', 'факультети', 
-        'логопед', 'психолог', 'право', 'медицина', 'іт', 'програмування',
-        'економіка', 'менеджмент', 'філолог', 'журналіст', 'біолог', 'хімія',
-        'фізика', 'географ', 'туризм', 'готель', 'фармац', 'терап', 'реабіліт'
-    ]
-    has_specific_reference = any(word in user_message_lower for word in specific_keywords)
-    
-    # Перевіряємо довжину питання (до 5 слів для більшої гнучкості)
-    word_count = len(user_message_lower.split())
-    is_short_question = word_count <= 5
-    
-    # Додаткова перевірка: якщо питання містить тільки слова про вартість + "навчання" - це загальне питання
-    is_general_tuition_only = (
-        has_tuition_keyword and
-        not has_specific_reference and
-        is_short_question
-    )
-    
-    # Логування для діагностики
-    import logging
-    logger = logging.getLogger(__name__)
-    logger.info(f"Перевірка загального питання про вартість: has_tuition={has_tuition_keyword}, has_specific={has_specific_reference}, is_short={is_short_question}, result={is_general_tuition_only}")
-    
-    if is_general_tuition_only:
-        # Для загальних питань про вартість - одразу показуємо факультети
-        from keyboards import get_faculties_keyboard
-        faculties_text = (
-            "💰 <b>Вартість навчання</b>\n\n"
-            "💡 <b>Обери факультет, щоб побачити спеціальності та їх вартість</b> 🎓"
-        )
-        
-        message_history_id = await db.save_message_history(message.from_user.id, user_message, faculties_text)
-        
-        await message.answer(
-            faculties_text,
-            reply_markup=get_faculties_keyboard(report_id=message_history_id),
-            parse_mode="HTML"
-        )
-        return
-    
-    # Перевірка на конкретну спеціальність - якщо знайдено, показуємо вартість
-    # Це має бути ПЕРЕД перевіркою на факультет, щоб конкретні запити про спеціальності оброблялись правильно
-    from tuition_helper import extract_specialty_from_message, find_tuition_info
-    specialty_name, specialty_code = extract_specialty_from_message(user_message)
-    
-    # Якщо знайдено конкретну спеціальність, показуємо вартість
-    if specialty_name or specialty_code:
-        tuition_info = await find_tuition_info(specialty_name=specialty_name, specialty_code=specialty_code)
-        
-        if tuition_info:
-            # Формуємо відповідь з вартістю
-            if specialty_name:
-                response_text = f"💰 <b>Вартість навчання</b>\n\n<b>📚 {specialty_name}</b>\n\n{tuition_info}"
-            else:
-                response_text = f"💰 <b>Вартість навчання</b>\n\n{tuition_info}"
-            
-            message_history_id = await db.save_message_history(message.from_user.id, user_message, response_text)
-            
-            # Додаємо кнопку для повернення до факультетів
-            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-            
-            buttons = []
-            # Визначаємо факультет для кнопки "Назад" використовуючи існуючу функцію
-            faculty_for_back = detect_faculty_by_keywords(user_message_lower)
-            if faculty_for_back:
-                buttons.append([InlineKeyboardButton(
-                    text="⬅️ Повернутись до спеціальностей",
-                    callback_data=f"faculty_{faculty_for_back.split('_')[1]}"
-                )])
-            else:
-                buttons.append([InlineKeyboardButton(
-                    text="⬅️ Повернутись до факультетів",
-                    callback_data="back_to_faculties"
-                )])
-            
-            # Додаємо кнопку feedback
-            feedback_kb = get_feedback_keyboard(message_history_id)
-            if feedback_kb and feedback_kb.inline_keyboard:
-                buttons.extend(feedback_kb.inline_keyboard)
-            
-            keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
-            
-            await message.answer(
-                response_text,
-                reply_markup=keyboard,
-                parse_mode="HTML"
-            )
-            return
-        # Якщо вартість не знайдена для конкретної спеціальності - продовжуємо обробку
+    # Контекст попередніх повідомлень (для "а на 121?" та для OLLAMA)
+    context = await db.get_recent_messages(message.from_user.id, limit=3)
+    if context is None:
+        context = []
     
-    # Перевірка на питання про факультет - ВСЕГДА показуємо кнопки зі спеціальностями
-    # Навіть якщо є слово "вартість" - показуємо кнопки, щоб користувач міг вибрати конкретну спеціальність
-    faculty_id_match = detect_faculty_by_keywords(user_message_lower)
-    if faculty_id_match:
-        from knowledge_base import get_faculty_header_only
-        from keyboards import get_specialties_keyboard
-        
-        # Отримуємо тільки заголовок факультету БЕЗ списку спеціальностей (бо є кнопки)
-        faculty_text = get_faculty_header_only(faculty_id_match)
-        
-        # Додаємо текст про те, що можна вибрати спеціальність
-        faculty_text += "\n\n💡 <b>Обери спеціальність, щоб побачити вартість навчання</b> 💰"
-
-        message_history_id = await db.save_message_history(message.from_user.id, user_message, faculty_text)
-
-        # Створюємо клавіатуру з кнопками спеціальностей
-        specialties_keyboard = get_specialties_keyboard(faculty_id_match, report_id=message_history_id)
-
-        await message.answer(
-            faculty_text,
-            reply_markup=specialties_keyboard,
-            parse_mode="HTML"
-        )
-        return
-
-    # Перевірка на питання про спеціальності (загальні, без конкретної галузі) - перенаправляємо на факультети
-    # Розширений список фраз для розпізнавання питань про спеціальності
-    specialty_keywords = [
-        'спеціальності', 'спеціальність', 'спеціальностей', 'спеціальностях',
-        'які є спеціальності', 'які спеціальності', 'список спеціальностей', 
-        'які спеціальності є', 'перелік спеціальностей', 'всі спеціальності',
-        'спеціальності в університеті', 'спеціальності в хду', 'спеціальності хду',
-        'які є спеціальності в хду', 'які спеціальності в університеті',
-        'покажи спеціальності', 'покажи мені спеціальності', 'хочу подивитися спеціальності',
-        'інформація про спеціальності', 'про спеціальності', 'що є за спеціальності'
-    ]
-    
-    # Перевіряємо, чи містить повідомлення ключові слова про спеціальності
-    is_general_specialty_question = any(keyword in user_message_lower for keyword in specialty_keywords)
-    
-    # Якщо це загальне питання про спеціальності (без конкретної галузі), показуємо факультети
-    if is_general_specialty_question:
-        # Перевіряємо, чи не це питання про конкретну галузь (медицина, ІТ, право тощо)
-        # Або про конкретну спеціальність (наприклад, "вартість спеціальності психологія")
-        specific_fields = ['медицина', 'іт', 'програмування', 'право', 'економіка', 
-                          'психологія', 'педагогіка', 'філологія', 'бізнес', 'спорт',
-                          'вартість', 'ціна', 'коштує', 'грн', 'гривень']
-        is_specific_field = any(field in user_message_lower for field in specific_fields)
-        
-        # Якщо не конкретна галузь і не питання про вартість - показуємо факультети
-        if not is_specific_field:
-            from keyboards import get_faculties_keyboard
-            # Показуємо тільки заголовок та підказку (без списку, бо є кнопки)
-            faculties_text = "📚 <b>Факультети ХДУ</b>\n\n💡 <b>Обери факультет, щоб побачити спеціальності</b> 🎓"
-
-            # Зберігаємо в історію і отримуємо id
-            message_history_id = await db.save_message_history(message.from_user.id, user_message, faculties_text)
-
-            # Відправляємо з inline-клавіатурою факультетів + кнопкою звіту
-            await message.answer(
-                faculties_text,
-                reply_markup=get_faculties_keyboard(report_id=message_history_id),
-                parse_mode="HTML"
-            )
-            return
-
-    # Перевірка на питання про факультети - відповідаємо одразу з клавіатурою
-    is_faculty_question = any(word in user_message_lower for word in [
-        'факультет', 'факультети', 'які є факультети', 'список факультетів'
-    ])
-
-    if is_faculty_question:
-        from keyboards import get_faculties_keyboard
-        # Показуємо тільки заголовок та підказку (без списку, бо є кнопки)
-        faculties_text = "📚 <b>Факультети ХДУ</b>\n\n💡 <b>Обери факультет, щоб побачити спеціальності</b> 🎓"
-
-        # Зберігаємо в історію і отримуємо id
-        message_history_id = await db.save_message_history(message.from_user.id, user_message, faculties_text)
-
-        # Відправляємо з inline-клавіатурою факультетів + кнопкою звіту
-        await message.answer(
-            faculties_text,
-            reply_markup=get_faculties_keyboard(report_id=message_history_id),
-            parse_mode="HTML"
-        )
-        return
-    
-    # ШВИДКА ОБРОБКА ПИТАНЬ ПРО ВАРТІСТЬ (без OLLAMA)
-    # Спочатку перевіряємо, чи це загальне питання про вартість БЕЗ конкретної спеціальності
-    tuition_keywords = ['вартість', 'ціна', 'скільки коштує', 'оплата', 'коштує навчання', 'тарифи', 'скільки коштує навчання', 'вартості']
-    has_tuition_keyword = any(k in user_message_lower for k in tuition_keywords)
-    
-    # Якщо це загальне питання про вартість - показуємо факультети
-    if has_tuition_keyword:
-        # Перевіряємо, чи це загальне питання (без конкретної спеціальності)
-        specific_keywords = [
-            'спеціальність', 'спеціальності', 'факультет', 'факультети', 
-            'логопед', 'психолог', 'право', 'медицина', 'іт', 'програмування',
-            'економіка', 'менеджмент', 'філолог', 'журналіст', 'біолог', 'хімія',
-            'фізика', 'географ', 'туризм', 'готель', 'фармац', 'терап', 'реабіліт'
-        ]
-        has_specific = any(word in user_message_lower for word in specific_keywords)
-        word_count = len(user_message_lower.split())
-        is_short = word_count <= 5
-        
-        if not has_specific and is_short:
-            # Загальне питання про вартість - показуємо факультети
-            from keyboards import get_faculties_keyboard
-            faculties_text = (
-                "💰 <b>Вартість навчання</b>\n\n"
-                "💡 <b>Обери факультет, щоб побачити спеціальності та їх вартість</b> 🎓"
-            )
-            
-            message_history_id = await db.save_message_history(message.from_user.id, user_message, faculties_text)
-            
-            await message.answer(
-                faculties_text,
-                reply_markup=get_faculties_keyboard(report_id=message_history_id),
-                parse_mode="HTML"
-            )
-            return
-    
-    # Якщо це питання про вартість з конкретною спеціальністю - обробляємо далі
-    if has_tuition_keyword:
-        from tuition_helper import find_tuition_info, extract_specialty_from_message
-        
-        specialty_name, specialty_code = extract_specialty_from_message(user_message)
-        
-        # Якщо не знайшли у поточному питанні — пробуємо з попередніх
-        if not specialty_name and not specialty_code:
-            context_prev = await db.get_recent_messages(message.from_user.id, limit=3)
-            if context_prev is None:
-                context_prev = []
-            for ctx in context_prev:
-                prev_user = (ctx["user_message"] or "")
-                sn, sc = extract_specialty_from_message(prev_user)
-                if sn or sc:
-                    specialty_name, specialty_code = sn, sc
-                    break
-        
-        # Нормалізуємо спеціальність (додаємо поширені відмінки)
-        if specialty_name and specialty_name.lower() == "соціологія":
-            specialty_name = "соціологія"
-        if specialty_name and specialty_name.lower() == "право":
-            specialty_name = "право"
-        
-        if specialty_name or specialty_code:
-            tuition_info = await find_tuition_info(specialty_name=specialty_name, specialty_code=specialty_code)
-            if tuition_info and "немає даних" not in tuition_info.lower():
-                response = f"💰 <b>Вартість навчання</b>\n\n{tuition_info}\n\n{get_admissions_committee_phones()}"
-            else:
-                response = f"На жаль, не знайшов точну вартість для цієї спеціальності.\n\n{get_admissions_committee_phones()}"
-        else:
-            response = f"Назви спеціальність або її код (наприклад, 121, F2, F3), щоб показати точну вартість навчання.\n\n{get_admissions_committee_phones()}"
-        
-        message_history_id = await db.save_message_history(message.from_user.id, user_message, response)
-        await message.answer(
-            response,
-            reply_markup=get_feedback_keyboard(message_history_id),
-            parse_mode="HTML"
-        )
+    # Питання, на які є повна відповідь у базі знань або tuition_prices - без OLLAMA
+    structured = await answer_engine.answer(user_message, context)
+    if structured is not None:
+        await _send_structured_answer(message, user_message, structured)
         return
 
     # Показуємо індикатор набору
     bot_message = await message.answer("🤔 Думаю...")
     
     try:
-        # Отримуємо контекст попередніх повідомлень
-        context = await db.get_recent_messages(message.from_user.id, limit=3)
-        # Перевіряємо, чи контекст не None та не порожній
-        if context is None:
-            context = []
         context_list = [
             {"user_message": msg["user_message"], "bot_response": msg["bot_response"]}
             for msg in context
         ]
         
         # Перевірка на питання про вступ - використовуємо спеціальну обробку
-        admission_keywords = [
-            "правила вступу", "вступ 2026", "вступна кампанія 2026",
-            "порядок вступу", "правила прийому", "правила прийому 2026",
-            "кампанія 2026", "нмт", "траєкторії вступу"
-        ]
-        is_admission_question = any(kw in user_message_lower for kw in admission_keywords)
+        is_admission_question = "chat.admission" in intents
         
         # Генеруємо відповідь через OLLAMA
         # region agent log
@@ -551,10 +262,13 @@ async def chat_handler(message: Message):
             hypothesis_id="H0",
             location="handlers/chat_handler.py:chat_handler:before_generate",
             message="calling generate_response",
-            data={"user_message": user_message[:200], "context_count": len(context_list)}
+            data={"user_message": user_message[:200], "context_count": len(context_list), "streaming": STREAMING_ANSWERS}
         )
         # endregion
-        response = await ollama.generate_response(user_message, context_list)
+        if STREAMING_ANSWERS:
+            response = await _stream_to_message(bot_message, user_message, context_list)
+        else:
+            response = await ollama.generate_response(user_message, context_list)
         
         # Перевіряємо, чи отримали відповідь
         if not response or len(response.strip()) == 0:
@@ -594,295 +308,9 @@ async def chat_handler(message: Message):
         if not is_valid:
             response = response_service._get_fallback_response(user_message)
 
-        # Фільтруємо технічні фрази та помилки
-        # OLLAMA сама перевіряє орфографію через промпт
-        
-        # СПЕЦІАЛЬНА ОБРОБКА: Питання про вартість навчання
-        # ВАЖЛИВО: Перевіряємо ТІЛЬКИ питання, які явно про вартість
-        # Не тригеримо на просто "спеціальність" без контексту вартості
-        user_message_lower = user_message.lower()
-        # Перевіряємо, чи є код спеціальності (121, F6, A4.11, А4.11 тощо) - це теж питання про вартість
-        # Розширений список кодів та варіантів питань - розпізнаємо БУДЬ-ЯКІ коди
-        has_specialty_code = bool(re.search(
-            r'\b(121|f6|f2|f3|код\s+\d{3}|код\s+[a-z]\d+|код\s+[a-z]\d+\.\d+|код\s+[а-я]\d+\.\d+|спеціальність\s+\d{3}|спеціальність\s+[a-z]\d+|спеціальність\s+[a-z]\d+\.\d+|спеціальність\s+[а-я]\d+\.\d+|на\s+\d{3}|на\s+[a-z]\d+|на\s+[a-z]\d+\.\d+|на\s+[а-я]\d+\.\d+|\d{3}|[a-z]\d+|[a-z]\d+\.\d+|[а-я]\d+\.\d+)\b',
-            user_message_lower,
-            re.IGNORECASE
-        ))
-        # Додаткова перевірка: чи це дійсно код (не рік, не телефон тощо)
-        if has_specialty_code:
-            # Перевіряємо, чи є 3-значне число, яке не є роком
-            year_match = re.search(r'\b(20\d{2})\b', user_message_lower)
-            if year_match:
-                # Якщо є рік, перевіряємо, чи є інші 3-значні коди
-                other_codes = re.findall(r'\b(\d{3})\b', user_message_lower)
-                if len(other_codes) == 1 and other_codes[0].startswith('20'):
-                    # Якщо тільки рік - не вважаємо це кодом спеціальності
-                    has_specialty_code = False
-        # Перевіряємо фрази типу "А НА 121?", "А НА F6?" (продовження попереднього питання про вартість)
-        is_continuation_question = bool(re.search(
-            r'^(а|а на|а щодо|а про|а по)\s+',
-            user_message_lower
-        )) and has_specialty_code
-        # Перевіряємо, чи є код у контексті вартості (будь-який 3-значний, з літерою або з галуззю)
-        has_code_with_tuition = bool(re.search(
-            r'(вартість|ціна|коштує|оплата).*?(\d{3}|[a-z]\d+|[a-z]\d+\.\d+|[а-я]\d+\.\d+)',
-            user_message_lower,
-            re.IGNORECASE
-        ))
-        is_tuition_question = (
-            any(word in user_message_lower for word in ['вартість', 'ціна', 'скільки коштує', 'оплата', 'коштує навчання']) or
-            ('спеціальність' in user_message_lower and any(word in user_message_lower for word in ['вартість', 'ціна', 'коштує', 'оплата'])) or
-            has_specialty_code or  # Якщо є код спеціальності - це питання про вартість
-            is_continuation_question or  # Якщо це продовження питання з кодом спеціальності
-            has_code_with_tuition  # Якщо код згадано разом зі словами про вартість
-        )
-        
-        # Автоматичний пошук інформації про вартість для будь-якої спеціальності
-        if is_tuition_question:
-            from tuition_helper import find_tuition_info, extract_specialty_from_message
-            
-            # Витягуємо назву спеціальності та код з повідомлення
-            # Якщо це загальне питання про вартість без конкретної спеціальності - показуємо факультети
-            # Перевіряємо, чи це дійсно загальне питання (тільки слова про вартість, без конкретної спеціальності)
-            is_general_tuition_question = (
-                any(word in user_message_lower for word in ['вартість', 'ціна', 'скільки коштує', 'оплата', 'коштує навчання']) and
-                not any(word in user_message_lower for word in ['спеціальність', 'спеціальності', 'факультет', 'факультети']) and
-                len(user_message_lower.split()) <= 3  # Коротке питання типу "вартості навчання"
-            )
-            
-            if is_general_tuition_question:
-                # Для загальних питань про вартість - одразу показуємо факультети
-                from keyboards import get_faculties_keyboard
-                faculties_text = (
-                    "💰 <b>Вартість навчання</b>\n\n"
-                    "💡 <b>Обери факультет, щоб побачити спеціальності та їх вартість</b> 🎓"
-                )
-                
-                message_history_id = await db.save_message_history(message.from_user.id, user_message, faculties_text)
-                
-                await message.answer(
-                    faculties_text,
-                    reply_markup=get_faculties_keyboard(report_id=message_history_id),
-                    parse_mode="HTML"
-                )
-                return
-            
-            # Витягуємо назву спеціальності та код з повідомлення
-            specialty_name, specialty_code = extract_specialty_from_message(user_message)
-            
-            # Якщо не знайдено конкретну спеціальність - показуємо факультети
-            if not specialty_name and not specialty_code:
-                from keyboards import get_faculties_keyboard
-                faculties_text = (
-                    "💰 <b>Вартість навчання</b>\n\n"
-                    "💡 <b>Обери факультет, щоб побачити спеціальності та їх вартість</b> 🎓"
-                )
-                
-                message_history_id = await db.save_message_history(message.from_user.id, user_message, faculties_text)
-                
-                await message.answer(
-                    faculties_text,
-                    reply_markup=get_faculties_keyboard(report_id=message_history_id),
-                    parse_mode="HTML"
-                )
-                return
-            
-            # Спроба визначити спеціальність/факультет із попередніх повідомлень, якщо зараз не вказано
-            def detect_faculty_by_keywords(text: str) -> str | None:
-                keyword_map = [
-                    # Бізнес і право
-                    (["бізнес", "економ", "право", "юриспруд", "менедж", "фінанс", "банківсь", "страхуван", "підприємниц", "адмініструван"], "faculty_7"),
-                    # ІТ / програмування
-                    (["іт", "програмув", "програмн", "комп'ют", "компют", "інформат", "f2", "f3", "f6", "121"], "faculty_8"),
-                    # Медицина / здоров'я
-                    (["медиц", "медичн", "фармац", "терап", "реабіліт", "ерготерап"], "faculty_3"),
-                    # Природничі
-                    (["біолог", "еколог", "географ", "хім", "фізик", "природнич"], "faculty_4"),
-                    # Спорт
-                    (["спорт", "фізкульт", "фіз вих", "фізична культура"], "faculty_5"),
-                    # Педагогіка / освіта
-                    (["педагог", "дошкіль", "початков", "логопед", "олігофрен", "середня освіта", "вчитель"], "faculty_6"),
-                    # Психологія / соціальні
-                    (["психолог", "соціолог", "істор", "соц", "суспільн"], "faculty_2"),
-                    # Філологія / мистецтва / журналістика
-                    (["філолог", "журналіст", "мистецт", "культурол", "музич", "хореограф", "образотвор", "германськ", "мов"], "faculty_1"),
-                ]
-                for keywords, faculty_id in keyword_map:
-                    if any(k in text for k in keywords):
-                        return faculty_id
-                return None
-
-            faculty_id_match = None
-            if (not specialty_name) and (not specialty_code) and context_list:
-                for ctx in context_list:
-                    prev_user = (ctx.get("user_message") or "").lower()
-                    prev_sn, prev_sc = extract_specialty_from_message(prev_user)
-                    if prev_sn or prev_sc:
-                        specialty_name = prev_sn
-                        specialty_code = prev_sc
-                        break
-                    fid = detect_faculty_by_keywords(prev_user)
-                    if fid:
-                        faculty_id_match = fid
-                        break
-
-            # Якщо знайдено код, але не знайдено назву - використовуємо код для пошуку
-            if specialty_code and not specialty_name:
-                # Код вже буде конвертовано в назву в find_tuition_info
-                pass
-            
-            # Якщо відповідь порожня, некоректна або не містить інформації про вартість
-            # АБО якщо відповідь містить інформацію про іншу спеціальність
-            response_lower = response.lower() if response else ""
-            has_tuition_info = any(word in response_lower for word in ['грн', 'гривень', 'місяць', 'семестр', 'рік'])
-            
-            # Перевіряємо, чи відповідь містить правильну спеціальність
-            correct_specialty_in_response = False
-            if specialty_name:
-                # Створюємо словник ключових слів для кожної спеціальності
-                from tuition_helper import extract_specialty_from_message
-                
-                # Отримуємо ключові слова для перевірки з повного списку
-                specialty_check_keywords = {
-                    "психологія": ["психолог", "психологія"],
-                    "інформаційні системи та технології": ["інформаційні системи", "інформаційні технології"],
-                    "інженерія програмного забезпечення": ["інженерія програмного", "програмне забезпечення"],
-                    "комп'ютерні науки": ["комп'ютерні науки"],
-                    "право": ["право", "юриспруденція"],
-                    "економіка": ["економіка"],
-                    "менеджмент": ["менеджмент"],
-                    "журналістика": ["журналістика"],
-                    "медицина": ["медицина", "медик"],
-                    "фармація": ["фармація"],
-                    "туризм та рекреація": ["туризм"],
-                    "готельно-ресторанна справа": ["готельно-ресторанна", "готель"],
-                    "географія та регіональні студії": ["географія"],
-                    "соціологія": ["соціологія"],
-                    "фізична терапія": ["фізична терапія"],
-                    "фізична реабілітація": ["фізична реабілітація"],
-                    "біологія та біохімія": ["біологія", "біохімія"],
-                    "екологія": ["екологія"],
-                    "хімія": ["хімія"],
-                    "фізика та астрономія": ["фізика", "астрономія"],
-                    "дошкільна освіта": ["дошкільна освіта"],
-                    "початкова освіта": ["початкова освіта"],
-                    "логопедія": ["логопедія"],
-                    "образотворче мистецтво": ["образотворче мистецтво"],
-                    "музичне мистецтво": ["музичне мистецтво"],
-                    "хореографія": ["хореографія"],
-                    "культурологія": ["культурологія"],
-                    "історія та археологія": ["історія", "археологія"],
-                    "філологія": ["філологія"],
-                    "фінанси, банківська справа та страхування": ["фінанси", "банківська"],
-                    "публічне управління та адміністрування": ["публічне управління"],
-                    "підприємництво та торгівля": ["підприємництво"],
-                    "соціальна робота та консультування": ["соціальна робота"],
-                    "фізична культура і спорт": ["фізична культура"],
-                }
-                
-                # Перевіряємо, чи відповідь містить правильну спеціальність
-                if specialty_name.lower() in specialty_check_keywords:
-                    correct_specialty_in_response = any(
-                        keyword in response_lower 
-                        for keyword in specialty_check_keywords[specialty_name.lower()]
-                    )
-                else:
-                    # Якщо спеціальність не в списку, перевіряємо частковий збіг
-                    specialty_name_lower = specialty_name.lower()
-                    correct_specialty_in_response = specialty_name_lower in response_lower or any(
-                        word in response_lower 
-                        for word in specialty_name_lower.split() 
-                        if len(word) > 4
-                    )
-                
-                # ДОДАТКОВА ПЕРЕВІРКА: чи відповідь містить інші спеціальності (неправильні)
-                # Якщо знайдено іншу спеціальність - це помилка
-                other_specialties_found = False
-                for other_spec, other_keywords in specialty_check_keywords.items():
-                    if other_spec != specialty_name.lower():
-                        if any(keyword in response_lower for keyword in other_keywords):
-                            # Перевіряємо, чи це не частина правильної спеціальності
-                            if not any(keyword in response_lower for keyword in specialty_check_keywords.get(specialty_name.lower(), [])):
-                                other_specialties_found = True
-                                break
-                
-                # Якщо знайдено іншу спеціальність - вважаємо відповідь некоректною
-                if other_specialties_found:
-                    correct_specialty_in_response = False
-
-            # Якщо спеціальність не визначена, але є факультет з попереднього запиту — показуємо вартість усіх спец. факультету
-            if (not specialty_name and not specialty_code) and faculty_id_match:
-                faculty_specialties_map = {
-                    "faculty_7": [  # Бізнес і право
-                        "економіка", "менеджмент", "фінанси, банківська справа та страхування",
-                        "підприємництво та торгівля", "право", "публічне управління та адміністрування",
-                        "туризм та рекреація", "готельно-ресторанна справа"
-                    ],
-                    "faculty_8": [  # ІТ
-                        "інженерія програмного забезпечення", "комп'ютерні науки", "інформаційні системи та технології"
-                    ],
-                    "faculty_3": [  # Медицина/здоров'я
-                        "фізична терапія, ерготерапія", "соціальна робота та консультування",
-                        "медицина", "фізична реабілітація", "фармація"
-                    ],
-                    "faculty_4": [  # Природничі
-                        "біологія та біохімія", "екологія", "географія та регіональні студії",
-                        "хімія", "фізика та астрономія"
-                    ],
-                    "faculty_5": [  # Спорт
-                        "фізична культура і спорт"
-                    ],
-                    "faculty_6": [  # Педагогіка / освіта
-                        "дошкільна освіта", "початкова освіта", "спеціальна освіта",
-                        "середня освіта (історія)", "середня освіта (біологія)",
-                        "середня освіта (географія)", "середня освіта (хімія)",
-                        "середня освіта (українська мова і література)",
-                        "середня освіта (англійська мова)", "середня освіта (німецька мова)",
-                        "середня освіта (іспанська мова)", "середня освіта (математика)",
-                        "середня освіта (фізика та астрономія)", "середня освіта (інформатика)",
-                        "фізична культура і спорт"
-                    ],
-                    "faculty_2": [  # Психологія / соц
-                        "психологія", "соціологія", "історія та археологія", "журналістика"
-                    ],
-                    "faculty_1": [  # Філологія / мистецтва
-                        "філологія", "журналістика", "культурологія та музеєзнавство",
-                        "хореографія", "музичне мистецтво", "образотворче мистецтво"
-                    ],
-                }
-                specs = faculty_specialties_map.get(faculty_id_match, [])
-                tuition_blocks = []
-                for spec in specs:
-                    info = await find_tuition_info(specialty_name=spec)
-                    if info and "немає даних" not in info.lower():
-                        tuition_blocks.append(info)
-                if tuition_blocks:
-                    response = "\n\n".join(tuition_blocks)
-                    has_tuition_info = True
-                    correct_specialty_in_response = True
-            
-            # Замінюємо відповідь ТІЛЬКИ якщо це питання про вартість:
-            # 1. Відповідь порожня або некоректна
-            # 2. Відповідь не містить інформації про вартість
-            # 3. Відповідь містить інформацію про іншу спеціальність (якщо була визначена спеціальність)
-            # OLLAMA сама розпізнає та фільтрує інші університети через промпт
-            should_replace = False
-            
-            if not response or len(response.strip()) < 50 or 'не вдалося' in response_lower:
-                # Відповідь порожня або некоректна - замінюємо
-                should_replace = True
-            elif not has_tuition_info:
-                # Відповідь не містить інформації про вартість - замінюємо
-                should_replace = True
-            elif specialty_name and not correct_specialty_in_response:
-                # Відповідь про іншу спеціальність - замінюємо ТІЛЬКИ якщо це питання про вартість конкретної спеціальності
-                should_replace = True
-            
-            if should_replace:
-                # Автоматично знаходимо інформацію про вартість
-                tuition_info = await find_tuition_info(specialty_name, specialty_code)
-                if tuition_info:
-                    response = tuition_info
+        # Питання про вартість з повною відповіддю вже оброблені AnswerEngine до генерації;
+        # ознака потрібна для перевірок якості відповіді нижче
+        is_tuition_question = message_parser.is_tuition_question(user_message)
         
         # КРОК 2: Перевірка на незрозумілі тексти (латиниця + кирилиця, незрозумілі слова)
         # Якщо відповідь містить багато незрозумілих символів або слів - замінюємо на стандартну відповідь
@@ -902,7 +330,7 @@ async def chat_handler(message: Message):
         
         if has_unclear_text:
             # Якщо питання про документи - даємо стандартну відповідь
-            if any(word in user_message.lower() for word in ['документ', 'подати', 'подача', 'як подати']):
+            if "chat.document_submission" in intents:
                 response = """Для подачі документів до ХДУ потрібно:
 
 • Заява (формується в електронному кабінеті вступника)
@@ -994,15 +422,10 @@ async def chat_handler(message: Message):
         # АЛЕ: для звичайних питань - не замінюємо, якщо відповідь не містить критичних помилок
         if unclear_words_count > 0:
             # Перевіряємо, чи відповідь про вартість містить корисну інформацію
-            has_tuition_info = is_tuition_question and any(word in response.lower() for word in [
-                'грн', 'гривень', 'місяць', 'семестр', 'рік', 'період', 'вартість', 'навчання'
-            ])
+            has_tuition_info = is_tuition_question and intent_matcher.has(response, "chat.tuition_info")
             
             # Перевіряємо, чи це питання про документи (лише явні згадки про документи)
-            is_document_question = any(word in user_message.lower() for word in [
-                'документ', 'документи', 'які документи', 'список документів',
-                'потрібні документи', 'що потрібно для вступу'
-            ])
+            is_document_question = "chat.document_explicit" in intents
             
             # Якщо це питання про вартість і відповідь містить інформацію про вартість - не блокуємо
             if has_tuition_info:
@@ -1041,10 +464,7 @@ async def chat_handler(message: Message):
         
         
         # Перевіряємо, чи це питання про документи
-        is_document_question = any(word in user_message.lower() for word in [
-            'документ', 'подати', 'подача', 'як подати', 'де подати', 'куди подати',
-            'які документи', 'список документів', 'потрібні документи'
-        ])
+        is_document_question = "chat.document_question" in intents
         
         # Замінюємо відповідь ТІЛЬКИ якщо є критичні помилки
         if has_final_errors:
@@ -1130,13 +550,7 @@ async def chat_handler(message: Message):
         
         # Перевіряємо, чи відповідь OLLAMA про факультети/спеціальності - додаємо клавіатуру
         # OLLAMA сама розпізнає питання про спеціальності через промпт і відповість про факультети
-        response_lower = response.lower()
-        is_faculties_response = any(keyword in response_lower for keyword in [
-            "8 факультетів", "оберіть факультет", "факультети хду", "факультет української",
-            "факультет психології", "медичний факультет", "факультет біології",
-            "факультет фізичного", "педагогічний факультет", "факультет бізнесу",
-            "факультет комп'ютерних", "є 8 факультетів", "в хду є"
-        ])
+        is_faculties_response = intent_matcher.has(response, "chat.faculties_response")
         
         # Формуємо повідомлення з правильним форматуванням (HTML)
         message_text = f"💬 <b>Відповідь:</b>\n\n{response}\n\n💡 Можеш задати ще питання або натиснути '⬅️ Назад' для повернення до меню"
@@ -1158,11 +572,20 @@ async def chat_handler(message: Message):
             reply_markup = get_feedback_keyboard(message_history_id)
         
         # Оновлюємо повідомлення з inline кнопками для оцінки або вибору факультету
-        await bot_message.edit_text(
-            message_text,
-            reply_markup=reply_markup,
-            parse_mode="HTML"
-        )
+        try:
+            await bot_message.edit_text(
+                message_text,
+                reply_markup=reply_markup,
+                parse_mode="HTML"
+            )
+        except TelegramRetryAfter as e:
+            # Після частих streaming-редагувань фінальне може впертися в ліміт
+            await asyncio.sleep(e.retry_after)
+            await bot_message.edit_text(
+                message_text,
+                reply_markup=reply_markup,
+                parse_mode="HTML"
+            )
     except Exception as e:
         # Логуємо помилку для діагностики
         logger.error(f"Помилка в chat_handler: {e}", exc_info=True)
@@ -1,5 +1,6 @@
 """
 """
+import html
 from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.filters import Command, CommandStart
@@ -207,4 +208,88 @@ async def cmd_contacts_list(message: Message):
         await message.answer(text, parse_mode="HTML")
 
 
+@router.message(Command("ai_stats"))
+async def cmd_ai_stats(message: Message):
+    """Команда для адміна - час етапів генерації та найповільніші запити"""
+    if message.from_user.id != ADMIN_ID or ADMIN_ID == 0:
+        await message.answer("❌ У вас немає доступу до цієї команди.")
+        return
+    
+    from ollama_client import ollama
+    from services.answer_engine import answer_engine
+    
+    stats = ollama.get_statistics()
+    tracing = stats.get("tracing", {})
+    coverage = answer_engine.get_stats()
+    
+    text = (
+        "📊 <b>Статистика AI</b>\n\n"
+        f"🧩 Без OLLAMA (шаблони): {coverage['answered']}/{coverage['total']} "
+        f"({coverage['coverage']:.1f}%)\n\n"
+    )
+    
+    cache_stats = ollama.get_cache_stats()
+    for title, cache_key in (("Точний кеш", "exact_cache"), ("Семантичний кеш", "semantic_cache")):
+        c = cache_stats[cache_key]
+        text += (
+            f"<b>{title}:</b> {c['size']} записів, {c['bytes'] / 1024:.0f}/{c['max_bytes'] / 1024:.0f} KB, "
+            f"hit {c['hit_rate']:.0f}%, витіснено {c['evictions']}, прострочено {c['expired']}\n"
+        )
+        for q_type, t in c["by_question_type"].items():
+            text += f"  • {q_type}: {t['hits']}/{t['hits'] + t['misses']} ({t['hit_rate']:.0f}%), витіснено {t['evictions']}\n"
+    text += "\n"
+    
+    operations = tracing.get("operations", {})
+    if operations:
+        text += "<b>Запити:</b>\n"
+        for name, h in operations.items():
+            text += f"• {name}: {h['count']} шт, avg {h['avg']:.2f}s, p95 {h['p95']:.2f}s, max {h['max']:.2f}s\n"
+        text += "\n"
+    
+    timings = stats.get("ollama_timings", {}).get("by_question_type", {})
+    if timings:
+        text += "<b>OLLAMA (prefill / генерація):</b>\n"
+        for q_type, t in timings.items():
+            text += (
+                f"• {q_type}: промпт ~{t['avg_prompt_tokens']:.0f} ток., "
+                f"prefill {t['avg_prefill_time']:.2f}s ({t['prefill_tokens_per_sec']:.0f} ток/с), "
+                f"генерація {t['decode_tokens_per_sec']:.1f} ток/с, перезавантажень: {t['reloads']}\n"
+            )
+        text += "\n"
+    
+    stages = tracing.get("stages", {})
+    if stages:
+        text += "<b>Етапи (за середнім часом):</b>\n"
+        for name, h in sorted(stages.items(), key=lambda item: item[1]["avg"], reverse=True):
+            text += f"• <code>{name}</code>: avg {h['avg'] * 1000:.0f}ms, p95 {h['p95'] * 1000:.0f}ms ({h['count']})\n"
+        text += "\n"
+    
+    slowest = tracing.get("slowest", [])[:5]
+    if slowest:
+        text += "<b>Найповільніші запити:</b>\n"
+        for i, trace in enumerate(slowest, 1):
+            breakdown = sorted(trace["breakdown"].items(), key=lambda item: item[1], reverse=True)
+            parts = ", ".join(f"{name} {duration:.2f}s" for name, duration in breakdown[:5])
+            # Обрізаємо до екранування, щоб не розрізати сутність на кшталт &amp;
+            query = html.escape(trace["query"][:60])
+            text += (
+                f"<b>{i}.</b> {trace['total']:.2f}s [{html.escape(trace['operation'])}] {query}\n"
+                f"   {parts}\n"
+            )
+    
+    if not operations:
+        text += "Поки що немає даних про генерації."
+    
+    await _answer_html_parts(message, text)
+
 
+async def _answer_html_parts(message: Message, text: str, limit: int = 4000):
+    """Довгий HTML-текст кількома повідомленнями, розбитими по рядках (теги не розриваються)"""
+    part = ""
+    for line in text.splitlines(keepends=True):
+        if part and len(part) + len(line) > limit:
+            await message.answer(part, parse_mode="HTML")
+            part = ""
+        part += line
+    if part.strip():
+        await message.answer(part, parse_mode="HTML")
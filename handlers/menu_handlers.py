@@ -1372,6 +1372,10 @@ async def process_price_monthly_for_tuition(message: Message, state: FSMContext)
         )
         
         if success:
+            # Кешовані відповіді AI зі старою вартістю більше не актуальні
+            from ollama_client import ollama
+            await ollama.invalidate_tuition(specialty_name=data.get('specialty_name'))
+            
             await message.answer(
                 f"✅ <b>Вартість навчання збережено!</b>\n\n"
                 f"📚 <b>Спеціальність:</b> {data.get('specialty_name')}\n"
@@ -982,34 +982,30 @@ def get_structured_context() -> str:
 def search_admission_2026_by_keyword(keyword: str) -> Optional[Dict]:
     if "admission" not in KNOWLEDGE_BASE or "year_2026" not in KNOWLEDGE_BASE["admission"]:
         return None
-    keyword_lower = keyword.lower()
+    # Ключові слова розділів скомпільовані в спільний автомат намірів (utils/intent_matcher.py)
+    from utils.intent_matcher import intent_matcher
+    intents = intent_matcher.intents(keyword)
     admission_2026 = KNOWLEDGE_BASE["admission"]["year_2026"]
-    if "keywords" in admission_2026 and any(kw in keyword_lower for kw in admission_2026["keywords"]):
+    if "admission_2026.general" in intents:
         return {"type": "admission_2026", "data": admission_2026}
-    if "nmt" in admission_2026:
-        nmt_data = admission_2026["nmt"]
-        if "keywords" in nmt_data and any(kw in keyword_lower for kw in nmt_data["keywords"]):
-            return {"type": "nmt", "data": nmt_data}
+    if "nmt" in admission_2026 and "admission_2026.nmt" in intents:
+        return {"type": "nmt", "data": admission_2026["nmt"]}
     if "trajectories" in admission_2026:
         traj_data = admission_2026["trajectories"]
-        if "keywords" in traj_data and any(kw in keyword_lower for kw in traj_data["keywords"]):
+        if "admission_2026.trajectories" in intents:
             return {"type": "trajectories", "data": traj_data}
-        if "bachelor" in traj_data and any(kw in keyword_lower for kw in ["бакалавр", "bachelor", "3 роки 10 місяців"]):
+        if "bachelor" in traj_data and "admission_2026.bachelor" in intents:
             return {"type": "bachelor", "data": traj_data["bachelor"]}
-        if "master" in traj_data and "keywords" in traj_data["master"] and any(kw in keyword_lower for kw in traj_data["master"]["keywords"]):
+        if "master" in traj_data and "admission_2026.master" in intents:
             return {"type": "master", "data": traj_data["master"]}
     if "campaign" in admission_2026:
         campaign_data = admission_2026["campaign"]
-        if "keywords" in campaign_data and any(kw in keyword_lower for kw in campaign_data["keywords"]):
+        if "admission_2026.campaign" in intents:
             return {"type": "campaign", "data": campaign_data}
-        if "electronic_cabinets" in campaign_data:
-            ec_data = campaign_data["electronic_cabinets"]
-            if "keywords" in ec_data and any(kw in keyword_lower for kw in ec_data["keywords"]):
-                return {"type": "electronic_cabinets", "data": ec_data}
-        if "support" in campaign_data:
-            support_data = campaign_data["support"]
-            if "keywords" in support_data and any(kw in keyword_lower for kw in support_data["keywords"]):
-                return {"type": "support", "data": support_data}
+        if "electronic_cabinets" in campaign_data and "admission_2026.electronic_cabinets" in intents:
+            return {"type": "electronic_cabinets", "data": campaign_data["electronic_cabinets"]}
+        if "support" in campaign_data and "admission_2026.support" in intents:
+            return {"type": "support", "data": campaign_data["support"]}
     return None
 
 def get_admission_2026_info() -> Dict:
@@ -10,11 +10,12 @@ load_dotenv(override=True)
 
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
-from config import BOT_TOKEN, OLLAMA_API_URL, ADMIN_ID
+from config import BOT_TOKEN, OLLAMA_API_URL, ADMIN_ID, CACHE_WARM_ON_STARTUP
 from database import db
 from handlers import router
 from ollama_client import ollama
 from scheduler import start_scheduler
+from services.cache_warmer import warm_response_cache, estimate_normalization_gain
 
 logging.basicConfig(
     level=logging.INFO,
@@ -117,9 +118,16 @@ async def main():
         logger.error("❌ BOT_TOKEN не встановлено! Перевірте файл .env")
         return
     
+    # Одна довготривала HTTP-сесія до OLLAMA на весь час роботи бота
+    await ollama.start()
+    
     # Перевіряємо OLLAMA, але не зупиняємо бота якщо вона недоступна
     # (бот може працювати з базовими функціями без AI)
-    if not await ensure_ollama_running():
+    warmup_task = None
+    if await ensure_ollama_running():
+        # Прогрів моделі у фоні: холодний старт не потрапляє на перше питання
+        warmup_task = asyncio.create_task(ollama.warm_up())
+    else:
         logger.warning("⚠️ OLLAMA недоступна. Бот запуститься з обмеженим функціоналом.")
         logger.info("💡 Для повнофункціональної роботи:")
         logger.info("   1. Запустіть OLLAMA на хост-машині: ollama serve")
@@ -133,6 +141,11 @@ async def main():
         logger.warning(f"⚠️ Не вдалося підключитися до БД: {e}")
         logger.info("💡 Бот працюватиме без збереження даних у БД")
     
+    # Відповіді на популярні питання - у фоні, коли модель вже завантажена
+    cache_warm_task = None
+    if CACHE_WARM_ON_STARTUP and warmup_task is not None:
+        cache_warm_task = asyncio.create_task(_warm_cache_after(warmup_task))
+    
     bot = Bot(token=BOT_TOKEN)
     dp = Dispatcher(storage=MemoryStorage())
     
@@ -156,6 +169,7 @@ async def main():
         logger.error(f"❌ Не вдалося отримати інформацію про бота: {e}")
         logger.error("💡 Можливо, запущено інший екземпляр або неправильний токен")
         await db.disconnect()
+        await ollama.close()
         await bot.session.close()
         return
     
@@ -227,11 +241,93 @@ async def main():
         else:
             logger.error(f"❌ Помилка: {e}", exc_info=True)
     finally:
+        for task in (warmup_task, cache_warm_task):
+            if task is not None and not task.done():
+                task.cancel()
+        # Спочатку OLLAMA-клієнт: він дописує спільний кеш відповідей у БД
+        await ollama.close()
         await db.disconnect()
         await bot.session.close()
         logger.info("✅ Ресурси звільнено")
 
 
+async def _warm_cache_after(warmup_task: asyncio.Task):
+    """Прогрів кешу відповідей після прогріву моделі"""
+    try:
+        if await asyncio.shield(warmup_task):
+            await warm_response_cache()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning(f"⚠️ Не вдалося прогріти кеш відповідей: {e}")
+
+
+async def warm_cache(limit: int = None):
+    """
+    Функція для прогріву кешу відповідей популярними питаннями з message_history
+    
+    Запущений бот підхоплює результат лише зі спільного кешу (PostgreSQL): постійний
+    кеш SQLite він читає тільки при старті.
+    """
+    logger.info("🔥 Запуск прогріву кешу відповідей...")
+    
+    try:
+        await db.connect()
+    except Exception as e:
+        logger.error(f"❌ Помилка підключення до БД: {e}")
+        return
+    
+    await ollama.start()
+    try:
+        if limit:
+            stats = await warm_response_cache(limit=limit)
+        else:
+            stats = await warm_response_cache()
+        logger.info(f"✅ Прогрів завершено: {stats}")
+    finally:
+        # Постійний і спільний кеш дописуються при закритті клієнта - до відключення БД
+        await ollama.close()
+        await db.disconnect()
+
+
+async def cache_keys_report(days: int = 7):
+    """Функція для оцінки впливу нормалізації запитів на hit rate кешу (за message_history)"""
+    try:
+        await db.connect()
+    except Exception as e:
+        logger.error(f"❌ Помилка підключення до БД: {e}")
+        return
+    
+    try:
+        stats = await estimate_normalization_gain(days=days)
+        if stats:
+            logger.info(f"📊 Питань за {days} дн.: {stats['questions']}")
+            logger.info(
+                f"   Попередня нормалізація: {stats['basic_keys']} ключів, "
+                f"hit rate до {stats['basic_hit_rate']:.1f}%"
+            )
+            logger.info(
+                f"   TextNormalizer: {stats['normalized_keys']} ключів, "
+                f"hit rate до {stats['normalized_hit_rate']:.1f}%"
+            )
+    finally:
+        await db.disconnect()
+
+
+async def build_embeddings():
+    """Функція для офлайн-побудови embedding-індексу уривків бази знань (OLLAMA embeddings + numpy)"""
+    logger.info("🧮 Побудова embedding-індексу бази знань...")
+    
+    await ollama.start()
+    try:
+        stats = await ollama.build_embedding_index()
+        logger.info(f"✅ Індекс побудовано: {stats}")
+    except Exception as e:
+        logger.error(f"❌ Не вдалося побудувати embedding-індекс: {e}")
+    finally:
+        await ollama.close()
+
+
 async def cleanup_database(days_to_keep: int = 90):
     """Функція для очищення старих даних з БД"""
     logger.info(f"🧹 Запуск очищення БД (збереження даних за останні {days_to_keep} днів)...")
@@ -289,6 +385,35 @@ if __name__ == "__main__":
             asyncio.run(cleanup_database(days_to_keep))
         except KeyboardInterrupt:
             logger.info("👋 Очищення перервано")
+    elif len(sys.argv) > 1 and sys.argv[1] == "warm_cache":
+        # Режим прогріву кешу відповідей (наприклад, з cron перед ранковим піком)
+        limit = None
+        if len(sys.argv) > 2:
+            try:
+                limit = int(sys.argv[2])
+            except ValueError:
+                logger.error(f"❌ Невірний формат кількості питань. Використовується значення з конфігурації")
+        
+        try:
+            asyncio.run(warm_cache(limit))
+        except KeyboardInterrupt:
+            logger.info("👋 Прогрів перервано")
+    elif len(sys.argv) > 1 and sys.argv[1] == "cache_keys":
+        # Оцінка hit rate кешу з різними нормалізаціями запитів за історією повідомлень
+        days = 7
+        if len(sys.argv) > 2:
+            try:
+                days = int(sys.argv[2])
+            except ValueError:
+                logger.error(f"❌ Невірний формат кількості днів. Використовується значення за замовчуванням: 7")
+        
+        asyncio.run(cache_keys_report(days))
+    elif len(sys.argv) > 1 and sys.argv[1] == "build_embeddings":
+        # Офлайн-побудова embedding-індексу (після кожної зміни бази знань)
+        try:
+            asyncio.run(build_embeddings())
+        except KeyboardInterrupt:
+            logger.info("👋 Побудову індексу перервано")
     else:
         # Звичайний режим роботи бота
         try:
@@ -10,6 +10,7 @@ from config import OLLAMA_API_URL, OLLAMA_MODEL
 from services.knowledge_service import KnowledgeService
 from validators.response_validator import ResponseValidator
 from ollama_optimized.client import OptimizedOllamaClient
+from utils.intent_matcher import intent_matcher
 
 # region agent log helper (debug)
 import os
@@ -189,26 +190,18 @@ class OllamaClient:
                     data={"effective_prompt": effective_prompt[:200]}
                 )
             max_retries = 3  # Збільшено кількість спроб для кращої валідації
-            admission_keywords = [
-                "правила вступу", "вступ 2026", "вступна кампанія 2026",
-                "порядок вступу", "кампанії 2026", "правила прийому 2026",
-                "правила прийому до хду", "правила прийому 2026 хду",
-                "електронний кабінет", "електронні кабінети", "ksu24", "kсу24",
-                "траєкторії", "траєкторії вступу", "траєкторія вступу", "коротка програма", "скорочена програма",
-                "вступна кампанія", "коли розпочинається вступ", "коли починається вступ",
-                "коли розпочинається вступна кампанія", "коли починається вступна кампанія",
-                "початок вступної кампанії", "старт вступної кампанії",
-            ]
             prompt_to_use = effective_prompt
-            is_admission_question = any(k in (prompt_to_use or "").lower() for k in admission_keywords)
-            matched_adm = [k for k in admission_keywords if k in (prompt_to_use or "").lower()]
+            matched_adm = intent_matcher.keywords(prompt_to_use, "legacy.admission")
+            is_admission_question = bool(matched_adm)
             _agent_log(
                 hypothesis_id="H1",
                 location="ollama_client.py:generate_response:admission_detect",
                 message="admission detection",
                 data={"is_admission": is_admission_question, "matched": matched_adm}
             )
-            admission_markers = ["вступ", "нмт", "траєктор", "кампан", "електрон", "ksu24", "ксу24", "правил", "кабінет", "2026"]
+
+            def _has_admission_markers(text: str) -> bool:
+                return intent_matcher.has(text, "legacy.admission_markers")
 
             def _admission_fallback() -> str:
                 """Детермінована відповідь про вступ-2026 з бази знань, якщо модель дрейфує."""
@@ -422,7 +415,7 @@ class OllamaClient:
                             if is_valid:
                                 # Додаткова перевірка для вступ-2026: відповідь має містити ключові маркери теми
                                 if is_admission_question:
-                                    if not any(m in answer.lower() for m in admission_markers):
+                                    if not _has_admission_markers(answer):
                                         regen = await _generate_narrow_admission(session)
                                         # region agent log
                                         _agent_log(
@@ -436,8 +429,8 @@ class OllamaClient:
                                             return regen
                                 # Перевірка на невідповідність темі вступ-2026 (модель пішла в "документи")
                                 if is_admission_question:
-                                    bad_admission = ("документ" in answer.lower()) and not any(
-                                        kw in answer.lower() for kw in ["нмт", "траєктор", "кампан", "електронн", "ksu24", "ксу24"]
+                                    bad_admission = ("документ" in answer.lower()) and not intent_matcher.has(
+                                        answer, "legacy.admission_topic"
                                     )
                                     if bad_admission:
                                         regen = await _generate_narrow_admission(session)
@@ -451,7 +444,7 @@ class OllamaClient:
                                         # endregion
                                         if regen:
                                             # Якщо реген, але без маркерів — падаємо у детермінований fallback
-                                            if is_admission_question and not any(m in regen.lower() for m in admission_markers):
+                                            if is_admission_question and not _has_admission_markers(regen):
                                                 fb = _admission_fallback()
                                                 _agent_log(
                                                     hypothesis_id="H6",
@@ -473,7 +466,7 @@ class OllamaClient:
                                 )
                                 # endregion
                                 # Для вступ-2026 робимо остаточну перевірку маркерів; якщо нема — детермінований fallback
-                                if is_admission_question and not any(m in answer.lower() for m in admission_markers):
+                                if is_admission_question and not _has_admission_markers(answer):
                                     fb = _admission_fallback()
                                     _agent_log(
                                         hypothesis_id="H6",
@@ -512,7 +505,7 @@ class OllamaClient:
                                         regen = await _generate_narrow_admission(session)
                                         if regen:
                                             # Якщо після регенерації немає маркерів — детермінований fallback
-                                            if not any(m in regen.lower() for m in admission_markers):
+                                            if not _has_admission_markers(regen):
                                                 fb = _admission_fallback()
                                                 _agent_log(
                                                     hypothesis_id="H6",
@@ -532,10 +525,9 @@ class OllamaClient:
                                         )
                                         return fb
                                     # Останній fallback — короткі стандартні відповіді
-                                    prompt_lower = prompt.lower()
-                                    if any(word in prompt_lower for word in ["програмування", "програміст", "іт", "інформатика", "комп'ютер", "121", "f6", "f2", "f3"]):
+                                    if intent_matcher.has(prompt, "legacy.it"):
                                         return "В ХДУ є такі спеціальності з програмування та інформаційних технологій: Інженерія програмного забезпечення (F2), Комп'ютерні науки (F3), Інформаційні системи та технології (F6, код 121). Детальніше: +380 552 494375 💻"
-                                    elif any(word in prompt_lower for word in ["медицина", "медичні", "лікар"]):
+                                    elif intent_matcher.has(prompt, "legacy.medicine"):
                                         return "В ХДУ є такі спеціальності з охорони здоров'я: Фізична терапія, ерготерапія (бакалавр), Соціальна робота та консультування (бакалавр), Медицина (магістр), Фізична реабілітація (магістр), Фармація (магістр). Детальніше: +380 552 494375 🏥"
                                     else:
                                         return ("На жаль, не вдалося сформувати коректну відповідь. "
@@ -636,6 +628,34 @@ class OllamaClient:
         self.knowledge_service = KnowledgeService()
         self.response_validator = ResponseValidator()
     
+    async def start(self):
+        """Відкриття пулу HTTP-з'єднань до OLLAMA"""
+        await self._client.start()
+    
+    async def close(self):
+        """Закриття пулу HTTP-з'єднань до OLLAMA"""
+        await self._client.close()
+    
+    async def warm_up(self) -> bool:
+        """Прогрів моделі та системних промптів"""
+        return await self._client.warm_up()
+    
+    async def keep_warm(self) -> bool:
+        """Продовження keep_alive моделі"""
+        return await self._client.keep_warm()
+    
+    async def warm_cache(self, questions: list) -> dict:
+        """Попередня генерація відповідей на популярні питання"""
+        return await self._client.warm_cache(questions)
+    
+    async def build_embedding_index(self) -> dict:
+        """Побудова embedding-індексу уривків бази знань"""
+        return await self._client.build_embedding_index()
+    
+    async def invalidate_tuition(self, specialty_name: str = None, specialty_code: str = None) -> dict:
+        """Інвалідація кешованих відповідей про вартість після зміни цін"""
+        return await self._client.invalidate_tuition(specialty_name, specialty_code)
+    
     async def generate_response(self, prompt: str, context: list = None) -> str:
         """Генерація відповіді через оптимізований клієнт"""
         return await self._client.generate_response(prompt, context, use_cache=True)
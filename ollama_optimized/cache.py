@@ -2,19 +2,18 @@
 Кешування відповідей для швидшого доступу
 """
 import hashlib
-import json
-import re
-from typing import Optional, Dict
-from datetime import datetime, timedelta
+from typing import Optional, Dict, Iterable
+from .cache_core import CacheCore, text_size
+from config import RESPONSE_CACHE_MAX_BYTES, CACHE_TTL_HOURS
+from utils.text_normalizer import TextNormalizer
 
 
 class ResponseCache:
     """Кешування відповідей для швидшого доступу"""
     
-    def __init__(self, max_size: int = 200, ttl_hours: int = 24):
-        self.cache: Dict[str, Dict] = {}
-        self.max_size = max_size
-        self.ttl = timedelta(hours=ttl_hours)
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES, ttl_hours: float = CACHE_TTL_HOURS):
+        # LRU + TTL з лімітом пам'яті; записи {response, query}
+        self.cache = CacheCore(max_bytes, ttl_hours * 3600)
     
     def _get_cache_key(self, query: str, context_hash: str) -> str:
         """Генерація ключа кешу"""
@@ -24,78 +23,65 @@ class ResponseCache:
         ).hexdigest()
     
     def _normalize_query(self, query: str) -> str:
-        """Нормалізація запиту для кешу"""
+        """
+        Нормалізація запиту для кешу: стемінг, синоніми, варіанти написання,
+        порядок слів не важливий (див. TextNormalizer)
+        """
         if not query:
             return ""
+        return TextNormalizer.cache_key(query)
+    
+    def make_key(self, query: str, fingerprint: str) -> Optional[str]:
+        """
+        Ключ кешу для запиту
         
-        # Приводимо до нижнього регістру
-        normalized = query.lower().strip()
-        
-        # Видаляємо зайві пробіли
-        normalized = re.sub(r'\s+', ' ', normalized)
-        
-        # Видаляємо пунктуацію (крім питальних знаків)
-        normalized = re.sub(r'[^\w\s?]', '', normalized)
-        
-        # Сортуємо слова для однакових питань з різним порядком
-        words = normalized.split()
-        return ' '.join(sorted(set(words)))  # Видаляємо дублікати
+        fingerprint - відбиток контексту з ідентифікаторів та версій секцій бази знань
+        (KnowledgeService.get_context_fingerprint), обчислений один раз на запит
+        """
+        if not query or not fingerprint:
+            return None
+        return self._get_cache_key(query, fingerprint)
+    
+    def __contains__(self, key: str) -> bool:
+        """Чи є живий запис за ключем make_key (без впливу на LRU та лічильники)"""
+        return key in self.cache
     
-    def get(self, query: str, context: Dict) -> Optional[str]:
+    def get(self, query: str, fingerprint: str, question_type: Optional[str] = None) -> Optional[str]:
         """Отримання з кешу"""
-        if not query or not context:
+        key = self.make_key(query, fingerprint)
+        if key is None:
             return None
         
-        try:
-            context_hash = hashlib.md5(
-                json.dumps(context, sort_keys=True, ensure_ascii=False).encode('utf-8')
-            ).hexdigest()
-        except (TypeError, ValueError):
-            # Якщо не вдалося серіалізувати контекст, не використовуємо кеш
-            return None
-        
-        key = self._get_cache_key(query, context_hash)
-        
-        if key in self.cache:
-            entry = self.cache[key]
-            
-            # Перевіряємо TTL
-            if datetime.now() - entry["timestamp"] < self.ttl:
-                return entry["response"]
-            else:
-                # Видаляємо застарілий запис
-                del self.cache[key]
-        
-        return None
+        entry = self.cache.get(key, question_type)
+        return entry["response"] if entry is not None else None
     
-    def set(self, query: str, context: Dict, response: str):
-        """Збереження в кеш"""
-        if not query or not response:
+    def set(
+        self,
+        query: str,
+        fingerprint: str,
+        response: str,
+        question_type: Optional[str] = None,
+        tags: Iterable[str] = ()
+    ):
+        """Збереження в кеш (найдавніше використані записи витісняються за лімітом байтів)"""
+        if not response:
             return
         
-        # Якщо кеш переповнений - видаляємо найстаріший
-        if len(self.cache) >= self.max_size:
-            oldest_key = min(
-                self.cache.keys(),
-                key=lambda k: self.cache[k]["timestamp"]
-            )
-            del self.cache[oldest_key]
-        
-        try:
-            context_hash = hashlib.md5(
-                json.dumps(context, sort_keys=True, ensure_ascii=False).encode('utf-8')
-            ).hexdigest()
-        except (TypeError, ValueError):
-            # Якщо не вдалося серіалізувати контекст, не зберігаємо в кеш
+        key = self.make_key(query, fingerprint)
+        if key is None:
             return
         
-        key = self._get_cache_key(query, context_hash)
-        
-        self.cache[key] = {
-            "response": response,
-            "timestamp": datetime.now(),
-            "query": query
-        }
+        self.cache.set(
+            key,
+            {"response": response, "query": query},
+            text_size(response, query, key),
+            question_type,
+            tags
+        )
+    
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """Видалення записів, що залежать від змінених даних (за тегами)"""
+        return self.cache.invalidate_tags(tags)
     
     def clear(self):
         """Очищення кешу"""
@@ -103,9 +89,5 @@ class ResponseCache:
     
     def get_stats(self) -> Dict:
         """Статистика кешу"""
-        return {
-            "size": len(self.cache),
-            "max_size": self.max_size,
-            "usage_percent": (len(self.cache) / self.max_size) * 100 if self.max_size > 0 else 0
-        }
+        return self.cache.get_stats()
 
@@ -0,0 +1,204 @@
+"""
+Спільне ядро кешів: LRU + TTL з обмеженням пам'яті в байтах
+Ефект: get/set/витіснення за O(1) та лічильники hit/miss/eviction за типами питань,
+щоб розмір кешів підбирати за вимірами
+"""
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+
+# Приблизні накладні витрати Python на один запис (dict, ключ, OrderedDict-вузли)
+ENTRY_OVERHEAD = 256
+
+
+def text_size(*parts: Optional[str]) -> int:
+    """Розмір рядків у байтах (UTF-8) - оцінка пам'яті запису"""
+    return sum(len(part.encode("utf-8")) for part in parts if part)
+
+
+class CacheEntry:
+    __slots__ = ("value", "size", "expires_at", "question_type", "tags")
+
+    def __init__(self, value: Any, size: int, expires_at: float, question_type: str, tags: Tuple[str, ...]):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.question_type = question_type
+        self.tags = tags
+
+
+class CacheCore:
+    """
+    LRU-кеш з TTL та лімітом у байтах
+
+    Порядок записів - від найдавніше використаного до найсвіжішого (LRU).
+    Окремий порядок вставки дає час закінчення TTL: при однаковому TTL
+    найстаріший вставлений запис спливає першим, тож прострочені записи
+    прибираються з початку черги без повного проходу.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl_seconds: float,
+        on_remove: Optional[Callable[[str, Any], None]] = None
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        # Викликається при будь-якому видаленні запису (витіснення, TTL, заміна, delete)
+        self.on_remove = on_remove
+
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._by_insertion: "OrderedDict[str, None]" = OrderedDict()
+        # Тег залежності -> ключі записів (для вибіркової інвалідації)
+        self._tags: Dict[str, Set[str]] = defaultdict(set)
+        self.bytes = 0
+
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _type_stats(self, question_type: Optional[str]) -> Dict[str, int]:
+        key = question_type or "unknown"
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = {
+                "hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expired": 0, "invalidated": 0
+            }
+        return stats
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.peek(key) is not None
+
+    def get(self, key: str, question_type: Optional[str] = None) -> Any:
+        """Значення за ключем (оновлює LRU та лічильники hit/miss) або None"""
+        value = self.peek(key)
+        if value is None:
+            self.record_miss(question_type)
+            return None
+        self.touch(key, question_type)
+        return value
+
+    def peek(self, key: str) -> Any:
+        """Значення без оновлення LRU та лічильників (для оцінки кандидатів)"""
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            return None
+        return entry.value
+
+    def touch(self, key: str, question_type: Optional[str] = None):
+        """Позначити запис використаним (hit, знайдений через peek)"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self._type_stats(question_type)["hits"] += 1
+
+    def record_miss(self, question_type: Optional[str] = None):
+        self._type_stats(question_type)["misses"] += 1
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        size: int,
+        question_type: Optional[str] = None,
+        tags: Iterable[str] = ()
+    ):
+        """
+        Збереження запису; витісняє найдавніше використані, поки не вистачить місця
+
+        tags - від чого залежить запис (див. invalidate_tags)
+        """
+        size += ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+
+        self.purge_expired()
+        if key in self._entries:
+            self._remove(key)
+
+        while self._entries and self.bytes + size > self.max_bytes:
+            lru_key = next(iter(self._entries))
+            self._type_stats(self._entries[lru_key].question_type)["evictions"] += 1
+            self._remove(lru_key)
+
+        tags = tuple(tags)
+        self._entries[key] = CacheEntry(value, size, time.monotonic() + self.ttl, question_type, tags)
+        self._by_insertion[key] = None
+        for tag in tags:
+            self._tags[tag].add(key)
+        self.bytes += size
+        self._type_stats(question_type)["sets"] += 1
+
+    def delete(self, key: str) -> bool:
+        if key not in self._entries:
+            return False
+        self._remove(key)
+        return True
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Видалення всіх записів з будь-яким із тегів; повертає кількість видалених"""
+        keys: Set[str] = set()
+        for tag in tags:
+            keys.update(self._tags.get(tag, ()))
+        for key in keys:
+            self._type_stats(self._entries[key].question_type)["invalidated"] += 1
+            self._remove(key)
+        return len(keys)
+
+    def purge_expired(self):
+        """Видалення прострочених записів з початку черги вставки"""
+        now = time.monotonic()
+        while self._by_insertion:
+            oldest_key = next(iter(self._by_insertion))
+            entry = self._entries[oldest_key]
+            if entry.expires_at > now:
+                break
+            self._type_stats(entry.question_type)["expired"] += 1
+            self._remove(oldest_key)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        del self._by_insertion[key]
+        self.bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        if self.on_remove is not None:
+            self.on_remove(key, entry.value)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_insertion.clear()
+        self._tags.clear()
+        self.bytes = 0
+
+    def get_stats(self) -> Dict:
+        hits = sum(s["hits"] for s in self.stats.values())
+        misses = sum(s["misses"] for s in self.stats.values())
+        return {
+            "size": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "usage_percent": (self.bytes / self.max_bytes * 100) if self.max_bytes > 0 else 0,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (hits / (hits + misses) * 100) if hits + misses > 0 else 0,
+            "evictions": sum(s["evictions"] for s in self.stats.values()),
+            "expired": sum(s["expired"] for s in self.stats.values()),
+            "invalidated": sum(s["invalidated"] for s in self.stats.values()),
+            "by_question_type": {
+                q_type: {
+                    **counts,
+                    "hit_rate": (
+                        counts["hits"] / (counts["hits"] + counts["misses"]) * 100
+                        if counts["hits"] + counts["misses"] > 0 else 0
+                    )
+                }
+                for q_type, counts in self.stats.items()
+            }
+        }
@@ -0,0 +1,76 @@
+"""
+Теги залежностей записів кешу відповідей (секції бази знань, вартість навчання)
+Ефект: зміна ціни адміністратором інвалідує лише відповіді, що від неї залежать,
+тож кеші можуть жити довго без ризику віддати застарілу вартість
+"""
+from typing import List, Optional, Tuple
+
+
+# Усі відповіді, що залежать від вартості навчання
+TAG_TUITION = "tuition"
+# Відповіді про вартість без конкретної спеціальності (загальні суми, діапазони)
+TAG_TUITION_GENERAL = "tuition:general"
+
+# Уривки бази знань (services/passage_index.py) з розділу про вартість навчання
+TUITION_PASSAGE_PREFIXES = ("kb:tuition", "text:Вартість навчання")
+
+
+def section_tag(name: str) -> str:
+    return f"section:{name}"
+
+
+def specialty_tag(name: str) -> str:
+    """Тег спеціальності за назвою (без коду в дужках, без регістру)"""
+    return f"specialty:{name.split('(')[0].strip().lower()}"
+
+
+def specialty_code_tag(code: str) -> str:
+    return f"specialty_code:{code.strip().upper()}"
+
+
+def specialty_tags(specialty_name: Optional[str] = None, specialty_code: Optional[str] = None) -> List[str]:
+    """
+    Теги спеціальності за всіма її назвами й кодами (tuition_helper.resolve_specialty)
+
+    Питання лише з кодом ("скільки коштує F2") і зміна вартості лише за назвою
+    ("Інженерія програмного забезпечення") дають спільні теги.
+    """
+    from tuition_helper import resolve_specialty
+    names, codes = resolve_specialty(specialty_name, specialty_code)
+    return [specialty_tag(name) for name in sorted(names)] + [specialty_code_tag(code) for code in sorted(codes)]
+
+
+def fingerprint_sections(fingerprint: str) -> List[str]:
+    """Назви секцій з відбитку контексту ("contacts@1a2b;tuition@3c4d")"""
+    if not fingerprint:
+        return []
+    return [part.split("@", 1)[0] for part in fingerprint.split(";") if part]
+
+
+def build_cache_tags(query: str, fingerprint: str, question_type: Optional[str]) -> Tuple[str, ...]:
+    """Теги запису: секції контексту та (для питань про вартість) спеціальність з питання"""
+    sections = fingerprint_sections(fingerprint)
+    tags = [section_tag(name) for name in sections]
+
+    depends_on_tuition = any(
+        name == "tuition" or name.startswith(TUITION_PASSAGE_PREFIXES) for name in sections
+    )
+    if question_type == "tuition" or depends_on_tuition:
+        tags.append(TAG_TUITION)
+        from tuition_helper import extract_specialty_from_message
+        specialty = specialty_tags(*extract_specialty_from_message(query or ""))
+        tags.extend(specialty or [TAG_TUITION_GENERAL])
+
+    return tuple(tags)
+
+
+def tuition_change_tags(specialty_name: Optional[str] = None, specialty_code: Optional[str] = None) -> List[str]:
+    """
+    Теги, які інвалідує зміна вартості спеціальності
+
+    Без назви й коду (видалення всіх вартостей) - усі відповіді про вартість.
+    """
+    if not specialty_name and not specialty_code:
+        return [TAG_TUITION]
+
+    return [TAG_TUITION_GENERAL] + specialty_tags(specialty_name, specialty_code)
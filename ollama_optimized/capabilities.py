@@ -0,0 +1,129 @@
+"""
+Визначення можливостей сервера OLLAMA (версія, chat API, keep_alive, моделі)
+Ефект: запит одразу йде на правильний API без пробних викликів у кожній спробі
+"""
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+from ollama_optimized.transport import OllamaTransport
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Версії OLLAMA, з яких з'явилися відповідні можливості
+CHAT_API_SINCE = (0, 1, 14)
+KEEP_ALIVE_SINCE = (0, 1, 23)
+PS_API_SINCE = (0, 1, 38)
+
+
+def parse_version(version: Optional[str]) -> Optional[Tuple[int, ...]]:
+    """'0.1.32' / 'v0.3.12-rc1' -> (0, 1, 32) / (0, 3, 12)"""
+    if not version:
+        return None
+    match = re.search(r"(\d+)\.(\d+)(?:\.(\d+))?", version)
+    if not match:
+        return None
+    return tuple(int(part or 0) for part in match.groups())
+
+
+class OllamaCapabilities:
+    """Результат одноразової перевірки можливостей сервера"""
+
+    def __init__(
+        self,
+        version: Optional[str] = None,
+        supports_chat: bool = True,
+        supports_keep_alive: bool = True,
+        available_models: List[str] = None,
+        loaded_models: List[str] = None
+    ):
+        self.version = version
+        self.supports_chat = supports_chat
+        self.supports_keep_alive = supports_keep_alive
+        self.available_models = available_models or []
+        self.loaded_models = loaded_models or []
+        self.probed_at = time.time()
+
+    @classmethod
+    def from_version(cls, version: Optional[str]) -> "OllamaCapabilities":
+        """Можливості за версією (невідома версія - вважаємо сервер сучасним)"""
+        parsed = parse_version(version)
+        if parsed is None:
+            return cls(version=version)
+        return cls(
+            version=version,
+            supports_chat=parsed >= CHAT_API_SINCE,
+            supports_keep_alive=parsed >= KEEP_ALIVE_SINCE
+        )
+
+    def has_model(self, model: str) -> bool:
+        """Чи є модель на сервері (tag 'latest' можна не вказувати)"""
+        if not self.available_models:
+            return True
+        names = set(self.available_models)
+        return model in names or f"{model}:latest" in names
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": self.version,
+            "supports_chat": self.supports_chat,
+            "supports_keep_alive": self.supports_keep_alive,
+            "available_models": self.available_models,
+            "loaded_models": self.loaded_models,
+            "probed_at": self.probed_at
+        }
+
+
+async def probe_capabilities(transport: OllamaTransport) -> Optional[OllamaCapabilities]:
+    """
+    Перевірка сервера: /api/version, /api/tags та /api/ps (якщо підтримується)
+
+    Returns:
+        Можливості сервера або None, якщо сервер недоступний
+    """
+    version = None
+    reachable = False
+    try:
+        async with transport.get("/api/version", timeout=5) as response:
+            if response.status == 200:
+                reachable = True
+                data = await response.json()
+                version = data.get("version")
+    except Exception as e:
+        logger.debug(f"OLLAMA {transport.base_url}: /api/version недоступний: {e}")
+
+    capabilities = OllamaCapabilities.from_version(version)
+
+    try:
+        async with transport.get("/api/tags", timeout=5) as response:
+            if response.status == 200:
+                reachable = True
+                data = await response.json()
+                capabilities.available_models = [
+                    m.get("name") for m in data.get("models", []) if m.get("name")
+                ]
+    except Exception as e:
+        logger.debug(f"OLLAMA {transport.base_url}: /api/tags недоступний: {e}")
+
+    if not reachable:
+        return None
+
+    parsed = parse_version(version)
+    if parsed is None or parsed >= PS_API_SINCE:
+        try:
+            async with transport.get("/api/ps", timeout=5) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    capabilities.loaded_models = [
+                        m.get("name") for m in data.get("models", []) if m.get("name")
+                    ]
+        except Exception:
+            pass
+
+    logger.info(
+        f"OLLAMA {transport.base_url}: версія {version or 'невідома'}, "
+        f"chat API: {capabilities.supports_chat}, keep_alive: {capabilities.supports_keep_alive}, "
+        f"моделей: {len(capabilities.available_models)}"
+    )
+    return capabilities
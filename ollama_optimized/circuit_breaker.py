@@ -0,0 +1,172 @@
+"""
+Запобіжник (circuit breaker) для викликів OLLAMA та бюджет часу/спроб на один запит
+Ефект: коли OLLAMA недоступна, користувач одразу отримує кеш або детерміновану відповідь
+"""
+import time
+from typing import Dict, Optional
+from config import (
+    OLLAMA_BREAKER_THRESHOLD, OLLAMA_BREAKER_RECOVERY,
+    RESPONSE_TIMEOUT, OLLAMA_RETRY_BUDGET
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """OLLAMA тимчасово не викликається (запобіжник розімкнено)"""
+
+
+class RequestBudgetExceeded(Exception):
+    """Вичерпано час або кількість спроб для одного запиту користувача"""
+
+
+class CircuitBreaker:
+    """Спільний для всіх запитів запобіжник: closed -> open -> half_open -> closed"""
+
+    def __init__(
+        self,
+        failure_threshold: int = OLLAMA_BREAKER_THRESHOLD,
+        recovery_timeout: float = OLLAMA_BREAKER_RECOVERY,
+        probe_timeout: float = RESPONSE_TIMEOUT
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        # Пробний запит не може тривати довше за дедлайн відповіді - завислий замінюється новим
+        self.probe_timeout = probe_timeout
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = STATE_HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Чи можна зараз звертатися до OLLAMA"""
+        state = self.state
+        if state == STATE_CLOSED:
+            return True
+        if state == STATE_HALF_OPEN and (
+            not self._probe_in_flight
+            or time.monotonic() - self._probe_started >= self.probe_timeout
+        ):
+            # Один пробний запит перевіряє, чи OLLAMA відновилась
+            self._probe_in_flight = True
+            self._probe_started = time.monotonic()
+            return True
+        self.rejected += 1
+        return False
+
+    def check(self, probe: bool = False) -> bool:
+        """
+        Args:
+            probe: запит уже є пробним (повторна спроба чи перехід на інший endpoint
+                того самого запиту) - власний пробний слот його не блокує
+
+        Returns:
+            True, якщо запит пробний: після нього обов'язковий release_probe()
+
+        Raises:
+            CircuitOpenError: якщо запобіжник розімкнено
+        """
+        if probe and self._probe_in_flight and self.state == STATE_HALF_OPEN:
+            return True
+        if not self.allow_request():
+            raise CircuitOpenError("OLLAMA тимчасово недоступна (circuit breaker)")
+        return self._state == STATE_HALF_OPEN
+
+    def release_probe(self):
+        """
+        Пробний запит завершився без результату (черга, бюджет, скасування) -
+        наступний запит може стати пробним. Після record_success/record_failure нічого не робить.
+        """
+        if self._state == STATE_HALF_OPEN:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        if self._state != STATE_CLOSED:
+            logger.info("Circuit breaker OLLAMA замкнено: сервер знову відповідає")
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != STATE_OPEN:
+                self.times_opened += 1
+                logger.warning(
+                    f"Circuit breaker OLLAMA розімкнено на {self.recovery_timeout:.0f}s "
+                    f"після {self._failures} помилок поспіль"
+                )
+            self._state = STATE_OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def get_stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
+
+
+class RequestBudget:
+    """Кінцевий дедлайн і ліміт HTTP-спроб, спільні для всіх регенерацій одного запиту"""
+
+    def __init__(self, deadline: float, max_attempts: int):
+        self.deadline_at = time.monotonic() + deadline
+        self.attempts_left = max_attempts
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline_at - time.monotonic())
+
+    @property
+    def exhausted(self) -> bool:
+        return self.attempts_left <= 0 or self.remaining() <= 0
+
+    def take_attempt(self) -> bool:
+        """Резервує одну HTTP-спробу; False якщо бюджет вичерпано"""
+        if self.exhausted:
+            return False
+        self.attempts_left -= 1
+        return True
+
+    def refund(self):
+        """Повертає спробу, яка не дійшла до OLLAMA (endpoint недоступний, запит піде на інший)"""
+        self.attempts_left += 1
+
+    def timeout(self, default: float) -> float:
+        """Таймаут для одного HTTP-запиту з урахуванням залишку часу"""
+        return min(default, self.remaining())
+
+    def check(self):
+        """
+        Raises:
+            RequestBudgetExceeded: якщо часу або спроб не залишилось
+        """
+        if self.exhausted:
+            raise RequestBudgetExceeded("Вичерпано бюджет часу/спроб на відповідь")
+
+
+def new_budget(deadline: Optional[float] = None, max_attempts: Optional[int] = None) -> RequestBudget:
+    """Бюджет запиту з налаштувань за замовчуванням"""
+    return RequestBudget(
+        RESPONSE_TIMEOUT if deadline is None else deadline,
+        OLLAMA_RETRY_BUDGET if max_attempts is None else max_attempts
+    )
@@ -1,40 +1,100 @@
 """
 Оптимізований клієнт OLLAMA з усіма покращеннями
 """
-import aiohttp
 import asyncio
 import time
 import json
 import re
-from typing import Optional, Dict, List, AsyncGenerator
-from config import OLLAMA_API_URL, OLLAMA_MODEL
-from ollama_optimized.prompt_builder import PromptBuilder
+from typing import Optional, Dict, List, Tuple, AsyncGenerator
+from config import (
+    OLLAMA_API_URL, OLLAMA_MODEL, OLLAMA_RETRY_BUDGET, OLLAMA_KEEP_ALIVE,
+    OLLAMA_PARALLEL_MODE, OLLAMA_RACE_SCORE_THRESHOLD, OLLAMA_HEDGE_PERCENTILE,
+    CACHE_INVALIDATION_POLL_INTERVAL
+)
+from ollama_optimized.prompt_builder import PromptBuilder, PromptMessages
 from ollama_optimized.context_optimizer import ContextOptimizer
 from ollama_optimized.question_classifier import QuestionClassifier
 from ollama_optimized.cache import ResponseCache
 from ollama_optimized.semantic_cache import SemanticCache
+from ollama_optimized.persistent_cache import PersistentCache, knowledge_version
+from ollama_optimized.shared_cache import SharedCache
+from ollama_optimized.cache_tags import build_cache_tags, tuition_change_tags
 from ollama_optimized.validators.multi_level import MultiLevelValidator
 from ollama_optimized.metrics.collector import MetricsCollector
+from ollama_optimized.metrics.tracing import Tracer
+from ollama_optimized.metrics.ollama_timings import OllamaTimings
+from ollama_optimized.transport import OllamaTransport, OllamaRequestError, CONNECTION_ERRORS
+from ollama_optimized.endpoint_pool import EndpointPool, OllamaEndpoint
+from ollama_optimized.circuit_breaker import (
+    CircuitBreaker, CircuitOpenError, RequestBudget, RequestBudgetExceeded, new_budget, STATE_OPEN
+)
+from ollama_optimized.single_flight import SingleFlight
+from ollama_optimized.warmup import preload_model, prime_prompt
+from ollama_optimized.generation_queue import (
+    GenerationScheduler, GenerationShed,
+    PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+)
+from ollama_optimized.embeddings import OllamaEmbedder
 from services.knowledge_service import KnowledgeService
+from services.embedding_index import get_embedding_index, build_embedding_index
+from services.passage_index import get_passage_index
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Додається до частково показаної відповіді, якщо streaming обірвався
+STREAM_INTERRUPTED_NOTE = "\n\n⚠️ Відповідь обірвалася через помилку. Спробуй запитати ще раз."
+
+# Початок службових відповідей (помилка, перевантаження) - такі відповіді ніколи не кешуються
+UNCACHEABLE_PREFIXES = (
+    "Вибач, не вдалося",
+    "Вибач, сталася помилка",
+    "Вибач, не зрозумів",
+    "⏳ Зараз дуже багато запитів",
+)
+
+
+def is_cacheable(response: Optional[str]) -> bool:
+    """Чи можна зберігати відповідь у кеш (не порожня і не службова)"""
+    if not response:
+        return False
+    return (
+        not response.lstrip().startswith(UNCACHEABLE_PREFIXES)
+        and STREAM_INTERRUPTED_NOTE.strip() not in response
+    )
+
+
 class OptimizedOllamaClient:
     """Оптимізований клієнт OLLAMA з кешуванням, валідацією та метриками"""
     
     def __init__(self):
         self.api_url = OLLAMA_API_URL
         self.model = OLLAMA_MODEL
-        self.prompt_builder = PromptBuilder()
         self.context_optimizer = ContextOptimizer()
         self.question_classifier = QuestionClassifier()
-        self.cache = ResponseCache(max_size=200)
-        self.semantic_cache = SemanticCache(max_size=200, similarity_threshold=0.7)
+        self.cache = ResponseCache()
+        self.semantic_cache = SemanticCache(similarity_threshold=0.7)
         self.validator = MultiLevelValidator()
         self.metrics = MetricsCollector()
+        self.tracer = Tracer()
         self.knowledge_service = KnowledgeService()
+        # Постійний рівень кешу переживає перезапуски; версія - відбиток бази знань
+        kb_version = knowledge_version(self.knowledge_service.get_knowledge_base())
+        # Системні промпти мемоізуються в межах версії бази знань
+        self.prompt_builder = PromptBuilder(knowledge_version=kb_version)
+        self.persistent_cache = PersistentCache(version=kb_version)
+        # Спільний кеш у PostgreSQL: репліки бота бачать генерації одна одної
+        self.shared_cache = SharedCache(version=kb_version)
+        self.endpoints = EndpointPool.from_config()
+        # Вектори питань для необов'язкового embedding-пошуку уривків
+        self.embedder = OllamaEmbedder(self.endpoints)
+        self.single_flight = SingleFlight()
+        # Окремо для streaming: послідовники отримують повну відповідь лідера
+        self.stream_flight = SingleFlight()
+        self.scheduler = GenerationScheduler()
+        self.breaker = CircuitBreaker()
+        self._invalidation_task: Optional[asyncio.Task] = None
         
         # Адаптивні параметри генерації (оптимізовані для кращого розуміння)
         self.generation_params = {
@@ -89,6 +149,33 @@ class OptimizedOllamaClient:
             }
         }
     
+    async def start(self):
+        """
+        Відкриття HTTP-сесій до OLLAMA endpoint-ів, фонової перевірки здоров'я, постійного кешу
+        та читання журналу інвалідацій інших реплік
+        """
+        await self.endpoints.start()
+        await self.persistent_cache.start()
+        if (
+            self._invalidation_task is None
+            and self.shared_cache.enabled
+            and CACHE_INVALIDATION_POLL_INTERVAL > 0
+        ):
+            self._invalidation_task = asyncio.create_task(self._invalidation_loop())
+    
+    async def close(self):
+        """Закриття HTTP-сесій та скидання постійного кешу (викликається при зупинці бота)"""
+        if self._invalidation_task is not None:
+            self._invalidation_task.cancel()
+            try:
+                await self._invalidation_task
+            except asyncio.CancelledError:
+                pass
+            self._invalidation_task = None
+        await self.endpoints.close()
+        await self.shared_cache.close()
+        await self.persistent_cache.close()
+    
     async def generate_response(
         self, 
         prompt: str, 
@@ -99,77 +186,329 @@ class OptimizedOllamaClient:
         Оптимізована генерація відповіді з кешуванням та адаптивними параметрами
         """
         start_time = time.time()
+        budget = new_budget()
         
         if not prompt:
             return "Вибач, не зрозумів питання. Спробуй переформулювати."
         
-        # 1. Класифікуємо питання
-        question_type = self.question_classifier.classify(prompt)
+        with self.tracer.trace("generate", prompt):
+            # 1-2. Класифікація та оптимізований контекст
+            question_type, optimized_context, fingerprint = self._prepare_context(prompt)
+        
+            # 3. Перевіряємо кеш (спочатку точний, потім семантичний)
+            if use_cache:
+                # Точний пошук
+                with self.tracer.span("cache_exact"):
+                    cached_response = self.cache.get(prompt, fingerprint, question_type)
+                if cached_response:
+                    self.tracer.annotate(cache="exact")
+                    response_time = time.time() - start_time
+                    self.metrics.record_request(
+                        prompt, cached_response, response_time, 
+                        from_cache=True, question_type=question_type, validation_passed=True
+                    )
+                    logger.info(f"Exact cache hit for question type: {question_type}")
+                    return cached_response
+            
+                # Семантичний пошук
+                with self.tracer.span("cache_semantic"):
+                    semantic_result = self.semantic_cache.get(prompt, fingerprint, question_type)
+                if semantic_result:
+                    self.tracer.annotate(cache="semantic")
+                    cached_response, similarity = semantic_result
+                    response_time = time.time() - start_time
+                    self.metrics.record_request(
+                        prompt, cached_response, response_time, 
+                        from_cache=True, question_type=question_type, validation_passed=True
+                    )
+                    logger.info(f"Semantic cache hit (similarity: {similarity:.2f}) for question type: {question_type}")
+                    return cached_response
+            
+                with self.tracer.span("cache_key"):
+                    flight_key = self.cache.make_key(prompt, fingerprint)
+                
+                # Постійний та спільний рівні (збережені до перезапуску / згенеровані іншими репліками)
+                cached_response = await self._lower_tier_lookup(flight_key, prompt, fingerprint, question_type)
+                if cached_response:
+                    response_time = time.time() - start_time
+                    self.metrics.record_request(
+                        prompt, cached_response, response_time, 
+                        from_cache=True, question_type=question_type, validation_passed=True
+                    )
+                    logger.info(f"Lower-tier cache hit for question type: {question_type}")
+                    return cached_response
+                
+                # Однакове питання вже генерується - чекаємо на результат лідера
+                if flight_key:
+                    waited = time.perf_counter()
+                    response, coalesced = await self.single_flight.do(
+                        flight_key,
+                        lambda: self._generate_or_shed(
+                            self._generate_fresh(
+                                prompt, context, question_type, optimized_context, fingerprint,
+                                use_cache, start_time, budget
+                            ),
+                            prompt, question_type, start_time
+                        )
+                    )
+                    if coalesced:
+                        self._record_coalesced(prompt, response, start_time, question_type, waited)
+                    return response
+        
+            return await self._generate_or_shed(
+                self._generate_fresh(
+                    prompt, context, question_type, optimized_context, fingerprint,
+                    use_cache, start_time, budget
+                ),
+                prompt, question_type, start_time
+            )
+    
+    async def _query_vector(self, prompt: str) -> Optional[List[float]]:
+        """Вектор питання, якщо embedding-індекс побудовано (інакше - лише BM25)"""
+        if not get_embedding_index().available:
+            return None
+        with self.tracer.span("embed_query"):
+            return await self.embedder.embed_query(prompt)
+    
+    def _prepare_context(self, prompt: str) -> Tuple[str, Dict, str]:
+        """
+        Класифікація питання, оптимізований контекст та його відбиток для ключів кешу
+        (з трасуванням етапів)
         
-        # 2. Отримуємо оптимізований контекст
-        full_context = self.knowledge_service.get_context_for_prompt(prompt)
-        optimized_context = self.context_optimizer.optimize_context(
-            prompt, 
-            full_context["structured_json"]
-        )
+        Лише BM25: ключ кешу не залежить від вектора питання, тож перевірка кешу
+        не чекає на embeddings (вони уточнюють уривки в _build_prompt, після промаху).
+        """
+        with self.tracer.span("classify"):
+            question_type = self.question_classifier.classify(prompt)
+        self.tracer.annotate(question_type=question_type)
         
-        # 3. Перевіряємо кеш (спочатку точний, потім семантичний)
-        if use_cache:
-            # Точний пошук
-            cached_response = self.cache.get(prompt, optimized_context)
-            if cached_response:
-                response_time = time.time() - start_time
-                self.metrics.record_request(
-                    prompt, cached_response, response_time, 
-                    from_cache=True, question_type=question_type, validation_passed=True
-                )
-                logger.info(f"Exact cache hit for question type: {question_type}")
-                return cached_response
-            
-            # Семантичний пошук
-            semantic_result = self.semantic_cache.get(prompt, optimized_context)
-            if semantic_result:
-                cached_response, similarity = semantic_result
-                response_time = time.time() - start_time
-                self.metrics.record_request(
-                    prompt, cached_response, response_time, 
-                    from_cache=True, question_type=question_type, validation_passed=True
+        with self.tracer.span("knowledge_context"):
+            full_context = self.knowledge_service.get_context_for_prompt(prompt)
+        with self.tracer.span("context_optimize"):
+            passages = full_context.get("passages", ())
+            if passages:
+                # Найрелевантніші уривки замість цілих секцій (кожен - окремим ключем,
+                # щоб відбиток їх розрізняв)
+                optimized_context = {passage.id: passage.text for passage in passages}
+            else:
+                # Пошук нічого не знайшов - секції бази знань за намірами питання
+                optimized_context = self.context_optimizer.optimize_context(
+                    prompt,
+                    full_context["structured_json"]
                 )
-                logger.info(f"Semantic cache hit (similarity: {similarity:.2f}) for question type: {question_type}")
-                return cached_response
+            fingerprint = self.knowledge_service.get_context_fingerprint(optimized_context)
+        return question_type, optimized_context, fingerprint
+    
+    async def _lower_tier_lookup(
+        self,
+        cache_key: Optional[str],
+        prompt: str,
+        fingerprint: str,
+        question_type: str
+    ) -> Optional[str]:
+        """
+        Пошук у постійному (локальний диск), а потім у спільному (PostgreSQL) кеші;
+        знайдена відповідь повертається в кеші в пам'яті (L1)
+        """
+        with self.tracer.span("cache_persistent"):
+            response = self.persistent_cache.get(cache_key)
+        from_shared = not is_cacheable(response)
+        if from_shared:
+            with self.tracer.span("cache_shared"):
+                response = await self.shared_cache.get(cache_key)
+            # Службові тексти, збережені старими версіями, - теж промах
+            if not is_cacheable(response):
+                return None
+        self.tracer.annotate(cache="shared" if from_shared else "persistent")
+        
+        tags = build_cache_tags(prompt, fingerprint, question_type)
+        if from_shared:
+            self.persistent_cache.set(cache_key, prompt, response, question_type, tags)
+        self.cache.set(prompt, fingerprint, response, question_type, tags)
+        self.semantic_cache.set(prompt, fingerprint, response, question_type, tags)
+        return response
+    
+    def _store_response(self, prompt: str, fingerprint: str, response: str, question_type: str) -> bool:
+        """
+        Збереження відповіді в усі рівні кешу (постійний і спільний - у фоні)
         
-        # 4. Аналізуємо питання для кращого розуміння
-        analyzed_query = self._analyze_and_enhance_query(prompt, question_type)
+        Returns:
+            False, якщо відповідь службова (помилка, перевантаження, обірваний streaming) і не збережена
+        """
+        if not is_cacheable(response):
+            logger.warning(f"Службову відповідь не кешуємо: {prompt[:50]}")
+            return False
+        tags = build_cache_tags(prompt, fingerprint, question_type)
+        self.cache.set(prompt, fingerprint, response, question_type, tags)
+        self.semantic_cache.set(prompt, fingerprint, response, question_type, tags)
+        cache_key = self.cache.make_key(prompt, fingerprint)
+        self.persistent_cache.set(cache_key, prompt, response, question_type, tags)
+        self.shared_cache.set(cache_key, prompt, response, question_type, tags)
+        return True
+    
+    async def invalidate_cache(self, tags: List[str]) -> Dict:
+        """
+        Видалення відповідей, що залежать від змінених даних, з усіх рівнів кешу
         
-        # 5. Формуємо оптимізований промпт з аналізом питання
-        system_prompt = self.prompt_builder.build_system_prompt(
-            question_type, 
-            optimized_context,
-            user_query=prompt
-        )
+        Зміни бази знань інвалідації не потребують: версія секції входить у ключ запису.
         
-        # 6. Додаємо Chain-of-Thought для складних питань
-        if self._should_use_cot(question_type, prompt):
-            full_prompt = self._build_cot_prompt(system_prompt, analyzed_query)
+        Returns:
+            Кількість видалених записів за рівнями
+        """
+        removed = {
+            "exact": self.cache.invalidate(tags),
+            "semantic": self.semantic_cache.invalidate(tags),
+            "persistent": self.persistent_cache.invalidate(tags),
+            "shared": await self.shared_cache.invalidate(tags)
+        }
+        logger.info(f"Інвалідація кешу відповідей за тегами {tags}: {removed}")
+        return removed
+    
+    async def apply_remote_invalidations(self) -> int:
+        """
+        Інвалідації, зроблені будь-якою реплікою (журнал у PostgreSQL), - у локальних рівнях
+        кешу цього процесу (пам'ять і SQLite), які invalidate_cache інших реплік не бачить
+        
+        Returns:
+            Кількість видалених локальних записів
+        """
+        invalidations = await self.shared_cache.poll_invalidations(since_seconds=self.persistent_cache.ttl)
+        if not invalidations:
+            return 0
+        # Записи з диску мають бути в пам'яті, інакше завантажаться вже після видалення
+        await self.persistent_cache.wait_loaded()
+        removed = 0
+        for tags in invalidations:
+            removed += (
+                self.cache.invalidate(tags)
+                + self.semantic_cache.invalidate(tags)
+                + self.persistent_cache.invalidate(tags)
+            )
+        logger.info(f"Застосовано {len(invalidations)} інвалідацій інших реплік: видалено {removed} записів")
+        return removed
+    
+    async def _invalidation_loop(self):
+        while True:
+            await asyncio.sleep(CACHE_INVALIDATION_POLL_INTERVAL)
+            try:
+                await self.apply_remote_invalidations()
+            except Exception as e:
+                logger.error(f"Помилка застосування інвалідацій кешу: {e}")
+    
+    async def invalidate_tuition(
+        self,
+        specialty_name: Optional[str] = None,
+        specialty_code: Optional[str] = None
+    ) -> Dict:
+        """Інвалідація відповідей про вартість після зміни цін (без аргументів - усіх)"""
+        return await self.invalidate_cache(tuition_change_tags(specialty_name, specialty_code))
+    
+    def _record_coalesced(
+        self,
+        prompt: str,
+        response: str,
+        start_time: float,
+        question_type: str,
+        waited: Optional[float] = None
+    ):
+        """Метрики для запиту, що отримав відповідь іншої (одночасної) генерації"""
+        if waited is not None:
+            self.tracer.record("coalesce_wait", time.perf_counter() - waited, waited)
+        self.tracer.annotate(cache="coalesced")
+        self.metrics.record_coalesced()
+        self.metrics.record_request(
+            prompt, response, time.time() - start_time,
+            from_cache=False, question_type=question_type, validation_passed=True
+        )
+        logger.info(f"Coalesced with in-flight generation for question type: {question_type}")
+    
+    async def _generate_or_shed(
+        self,
+        generation,
+        prompt: str,
+        question_type: str,
+        start_time: float
+    ) -> str:
+        """
+        Виконує генерацію; якщо черга перевантажена, OLLAMA недоступна (circuit breaker)
+        або вичерпано бюджет запиту - повертає детерміновану відповідь
+        """
+        try:
+            return await generation
+        except (GenerationShed, CircuitOpenError, RequestBudgetExceeded) as e:
+            return await self._degraded_response(e, prompt, question_type, start_time)
+    
+    async def _degraded_response(
+        self,
+        error: Exception,
+        prompt: str,
+        question_type: str,
+        start_time: float
+    ) -> str:
+        """Детермінована відповідь замість генерації + метрики"""
+        logger.warning(f"OLLAMA пропущено ({error}), детермінована відповідь: {prompt[:50]}")
+        self.tracer.annotate(degraded=type(error).__name__)
+        with self.tracer.span("degraded_response"):
+            response = await self._get_shed_response(prompt, question_type)
+        if isinstance(error, GenerationShed):
+            self.metrics.record_shed()
         else:
-            # Покращене формулювання питання для моделі
-            full_prompt = f"""{system_prompt}
-
-═══════════════════════════════════════
-ПИТАННЯ КОРИСТУВАЧА:
-{prompt}
-
-ПРОАНАЛІЗОВАНЕ ПИТАННЯ:
-{analyzed_query}
-═══════════════════════════════════════
-
-ТВОЯ ЗАДАЧА:
-1. Уважно прочитай питання
-2. Знайди відповідну інформацію в базі знань вище
-3. Сформуй точну, структуровану відповідь
-4. Перевір відповідь за списком самоперевірки
-
-ВІДПОВІДЬ (структурована, конкретна, з даними з бази знань):"""
+            self.metrics.record_fallback(type(error).__name__)
+        self.metrics.record_request(
+            prompt, response, time.time() - start_time,
+            from_cache=False, question_type=question_type, validation_passed=True
+        )
+        return response
+    
+    def _generation_priority(self, question_type: str, prompt: str) -> int:
+        """Пріоритет у черзі: вступ і вартість першими, довгі CoT промпти останніми"""
+        if question_type in ("admission", "tuition"):
+            return PRIORITY_HIGH
+        if self._should_use_cot(question_type, prompt):
+            return PRIORITY_LOW
+        return PRIORITY_NORMAL
+    
+    async def _get_shed_response(self, prompt: str, question_type: str) -> str:
+        """Детермінована відповідь без OLLAMA (при перевантаженні черги)"""
+        from knowledge_base import get_documents_text, get_admissions_committee_phones
+        
+        if question_type == "tuition":
+            try:
+                from tuition_helper import find_tuition_info, extract_specialty_from_message
+                specialty_name, specialty_code = extract_specialty_from_message(prompt)
+                tuition_info = await find_tuition_info(specialty_name, specialty_code)
+                if tuition_info:
+                    return tuition_info
+            except Exception as e:
+                logger.error(f"Помилка пошуку вартості для детермінованої відповіді: {e}")
+        
+        if question_type == "admission":
+            return self._get_admission_fallback(prompt)
+        
+        if "документ" in prompt.lower():
+            return get_documents_text()
+        
+        return (
+            "⏳ Зараз дуже багато запитів, тому не можу детально відповісти. "
+            "Спробуй, будь ласка, за хвилину або звернися до приймальної комісії ХДУ:\n\n"
+            f"{get_admissions_committee_phones()}"
+        )
+    
+    async def _generate_fresh(
+        self,
+        prompt: str,
+        context: Optional[List[Dict]],
+        question_type: str,
+        optimized_context: Dict,
+        fingerprint: str,
+        use_cache: bool,
+        start_time: float,
+        budget: RequestBudget
+    ) -> str:
+        """Генерація відповіді через OLLAMA (без перевірки кешу)"""
+        prompt_started = time.perf_counter()
+        # 4-6. Структурований промпт (system з пам'яті, історія, питання; CoT для складних питань)
+        full_prompt = await self._build_prompt(prompt, context, question_type, optimized_context, fingerprint)
         
         # 7. Отримуємо параметри генерації (покращені для кращого розуміння)
         params = self.generation_params.get(
@@ -179,20 +518,27 @@ class OptimizedOllamaClient:
         
         # Адаптуємо параметри залежно від довжини питання та складності
         params = self._adapt_params(params, len(prompt))
+        priority = self._generation_priority(question_type, prompt)
+        self.tracer.record("prompt_build", time.perf_counter() - prompt_started, prompt_started)
         
         # Покращені параметри для кращого розуміння (вже оптимізовані вище)
         # Не змінюємо, щоб не зіпсувати оптимізацію
         
-        # 7. Генеруємо відповідь (з контекстом для chat API)
-        response = await self._generate_with_retry(
+        # 7. Генеруємо відповідь (з контекстом для chat API); None - OLLAMA не відповіла
+        response = await self._try_generate(
             full_prompt, 
             params, 
             max_retries=3,
-            context=context if context else []
+            priority=priority,
+            budget=budget,
+            question_type=question_type
         )
         
         # 7.1. Перевірка якості відповіді (мінімальний fallback тільки якщо критично)
         response_lower = response.lower() if response else ""
+        # Деградовані відповіді (fallback з бази знань) не кешуються: після збою OLLAMA
+        # (наприклад, під час прогріву) кеш не має годинами віддавати запасний текст
+        cacheable = True
         
         # Fallback тільки якщо відповідь явно некоректна
         if not response or len(response.strip()) < 30 or "не вдалося" in response_lower:
@@ -200,22 +546,36 @@ class OptimizedOllamaClient:
             if question_type == "admission":
                 logger.warning(f"Критична помилка генерації для вступу, використовуємо fallback: {prompt[:50]}")
                 response = self._get_admission_fallback(prompt)
-            else:
+                cacheable = False
+            elif not budget.exhausted:
                 # Для інших питань - спробуємо регенерувати з кращими параметрами
                 logger.warning(f"Погана відповідь, регенеруємо: {prompt[:50]}")
                 strict_params = params.copy()
                 strict_params["temperature"] = 0.0
                 strict_params["top_p"] = 0.2
                 strict_params["num_predict"] = min(600, params.get("num_predict", 350) * 2)
-                response = await self._generate_with_retry(
-                full_prompt, 
-                strict_params, 
-                max_retries=2,
-                context=context if context else []
+                with self.tracer.span("regeneration"):
+                    response = await self._try_generate(
+                        full_prompt, 
+                        strict_params, 
+                        max_retries=2,
+                        priority=priority,
+                        budget=budget,
+                        question_type=question_type
+                    )
+        
+        if response is None:
+            # OLLAMA так і не відповіла - повідомлення користувачу, яке не кешується
+            response = self._generation_failed_response()
+            self.metrics.record_request(
+                prompt, response, time.time() - start_time,
+                from_cache=False, question_type=question_type, validation_passed=False
             )
+            return response
         
         # 8. Валідуємо відповідь (тільки критичні помилки)
-        validation_result = self.validator.validate(response, prompt)
+        with self.tracer.span("validation"):
+            validation_result = self.validator.validate(response, prompt)
         
         # Регенеруємо тільки при критичних помилках (заборонені університети, порожня відповідь)
         critical_errors = [
@@ -223,7 +583,7 @@ class OptimizedOllamaClient:
             not response or len(response.strip()) < 20
         ]
         
-        if not validation_result.is_valid and any(critical_errors):
+        if not validation_result.is_valid and any(critical_errors) and not budget.exhausted:
             logger.warning(f"Критична помилка валідації: {validation_result.error_message}")
             # Регенеруємо з більш суворими параметрами
             strict_params = params.copy()
@@ -232,30 +592,36 @@ class OptimizedOllamaClient:
             strict_params["repeat_penalty"] = 1.7
             strict_params["num_predict"] = min(600, params.get("num_predict", 400) * 1.5)
             
-            # Додаємо додаткові інструкції в промпт
-            enhanced_prompt = f"""{full_prompt}
-
-⚠️ ВАЖЛИВО: Попередня відповідь містила помилки: {validation_result.error_message}
-Сформуй відповідь ЗНОВУ, уникнувши цих помилок. Використовуй ТІЛЬКИ дані з бази знань вище."""
-            
-            response = await self._generate_with_retry(
-                enhanced_prompt, 
-                strict_params, 
-                max_retries=2,
-                context=context if context else []
+            # Додаємо додаткові інструкції до питання
+            enhanced_prompt = full_prompt.with_note(
+                f"⚠️ ВАЖЛИВО: Попередня відповідь містила помилки: {validation_result.error_message}\n"
+                "Сформуй відповідь ЗНОВУ, уникнувши цих помилок. Використовуй ТІЛЬКИ дані з бази знань вище."
             )
             
+            with self.tracer.span("regeneration"):
+                regenerated = await self._try_generate(
+                    enhanced_prompt, 
+                    strict_params, 
+                    max_retries=2,
+                    priority=priority,
+                    budget=budget,
+                    question_type=question_type
+                )
+            # Регенерація не вдалася - залишається попередня (невалідна, тож не кешована) відповідь
+            response = regenerated or response
+            
             # Повторна валідація
-            validation_result = self.validator.validate(response, prompt)
+            with self.tracer.span("validation"):
+                validation_result = self.validator.validate(response, prompt)
             self.metrics.metrics["regeneration_count"] += 1
         elif not validation_result.is_valid:
             # Не критичні помилки - просто логуємо
             logger.info(f"Не критична помилка валідації: {validation_result.error_message}")
         
         # 9. Зберігаємо в кеш (обидва типи)
-        if validation_result.is_valid and use_cache:
-            self.cache.set(prompt, optimized_context, response)
-            self.semantic_cache.set(prompt, optimized_context, response)
+        if validation_result.is_valid and use_cache and cacheable:
+            with self.tracer.span("cache_store"):
+                self._store_response(prompt, fingerprint, response, question_type)
         
         # 10. Записуємо метрики
         response_time = time.time() - start_time
@@ -340,30 +706,37 @@ class OptimizedOllamaClient:
         # Використовуємо CoT для порівнянь та довгих питань
         return question_type == "comparison" or has_complex_indicator or len(query) > 100
     
-    def _build_cot_prompt(self, system_prompt: str, query: str) -> str:
-        """Побудова промпту з Chain-of-Thought"""
-        cot_instructions = """Відповідай на питання крок за кроком:
-
-КРОК 1: Розуміння питання
-- Про що питають? (спеціальності, вартість, документи, контакти)
-- Яка конкретна інформація потрібна?
-
-КРОК 2: Пошук в базі знань
-- Яка секція бази знань містить відповідь?
-- Які конкретні дані потрібні?
-
-КРОК 3: Формування відповіді
-- Як структурувати відповідь?
-- Які конкретні дані включити?
-
-КРОК 4: Перевірка
-- Чи немає заборонених університетів?
-- Чи правильна орфографія?
-- Чи відповідь відповідає на питання?
-
-ВІДПОВІДЬ (після всіх кроків, структурована, тільки про ХДУ):"""
+    async def _build_prompt(
+        self,
+        prompt: str,
+        context: Optional[List[Dict]],
+        question_type: str,
+        optimized_context: Dict,
+        fingerprint: str
+    ) -> PromptMessages:
+        """
+        Структурований промпт для генерації (системна частина - з пам'яті PromptBuilder)
         
-        return f"{system_prompt}\n\n{cot_instructions}\n\nПИТАННЯ: {query}\n\n"
+        Якщо embedding-індекс побудовано, уривки BM25 замінюються злитим рейтингом;
+        fingerprint тут - відбиток саме цього контексту (для пам'яті системних промптів),
+        а запис кешу лишається під ключем з контексту BM25.
+        """
+        query_vector = await self._query_vector(prompt)
+        if query_vector is not None:
+            with self.tracer.span("knowledge_context"):
+                passages = self.knowledge_service.get_passages(prompt, query_vector=query_vector)
+            if passages:
+                optimized_context = {passage.id: passage.text for passage in passages}
+                fingerprint = self.knowledge_service.get_context_fingerprint(optimized_context)
+        return self.prompt_builder.build_messages(
+            question_type,
+            optimized_context,
+            prompt,
+            fingerprint=fingerprint,
+            history=context,
+            analyzed_query=self._analyze_and_enhance_query(prompt, question_type),
+            cot=self._should_use_cot(question_type, prompt)
+        )
     
     def _adapt_params(self, params: Dict, query_length: int) -> Dict:
         """Адаптація параметрів залежно від довжини питання"""
@@ -379,139 +752,191 @@ class OptimizedOllamaClient:
     
     async def _generate_with_retry(
         self, 
-        prompt: str, 
+        prompt: PromptMessages, 
         params: Dict, 
         max_retries: int = 3,
-        context: List[Dict] = None
+        priority: int = PRIORITY_NORMAL,
+        budget: Optional[RequestBudget] = None,
+        question_type: Optional[str] = None
     ) -> str:
-        """Генерація з повторними спробами (остання версія OLLAMA API)"""
-        last_error = None
-        
-        # Розділяємо системний промпт та питання користувача
-        system_prompt = ""
-        user_message = prompt
-        
-        # Якщо промпт містить розділювач, розділяємо
-        if "═══════════════════════════════════════" in prompt:
-            parts = prompt.split("═══════════════════════════════════════")
-            if len(parts) >= 2:
-                system_prompt = parts[0].strip()
-                # Знаходимо питання користувача
-                for part in parts[1:]:
-                    if "ПИТАННЯ КОРИСТУВАЧА:" in part:
-                        user_lines = part.split("\n")
-                        for i, line in enumerate(user_lines):
-                            if "ПИТАННЯ КОРИСТУВАЧА:" in line and i + 1 < len(user_lines):
-                                user_message = user_lines[i + 1].strip()
-                                break
-        else:
-            # Якщо немає розділювача, весь промпт - це системний
-            system_prompt = prompt
-        
-        # Формуємо повідомлення для chat API
-        messages = []
-        
-        # Додаємо системний промпт
-        if system_prompt:
-            messages.append({
-                "role": "system",
-                "content": system_prompt
-            })
-        
-        # Додаємо контекст попередніх повідомлень
-        if context:
-            for ctx in context:
-                if isinstance(ctx, dict):
-                    if "user_message" in ctx and "bot_response" in ctx:
-                        messages.append({
-                            "role": "user",
-                            "content": ctx["user_message"]
-                        })
-                        messages.append({
-                            "role": "assistant",
-                            "content": ctx["bot_response"]
-                        })
-        
-        # Додаємо поточне питання користувача
-        messages.append({
-            "role": "user",
-            "content": user_message
-        })
+        """
+        Генерація з повторними спробами (остання версія OLLAMA API)
         
-        for attempt in range(max_retries):
-            try:
-                async with aiohttp.ClientSession() as session:
-                    # Використовуємо новий chat API (рекомендований в OLLAMA 0.11+)
-                    payload = {
-                        "model": self.model,
-                        "messages": messages,
-                        "stream": False,
-                        "options": params
-                    }
-                    
-                    # Спробуємо спочатку новий chat API
-                    try:
-                        async with session.post(
-                            f"{self.api_url}/api/chat",
-                            json=payload,
-                            timeout=aiohttp.ClientTimeout(total=60)
-                        ) as response:
-                            if response.status == 200:
-                                data = await response.json()
-                                # Новий формат відповіді
-                                if "message" in data:
-                                    answer = data["message"].get("content", "").strip()
-                                elif "response" in data:
-                                    answer = data["response"].strip()
-                                else:
-                                    answer = str(data).strip()
-                                
-                                if answer:
-                                    return answer
-                            else:
-                                error_text = await response.text()
-                                last_error = f"HTTP {response.status}: {error_text}"
-                    except Exception as chat_error:
-                        # Якщо chat API не працює, використовуємо старий generate API
-                        logger.info(f"Chat API не доступний, використовуємо generate API: {chat_error}")
-                        generate_payload = {
-                            "model": self.model,
-                            "prompt": prompt,
-                            "stream": False,
-                            "options": params
-                        }
-                        
-                        async with session.post(
-                            f"{self.api_url}/api/generate",
-                            json=generate_payload,
-                            timeout=aiohttp.ClientTimeout(total=60)
-                        ) as response:
-                            if response.status == 200:
-                                data = await response.json()
-                                answer = data.get("response", "").strip()
-                                if answer:
-                                    return answer
-                            else:
-                                error_text = await response.text()
-                                last_error = f"HTTP {response.status}: {error_text}"
+        Raises:
+            CircuitOpenError: OLLAMA недоступна, запит не надсилається
+            RequestBudgetExceeded: дедлайн або ліміт спроб запиту вже вичерпано
+            GenerationShed: черга генерацій перевантажена
+            OllamaRequestError: жодна спроба не дала відповіді
+        """
+        if budget is None:
+            budget = new_budget()
+        budget.check()
+        probe = self.breaker.check()
+        try:
+            last_error = None
+            
+            # Повідомлення для chat API (системна частина - той самий рядок для однакового контексту)
+            messages = prompt.to_messages()
+            
+            # Тіла запитів кодуємо один раз на модель і повторно використовуємо між спробами
+            bodies: Dict[tuple, bytes] = {}
+            failed_endpoints = set()
+            attempt = 0
+            
+            # Слот у черзі генерацій (винятки обробляє викликач)
+            queued = time.perf_counter()
+            async with self.scheduler.slot(priority, max_wait=budget.remaining()):
+                self.tracer.record("queue_wait", time.perf_counter() - queued, queued)
+                while attempt < max_retries and budget.take_attempt():
+                    if attempt > 0 or failed_endpoints:
+                        # Поки чекали - запобіжник міг розімкнутися (пробний запит не блокує сам себе)
+                        probe = self.breaker.check(probe=probe)
+                    async with self.endpoints.lease(exclude=failed_endpoints) as endpoint:
+                        started = time.time()
+                        try:
+                            with self.tracer.span("ollama_http"):
+                                answer, error, timings = await self._request_answer(
+                                    endpoint, prompt.text, messages, params, bodies,
+                                    timeout=budget.timeout(60)
+                                )
+                            if answer:
+                                endpoint.record_success(time.time() - started)
+                                self.breaker.record_success()
+                                self._record_timings(timings, question_type, endpoint, messages)
+                                return answer
+                            last_error = error or "Порожня відповідь"
+                            endpoint.record_failure(last_error)
+                            self.breaker.record_failure()
+                        except asyncio.TimeoutError:
+                            # Перед CONNECTION_ERRORS: у Python 3.11 TimeoutError - підклас OSError,
+                            # а aiohttp.ServerTimeoutError - ClientConnectionError. Повільний сервер
+                            # не вважаємо недоступним: звичайна спроба з паузою
+                            last_error = "Timeout"
+                            endpoint.record_failure(last_error)
+                            self.breaker.record_failure()
+                        except CONNECTION_ERRORS as e:
+                            # Endpoint недоступний - переходимо на інший, не витрачаючи спробу
+                            # (ні лічильника циклу, ні бюджету запиту; кожен endpoint - не більше разу)
+                            last_error = str(e)
+                            endpoint.record_failure(last_error)
+                            failed_endpoints.add(endpoint)
+                            if self.endpoints.has_alternative(failed_endpoints):
+                                logger.warning(f"OLLAMA endpoint {endpoint.url} недоступний, перенаправляємо запит")
+                                budget.refund()
+                                continue
+                            self.breaker.record_failure()
+                        except Exception as e:
+                            last_error = str(e)
+                            endpoint.record_failure(last_error)
+                            self.breaker.record_failure()
+                            if attempt == max_retries - 1:
+                                logger.error(f"Error generating response: {e}")
                     
-                    if attempt < max_retries - 1:
-                        await asyncio.sleep(1)  # Затримка перед повторною спробою
-                            
-            except asyncio.TimeoutError:
-                last_error = "Timeout"
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(1)
-            except Exception as e:
-                last_error = str(e)
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(1)
-                else:
-                    logger.error(f"Error generating response: {e}")
-        
+                    attempt += 1
+                    if attempt < max_retries and not budget.exhausted:
+                        # Затримка перед повторною спробою
+                        with self.tracer.span("retry_backoff"):
+                            await asyncio.sleep(min(1, budget.remaining()))
+            
+            logger.warning(f"Не вдалося отримати відповідь від OLLAMA: {last_error}")
+            raise OllamaRequestError(last_error or "Вичерпано спроби")
+        finally:
+            if probe:
+                # Пробний запит вийшов без результату (черга, бюджет, скасування)
+                self.breaker.release_probe()
+    
+    async def _try_generate(self, *args, **kwargs) -> Optional[str]:
+        """_generate_with_retry, але None замість OllamaRequestError (решта винятків - викликачу)"""
+        try:
+            return await self._generate_with_retry(*args, **kwargs)
+        except OllamaRequestError:
+            return None
+    
+    @staticmethod
+    def _generation_failed_response() -> str:
+        """Повідомлення користувачу, коли OLLAMA не відповіла (ніколи не кешується)"""
         from knowledge_base import get_admissions_committee_phones
         return f"Вибач, не вдалося отримати відповідь. Спробуй переформулювати питання або звернися до приймальної комісії ХДУ:\n\n{get_admissions_committee_phones()}"
     
+    async def _request_answer(
+        self,
+        endpoint: OllamaEndpoint,
+        prompt: str,
+        messages: List[Dict],
+        params: Dict,
+        bodies: Dict[tuple, bytes],
+        timeout: float = 60
+    ) -> Tuple[Optional[str], Optional[str], Optional[OllamaTimings]]:
+        """
+        Один запит до endpoint через API, який підтримує сервер (визначено заздалегідь)
+        
+        Returns:
+            (відповідь або None, опис помилки або None, лічильники часу OLLAMA або None)
+        """
+        model = endpoint.model or self.model
+        capabilities = await endpoint.get_capabilities()
+        
+        if capabilities.supports_chat:
+            chat_body = bodies.get(("chat", model))
+            if chat_body is None:
+                chat_body = bodies[("chat", model)] = OllamaTransport.encode_payload({
+                    "model": model,
+                    "messages": messages,
+                    "stream": False,
+                    "options": params,
+                    **self._keep_alive_fields(capabilities)
+                })
+            async with endpoint.transport.post("/api/chat", chat_body, timeout=timeout) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    # Новий формат відповіді
+                    if "message" in data:
+                        answer = data["message"].get("content", "").strip()
+                    elif "response" in data:
+                        answer = data["response"].strip()
+                    else:
+                        answer = str(data).strip()
+                    return answer, None, OllamaTimings.from_response(data)
+                error_text = await response.text()
+                if response.status != 404:
+                    return None, f"HTTP {response.status}: {error_text}", None
+                # Сервер не знає /api/chat - запам'ятовуємо і переходимо на generate API
+                logger.info(f"OLLAMA {endpoint.url}: chat API не підтримується, використовуємо generate API")
+                capabilities.supports_chat = False
+        
+        generate_body = bodies.get(("generate", model))
+        if generate_body is None:
+            generate_body = bodies[("generate", model)] = OllamaTransport.encode_payload({
+                "model": model,
+                "prompt": prompt,
+                "stream": False,
+                "options": params,
+                **self._keep_alive_fields(capabilities)
+            })
+        async with endpoint.transport.post("/api/generate", generate_body, timeout=timeout) as response:
+            if response.status == 200:
+                data = await response.json()
+                return data.get("response", "").strip(), None, OllamaTimings.from_response(data)
+            error_text = await response.text()
+            return None, f"HTTP {response.status}: {error_text}", None
+    
+    def _record_timings(
+        self,
+        timings: Optional[OllamaTimings],
+        question_type: Optional[str],
+        endpoint: OllamaEndpoint,
+        messages: List[Dict]
+    ):
+        """Лічильники OLLAMA у метрики (за типом питання та endpoint) і в трасу запиту"""
+        if timings is None:
+            return
+        prompt_chars = sum(len(m.get("content") or "") for m in messages)
+        self.metrics.record_ollama_timings(timings, question_type, endpoint.url, prompt_chars)
+        if timings.load_duration > 0:
+            self.tracer.record("server_load", timings.load_duration)
+        self.tracer.record("server_prefill", timings.prompt_eval_duration)
+        self.tracer.record("server_decode", timings.eval_duration)
+    
     async def generate_response_stream(
         self,
         prompt: str,
@@ -528,101 +953,158 @@ class OptimizedOllamaClient:
             yield "Вибач, не зрозумів питання. Спробуй переформулювати."
             return
         
-        # 1. Класифікуємо питання
-        question_type = self.question_classifier.classify(prompt)
-        
-        # 2. Отримуємо оптимізований контекст
-        full_context = self.knowledge_service.get_context_for_prompt(prompt)
-        optimized_context = self.context_optimizer.optimize_context(
-            prompt,
-            full_context["structured_json"]
-        )
-        
-        # 3. Перевіряємо кеш (спочатку точний, потім семантичний)
-        if use_cache:
-            # Точний пошук
-            cached_response = self.cache.get(prompt, optimized_context)
-            if cached_response:
-                response_time = time.time() - start_time
-                self.metrics.record_request(
-                    prompt, cached_response, response_time,
-                    from_cache=True, question_type=question_type, validation_passed=True
-                )
-                logger.info(f"Exact cache hit for question type: {question_type}")
-                yield cached_response
-                return
+        with self.tracer.trace("stream", prompt):
+            # 1-2. Класифікація та оптимізований контекст
+            question_type, optimized_context, fingerprint = self._prepare_context(prompt)
+            flight = None
+        
+            # 3. Перевіряємо кеш (спочатку точний, потім семантичний)
+            if use_cache:
+                # Точний пошук
+                with self.tracer.span("cache_exact"):
+                    cached_response = self.cache.get(prompt, fingerprint, question_type)
+                if cached_response:
+                    self.tracer.annotate(cache="exact")
+                    response_time = time.time() - start_time
+                    self.metrics.record_request(
+                        prompt, cached_response, response_time,
+                        from_cache=True, question_type=question_type, validation_passed=True
+                    )
+                    logger.info(f"Exact cache hit for question type: {question_type}")
+                    yield cached_response
+                    return
             
-            # Семантичний пошук
-            semantic_result = self.semantic_cache.get(prompt, optimized_context)
-            if semantic_result:
-                cached_response, similarity = semantic_result
-                response_time = time.time() - start_time
-                self.metrics.record_request(
-                    prompt, cached_response, response_time,
-                    from_cache=True, question_type=question_type, validation_passed=True
-                )
-                logger.info(f"Semantic cache hit (similarity: {similarity:.2f}) for question type: {question_type}")
-                yield cached_response
-                return
-        
-        # 4. Аналізуємо питання
-        analyzed_query = self._analyze_and_enhance_query(prompt, question_type)
-        
-        # 5. Формуємо промпт
-        system_prompt = self.prompt_builder.build_system_prompt(
-            question_type,
-            optimized_context,
-            user_query=prompt
-        )
+                # Семантичний пошук
+                with self.tracer.span("cache_semantic"):
+                    semantic_result = self.semantic_cache.get(prompt, fingerprint, question_type)
+                if semantic_result:
+                    self.tracer.annotate(cache="semantic")
+                    cached_response, similarity = semantic_result
+                    response_time = time.time() - start_time
+                    self.metrics.record_request(
+                        prompt, cached_response, response_time,
+                        from_cache=True, question_type=question_type, validation_passed=True
+                    )
+                    logger.info(f"Semantic cache hit (similarity: {similarity:.2f}) for question type: {question_type}")
+                    yield cached_response
+                    return
+                
+                # Постійний та спільний рівні (збережені до перезапуску / згенеровані іншими репліками)
+                with self.tracer.span("cache_key"):
+                    cache_key = self.cache.make_key(prompt, fingerprint)
+                cached_response = await self._lower_tier_lookup(cache_key, prompt, fingerprint, question_type)
+                if cached_response:
+                    response_time = time.time() - start_time
+                    self.metrics.record_request(
+                        prompt, cached_response, response_time,
+                        from_cache=True, question_type=question_type, validation_passed=True
+                    )
+                    logger.info(f"Lower-tier cache hit for question type: {question_type}")
+                    yield cached_response
+                    return
+                
+                # Однакове питання вже стрімиться - чекаємо на повну відповідь лідера
+                if cache_key:
+                    flight = self.stream_flight.lead(cache_key)
+                    if flight is None:
+                        waited = time.perf_counter()
+                        try:
+                            response = await self.stream_flight.join(cache_key)
+                        except (KeyError, OllamaRequestError):
+                            # Лідер не впорався - генеруємо самостійно
+                            response = None
+                        if response:
+                            self._record_coalesced(prompt, response, start_time, question_type, waited)
+                            yield response
+                            return
+                        flight = self.stream_flight.lead(cache_key)
         
-        # 6. Додаємо Chain-of-Thought якщо потрібно
-        if self._should_use_cot(question_type, prompt):
-            full_prompt = self._build_cot_prompt(system_prompt, analyzed_query)
-        else:
-            full_prompt = f"""{system_prompt}
-
-═══════════════════════════════════════
-ПИТАННЯ КОРИСТУВАЧА:
-{prompt}
-
-ПРОАНАЛІЗОВАНЕ ПИТАННЯ:
-{analyzed_query}
-═══════════════════════════════════════
-
-ТВОЯ ЗАДАЧА:
-1. Уважно прочитай питання
-2. Знайди відповідну інформацію в базі знань вище
-3. Сформуй точну, структуровану відповідь
-4. Перевір відповідь за списком самоперевірки
-
-ВІДПОВІДЬ (структурована, конкретна, з даними з бази знань):"""
+            try:
+                async for chunk in self._stream_fresh(
+                    prompt, context, question_type, optimized_context, fingerprint,
+                    use_cache, start_time, flight
+                ):
+                    yield chunk
+            finally:
+                if flight is not None and not flight.done():
+                    # Генерацію перервано (помилка або користувач пішов) - послідовники генерують самі
+                    flight.set_exception(OllamaRequestError("Streaming генерацію перервано"))
+    
+    async def _stream_fresh(
+        self,
+        prompt: str,
+        context: Optional[List[Dict]],
+        question_type: str,
+        optimized_context: Dict,
+        fingerprint: str,
+        use_cache: bool,
+        start_time: float,
+        flight: Optional[asyncio.Future] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Streaming генерація через OLLAMA (без перевірки кешу)
         
+        Відповідь, що обірвалася помилкою, не кешується і не передається послідовникам (flight).
+        """
+        # 4-6. Структурований промпт
+        prompt_started = time.perf_counter()
+        full_prompt = await self._build_prompt(prompt, context, question_type, optimized_context, fingerprint)
+    
         # 7. Отримуємо параметри
         params = self.generation_params.get(
             question_type,
             self.generation_params["default"]
         )
         params = self._adapt_params(params, len(prompt))
-        
+        priority = self._generation_priority(question_type, prompt)
+        self.tracer.record("prompt_build", time.perf_counter() - prompt_started, prompt_started)
+    
         # 8. Streaming генерація
+        # Перший фрагмент - очікування в черзі + обробка промпту; далі - генерація токенів
         full_response = ""
+        generation_started = time.perf_counter()
+        first_chunk_at = None
         try:
-            async for chunk in self._generate_stream(full_prompt, params, context):
+            async for chunk in self._generate_stream(
+                full_prompt, params, priority, budget=new_budget(),
+                question_type=question_type
+            ):
+                if first_chunk_at is None:
+                    first_chunk_at = time.perf_counter()
+                    self.tracer.record(
+                        "ollama_first_token", first_chunk_at - generation_started, generation_started
+                    )
                 full_response += chunk
                 yield chunk
+        except (GenerationShed, CircuitOpenError, RequestBudgetExceeded) as e:
+            # Виникають до першого фрагмента (черга, запобіжник, бюджет)
+            yield await self._degraded_response(e, prompt, question_type, start_time)
+            return
         except Exception as e:
             logger.error(f"Помилка streaming генерації: {e}")
-            yield f"Вибач, сталася помилка при генерації відповіді. Спробуй переформулювати питання."
+            if full_response:
+                yield STREAM_INTERRUPTED_NOTE
+            elif question_type == "admission":
+                # Як і generate_response: для вступу - відповідь з бази знань
+                yield self._get_admission_fallback(prompt)
+            else:
+                yield "Вибач, сталася помилка при генерації відповіді. Спробуй переформулювати питання."
             return
-        
+    
+        if first_chunk_at is not None:
+            self.tracer.record("ollama_decode", time.perf_counter() - first_chunk_at, first_chunk_at)
+    
         # 9. Валідуємо повну відповідь
-        validation_result = self.validator.validate(full_response, prompt)
-        
+        with self.tracer.span("validation"):
+            validation_result = self.validator.validate(full_response, prompt)
+    
         # 10. Зберігаємо в кеш (обидва типи)
         if validation_result.is_valid and use_cache and full_response:
-            self.cache.set(prompt, optimized_context, full_response)
-            self.semantic_cache.set(prompt, optimized_context, full_response)
-        
+            with self.tracer.span("cache_store"):
+                self._store_response(prompt, fingerprint, full_response, question_type)
+            if flight is not None:
+                flight.set_result(full_response)
+    
         # 11. Записуємо метрики
         response_time = time.time() - start_time
         self.metrics.record_request(
@@ -633,154 +1115,250 @@ class OptimizedOllamaClient:
     
     async def _generate_stream(
         self,
-        prompt: str,
+        prompt: PromptMessages,
         params: Dict,
-        context: List[Dict] = None
+        priority: int = PRIORITY_NORMAL,
+        budget: Optional[RequestBudget] = None,
+        question_type: Optional[str] = None
     ) -> AsyncGenerator[str, None]:
-        """Внутрішній метод для streaming генерації"""
-        # Розділяємо системний промпт та питання
-        system_prompt = ""
-        user_message = prompt
-        
-        if "═══════════════════════════════════════" in prompt:
-            parts = prompt.split("═══════════════════════════════════════")
-            if len(parts) >= 2:
-                system_prompt = parts[0].strip()
-                for part in parts[1:]:
-                    if "ПИТАННЯ КОРИСТУВАЧА:" in part:
-                        user_lines = part.split("\n")
-                        for i, line in enumerate(user_lines):
-                            if "ПИТАННЯ КОРИСТУВАЧА:" in line and i + 1 < len(user_lines):
-                                user_message = user_lines[i + 1].strip()
-                                break
-        else:
-            system_prompt = prompt
-        
-        # Формуємо messages
-        messages = []
-        if system_prompt:
-            messages.append({
-                "role": "system",
-                "content": system_prompt
-            })
+        """
+        Внутрішній метод для streaming генерації
         
-        if context:
-            for ctx in context:
-                if isinstance(ctx, dict):
-                    if "user_message" in ctx and "bot_response" in ctx:
-                        messages.append({
-                            "role": "user",
-                            "content": ctx["user_message"]
+        Raises:
+            OllamaRequestError: HTTP-помилка або обрив streaming (текст помилки не віддається
+                як фрагмент відповіді, щоб не потрапити в кеш)
+        """
+        if budget is None:
+            budget = new_budget()
+        budget.check()
+        probe = self.breaker.check()
+        try:
+            messages = prompt.to_messages()
+        
+            # Streaming запит (слот у черзі генерацій займається на весь час streaming)
+            queued = time.perf_counter()
+            async with self.scheduler.slot(priority, max_wait=budget.remaining()), \
+                    self.endpoints.lease() as endpoint:
+                self.tracer.record("queue_wait", time.perf_counter() - queued, queued)
+                started = time.time()
+                try:
+                    capabilities = await endpoint.get_capabilities()
+                    if capabilities.supports_chat:
+                        path = "/api/chat"
+                        body = OllamaTransport.encode_payload({
+                            "model": endpoint.model or self.model,
+                            "messages": messages,
+                            "stream": True,  # Увімкнути streaming
+                            "options": params,
+                            **self._keep_alive_fields(capabilities)
                         })
-                        messages.append({
-                            "role": "assistant",
-                            "content": ctx["bot_response"]
+                    else:
+                        # Старий сервер: streaming через generate API (формат "response")
+                        path = "/api/generate"
+                        body = OllamaTransport.encode_payload({
+                            "model": endpoint.model or self.model,
+                            "prompt": prompt.text,
+                            "stream": True,
+                            "options": params,
+                            **self._keep_alive_fields(capabilities)
                         })
-        
-        messages.append({
-            "role": "user",
-            "content": user_message
-        })
-        
-        # Streaming запит
-        try:
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "model": self.model,
-                    "messages": messages,
-                    "stream": True,  # Увімкнути streaming
-                    "options": params
-                }
-                
-                async with session.post(
-                    f"{self.api_url}/api/chat",
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=120)
-                ) as response:
-                    if response.status == 200:
-                        buffer = ""
-                        async for chunk_bytes in response.content.iter_chunked(1024):
-                            if chunk_bytes:
-                                try:
-                                    buffer += chunk_bytes.decode('utf-8', errors='ignore')
-                                    # Обробляємо повні JSON рядки
-                                    while '\n' in buffer:
-                                        line, buffer = buffer.split('\n', 1)
-                                        line = line.strip()
-                                        if line:
-                                            try:
-                                                data = json.loads(line)
-                                                # OLLAMA streaming формат
-                                                if "message" in data:
-                                                    message = data["message"]
-                                                    if isinstance(message, dict) and "content" in message:
-                                                        chunk = message["content"]
+            
+                    async with endpoint.transport.post(
+                        path, body, timeout=budget.timeout(120)
+                    ) as response:
+                        if response.status == 200:
+                            buffer = ""
+                            timings = None
+                            async for chunk_bytes in response.content.iter_chunked(1024):
+                                if chunk_bytes:
+                                    try:
+                                        buffer += chunk_bytes.decode('utf-8', errors='ignore')
+                                        # Обробляємо повні JSON рядки
+                                        while '\n' in buffer:
+                                            line, buffer = buffer.split('\n', 1)
+                                            line = line.strip()
+                                            if line:
+                                                try:
+                                                    data = json.loads(line)
+                                                    if data.get("error"):
+                                                        raise OllamaRequestError(data["error"])
+                                                    if data.get("done"):
+                                                        # Фінальний рядок містить лічильники часу OLLAMA
+                                                        timings = OllamaTimings.from_response(data)
+                                                    # OLLAMA streaming формат
+                                                    if "message" in data:
+                                                        message = data["message"]
+                                                        if isinstance(message, dict) and "content" in message:
+                                                            chunk = message["content"]
+                                                            if chunk:
+                                                                yield chunk
+                                                        elif isinstance(message, str):
+                                                            yield message
+                                                    elif "response" in data:
+                                                        chunk = data["response"]
                                                         if chunk:
                                                             yield chunk
-                                                    elif isinstance(message, str):
-                                                        yield message
-                                                elif "response" in data:
-                                                    chunk = data["response"]
-                                                    if chunk:
-                                                        yield chunk
-                                                elif "delta" in data and "content" in data["delta"]:
-                                                    # Дельта формат
-                                                    chunk = data["delta"]["content"]
-                                                    if chunk:
-                                                        yield chunk
-                                            except json.JSONDecodeError:
-                                                continue
-                                except Exception as e:
-                                    logger.debug(f"Помилка обробки streaming chunk: {e}")
-                                    continue
-                        # Обробляємо залишок буфера
-                        if buffer.strip():
-                            try:
-                                data = json.loads(buffer.strip())
-                                if "message" in data and "content" in data["message"]:
-                                    chunk = data["message"]["content"]
-                                    if chunk:
-                                        yield chunk
-                            except json.JSONDecodeError:
-                                pass
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Streaming помилка HTTP {response.status}: {error_text}")
-                        yield f"Вибач, сталася помилка при генерації відповіді."
-        except Exception as e:
-            logger.error(f"Помилка streaming генерації: {e}")
-            yield f"Вибач, сталася помилка при генерації відповіді."
+                                                    elif "delta" in data and "content" in data["delta"]:
+                                                        # Дельта формат
+                                                        chunk = data["delta"]["content"]
+                                                        if chunk:
+                                                            yield chunk
+                                                except json.JSONDecodeError:
+                                                    continue
+                                    except OllamaRequestError:
+                                        raise
+                                    except Exception as e:
+                                        logger.debug(f"Помилка обробки streaming chunk: {e}")
+                                        continue
+                            # Обробляємо залишок буфера
+                            if buffer.strip():
+                                try:
+                                    data = json.loads(buffer.strip())
+                                    if data.get("done"):
+                                        timings = OllamaTimings.from_response(data)
+                                    if "message" in data and "content" in data["message"]:
+                                        chunk = data["message"]["content"]
+                                        if chunk:
+                                            yield chunk
+                                    elif data.get("response"):
+                                        yield data["response"]
+                                except json.JSONDecodeError:
+                                    pass
+                        else:
+                            error_text = await response.text()
+                            raise OllamaRequestError(f"HTTP {response.status}: {error_text}")
+                    endpoint.record_success(time.time() - started)
+                    self.breaker.record_success()
+                    self._record_timings(timings, question_type, endpoint, messages)
+                except Exception as e:
+                    endpoint.record_failure(str(e))
+                    self.breaker.record_failure()
+                    if isinstance(e, OllamaRequestError):
+                        raise
+                    raise OllamaRequestError(str(e)) from e
+        finally:
+            if probe:
+                # Пробний запит вийшов без результату (черга, бюджет, користувач пішов)
+                self.breaker.release_probe()
     
-    async def check_health(self) -> bool:
-        """Перевірка доступності OLLAMA (остання версія API)"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                # Спробуємо новий API спочатку
-                try:
-                    async with session.get(
-                        f"{self.api_url}/api/tags",
-                        timeout=aiohttp.ClientTimeout(total=5)
-                    ) as response:
-                        if response.status == 200:
-                            return True
-                except:
-                    pass
-                
-                # Якщо не працює, спробуємо старий варіант
-                try:
-                    async with session.get(
-                        f"{self.api_url}/api/version",
-                        timeout=aiohttp.ClientTimeout(total=5)
-                    ) as response:
-                        return response.status == 200
-                except:
-                    return False
-        except:
+    @staticmethod
+    def _keep_alive_fields(capabilities) -> Dict:
+        """keep_alive для тіла запиту (модель не вивантажується між питаннями)"""
+        if OLLAMA_KEEP_ALIVE and capabilities.supports_keep_alive:
+            return {"keep_alive": OLLAMA_KEEP_ALIVE}
+        return {}
+    
+    async def warm_up(self) -> bool:
+        """
+        Прогрів: завантаження моделі на кожному endpoint та обробка системних промптів
+        для кожного типу питань (викликається у фоні при старті бота)
+        
+        Returns:
+            True якщо модель завантажена хоча б на одному endpoint
+        """
+        # Найчастіший тип питань прогріваємо останнім - його префікс залишиться в кеші OLLAMA
+        question_types = [qt for qt in self.generation_params if qt not in ("default", "admission")]
+        question_types.append("admission")
+        
+        loaded = False
+        for endpoint in self.endpoints.endpoints:
+            model = endpoint.model or self.model
+            if not await preload_model(endpoint, model, OLLAMA_KEEP_ALIVE):
+                continue
+            loaded = True
+            
+            primed = 0
+            for question_type in question_types:
+                system_prompt = self.prompt_builder.build_system_prompt(question_type, {})
+                if await prime_prompt(endpoint, model, system_prompt, OLLAMA_KEEP_ALIVE):
+                    primed += 1
+            logger.info(f"Прогріто {primed}/{len(question_types)} системних промптів на {endpoint.url}")
+        
+        return loaded
+    
+    async def build_embedding_index(self) -> Dict:
+        """Офлайн-побудова embedding-індексу уривків бази знань (потрібен numpy)"""
+        stats = await build_embedding_index(get_passage_index(), self.embedder.embed, model=self.embedder.model)
+        # Поточний процес одразу починає користуватися новим індексом
+        get_embedding_index().load()
+        return stats
+    
+    async def keep_warm(self) -> bool:
+        """Легкий пінг, що продовжує keep_alive моделі (для планувальника)"""
+        if self.breaker.state == STATE_OPEN:
             return False
+        results = []
+        for endpoint in self.endpoints.endpoints:
+            if endpoint.healthy:
+                results.append(await preload_model(endpoint, endpoint.model or self.model, OLLAMA_KEEP_ALIVE))
+        return any(results)
+    
+    async def warm_cache(self, questions: List[str], yield_interval: float = 1.0) -> Dict:
+        """
+        Попередня генерація відповідей на популярні питання (перед піком навантаження)
+        
+        Питання, що вже є в кеші в пам'яті, пропускаються; знайдені в постійному чи
+        спільному кеші - переносяться в пам'ять без генерації. Решта генерується по
+        одному й лише коли в черзі генерації немає запитів користувачів.
+        
+        Returns:
+            Лічильники: total, cached, restored, generated, failed, skipped
+        """
+        stats = {"total": len(questions), "cached": 0, "restored": 0, "generated": 0, "failed": 0, "skipped": 0}
+        await self.persistent_cache.wait_loaded()
+        
+        for question in questions:
+            question_type, _, fingerprint = self._prepare_context(question)
+            cache_key = self.cache.make_key(question, fingerprint)
+            if cache_key is None:
+                # Без контексту бази знань відповідь не кешується - прогрівати нічого
+                stats["skipped"] += 1
+                continue
+            if cache_key in self.cache:
+                stats["cached"] += 1
+                continue
+            if await self._lower_tier_lookup(cache_key, question, fingerprint, question_type):
+                stats["restored"] += 1
+                continue
+            
+            # Користувачі мають пріоритет: чекаємо, поки черга генерації спорожніє
+            while self.scheduler.queue_depth > 0:
+                await asyncio.sleep(yield_interval)
+            
+            try:
+                await self.generate_response(question, use_cache=True)
+            except Exception as e:
+                logger.warning(f"Прогрів кешу: помилка генерації для '{question[:50]}': {e}")
+            # Невалідні, деградовані та відкинуті відповіді в кеш не потрапляють
+            if cache_key in self.cache:
+                stats["generated"] += 1
+            else:
+                stats["failed"] += 1
+        
+        logger.info(f"Прогрів кешу відповідей: {stats}")
+        return stats
+    
+    async def check_health(self) -> bool:
+        """Перевірка доступності OLLAMA (хоча б один endpoint відповідає)"""
+        return await self.endpoints.check_all()
     
     def get_statistics(self) -> Dict:
         """Отримання статистики роботи"""
-        return self.metrics.get_statistics()
+        stats = self.metrics.get_statistics()
+        stats["single_flight"] = self.single_flight.get_stats()
+        stats["stream_single_flight"] = self.stream_flight.get_stats()
+        stats["generation_queue"] = self.scheduler.get_stats()
+        stats["endpoints"] = self.endpoints.get_stats()
+        stats["circuit_breaker"] = self.breaker.get_stats()
+        stats["tracing"] = self.tracer.get_stats()
+        stats["context_index"] = self.context_optimizer.get_stats()
+        stats["prompt_cache"] = self.prompt_builder.get_stats()
+        stats["embeddings"] = {**get_embedding_index().get_stats(), **self.embedder.get_stats()}
+        stats["capabilities"] = {
+            ep.url: ep.capabilities.to_dict() if ep.capabilities else None
+            for ep in self.endpoints.endpoints
+        }
+        return stats
     
     def get_cache_stats(self) -> Dict:
         """Отримання статистики кешу"""
@@ -789,6 +1367,8 @@ class OptimizedOllamaClient:
         return {
             "exact_cache": exact_stats,
             "semantic_cache": semantic_stats,
+            "persistent_cache": self.persistent_cache.get_stats(),
+            "shared_cache": self.shared_cache.get_stats(),
             "total_entries": exact_stats["size"] + semantic_stats["size"]
         }
     
@@ -797,69 +1377,94 @@ class OptimizedOllamaClient:
         prompt: str,
         context: List[Dict] = None,
         num_candidates: int = 3,
-        use_cache: bool = True
+        use_cache: bool = True,
+        mode: str = None
     ) -> str:
         """
         Паралельна генерація кількох варіантів відповіді та вибір найкращого
         Ефект: +20% швидкості та точності для складних питань
+        
+        Режими (mode, за замовчуванням OLLAMA_PARALLEL_MODE):
+        - all: чекаємо всіх кандидатів і вибираємо найкращий
+        - race: перший кандидат, що пройшов валідацію та поріг оцінки, перемагає, решта скасовуються
+        - hedged: наступний кандидат запускається, лише якщо попередній не відповів
+          за перцентиль часу генерації
         """
+        mode = mode or OLLAMA_PARALLEL_MODE
         start_time = time.time()
+        # Кожен кандидат отримує щонайменше одну спробу, решта бюджету - на повтори
+        budget = new_budget(max_attempts=OLLAMA_RETRY_BUDGET + num_candidates - 1)
         
         if not prompt:
             return "Вибач, не зрозумів питання. Спробуй переформулювати."
         
-        # Перевіряємо кеш перед паралельною генерацією
-        if use_cache:
-            question_type = self.question_classifier.classify(prompt)
-            full_context = self.knowledge_service.get_context_for_prompt(prompt)
-            optimized_context = self.context_optimizer.optimize_context(
-                prompt,
-                full_context["structured_json"]
-            )
+        with self.tracer.trace("parallel", prompt):
+            self.tracer.annotate(mode=mode)
+            question_type, optimized_context, fingerprint = self._prepare_context(prompt)
+        
+            # Перевіряємо кеш перед паралельною генерацією
+            if use_cache:
+                with self.tracer.span("cache_exact"):
+                    cached_response = self.cache.get(prompt, fingerprint, question_type)
+                if cached_response:
+                    self.tracer.annotate(cache="exact")
+                    return cached_response
             
-            cached_response = self.cache.get(prompt, optimized_context)
-            if cached_response:
-                return cached_response
+                with self.tracer.span("cache_semantic"):
+                    semantic_result = self.semantic_cache.get(prompt, fingerprint, question_type)
+                if semantic_result:
+                    self.tracer.annotate(cache="semantic")
+                    return semantic_result[0]
             
-            semantic_result = self.semantic_cache.get(prompt, optimized_context)
-            if semantic_result:
-                return semantic_result[0]
-        
-        # Генеруємо кілька варіантів паралельно
-        question_type = self.question_classifier.classify(prompt)
-        full_context = self.knowledge_service.get_context_for_prompt(prompt)
-        optimized_context = self.context_optimizer.optimize_context(
-            prompt,
-            full_context["structured_json"]
-        )
-        
-        analyzed_query = self._analyze_and_enhance_query(prompt, question_type)
-        system_prompt = self.prompt_builder.build_system_prompt(
-            question_type,
-            optimized_context,
-            user_query=prompt
-        )
-        
-        if self._should_use_cot(question_type, prompt):
-            full_prompt = self._build_cot_prompt(system_prompt, analyzed_query)
-        else:
-            full_prompt = f"""{system_prompt}
-
-═══════════════════════════════════════
-ПИТАННЯ КОРИСТУВАЧА:
-{prompt}
-
-ПРОАНАЛІЗОВАНЕ ПИТАННЯ:
-{analyzed_query}
-═══════════════════════════════════════
-
-ТВОЯ ЗАДАЧА:
-1. Уважно прочитай питання
-2. Знайди відповідну інформацію в базі знань вище
-3. Сформуй точну, структуровану відповідь
-4. Перевір відповідь за списком самоперевірки
-
-ВІДПОВІДЬ (структурована, конкретна, з даними з бази знань):"""
+                with self.tracer.span("cache_key"):
+                    flight_key = self.cache.make_key(prompt, fingerprint)
+                
+                cached_response = await self._lower_tier_lookup(flight_key, prompt, fingerprint, question_type)
+                if cached_response:
+                    return cached_response
+                
+                # Однакове питання вже генерується - чекаємо на результат лідера
+                if flight_key:
+                    waited = time.perf_counter()
+                    response, coalesced = await self.single_flight.do(
+                        flight_key,
+                        lambda: self._generate_or_shed(
+                            self._generate_parallel_fresh(
+                                prompt, context, num_candidates, question_type,
+                                optimized_context, fingerprint, use_cache, start_time, budget, mode
+                            ),
+                            prompt, question_type, start_time
+                        )
+                    )
+                    if coalesced:
+                        self._record_coalesced(prompt, response, start_time, question_type, waited)
+                    return response
+        
+            return await self._generate_or_shed(
+                self._generate_parallel_fresh(
+                    prompt, context, num_candidates, question_type,
+                    optimized_context, fingerprint, use_cache, start_time, budget, mode
+                ),
+                prompt, question_type, start_time
+            )
+    
+    async def _generate_parallel_fresh(
+        self,
+        prompt: str,
+        context: Optional[List[Dict]],
+        num_candidates: int,
+        question_type: str,
+        optimized_context: Dict,
+        fingerprint: str,
+        use_cache: bool,
+        start_time: float,
+        budget: RequestBudget,
+        mode: str = "all"
+    ) -> str:
+        """Паралельна генерація кандидатів через OLLAMA (без перевірки кешу)"""
+        prompt_started = time.perf_counter()
+        # Один структурований промпт для всіх кандидатів
+        full_prompt = await self._build_prompt(prompt, context, question_type, optimized_context, fingerprint)
         
         # Отримуємо базові параметри
         base_params = self.generation_params.get(
@@ -867,34 +1472,52 @@ class OptimizedOllamaClient:
             self.generation_params["default"]
         )
         base_params = self._adapt_params(base_params, len(prompt))
+        priority = self._generation_priority(question_type, prompt)
+        self.tracer.record("prompt_build", time.perf_counter() - prompt_started, prompt_started)
         
         # Створюємо варіації параметрів для різних кандидатів
         param_variations = self._create_param_variations(base_params, num_candidates)
         
-        # Генеруємо всі варіанти паралельно
-        tasks = [
-            self._generate_with_retry(
+        def candidate_factory(params: Dict):
+            return lambda: self._generate_with_retry(
                 full_prompt,
                 params,
                 max_retries=2,
-                context=context if context else []
-            )
-            for params in param_variations
-        ]
-        
-        try:
-            candidates = await asyncio.gather(*tasks, return_exceptions=True)
-        except Exception as e:
-            logger.error(f"Помилка паралельної генерації: {e}")
-            # Fallback до звичайної генерації
-            return await self._generate_with_retry(
-                full_prompt,
-                base_params,
-                max_retries=3,
-                context=context if context else []
+                priority=priority,
+                budget=budget,
+                question_type=question_type
             )
-        
-        # Фільтруємо помилки
+        factories = [candidate_factory(params) for params in param_variations]
+        
+        if mode in ("race", "hedged"):
+            hedge_delay = self._hedge_delay() if mode == "hedged" else None
+            with self.tracer.span("candidates"):
+                winner, candidates = await self._race_candidates(factories, prompt, hedge_delay)
+            if winner is not None:
+                return self._finish_parallel(
+                    winner, prompt, question_type, fingerprint, use_cache, start_time
+                )
+        else:
+            # Генеруємо всі варіанти паралельно
+            try:
+                with self.tracer.span("candidates"):
+                    candidates = await asyncio.gather(
+                        *(factory() for factory in factories), return_exceptions=True
+                    )
+                self.metrics.record_parallel(len(factories), 0, early_win=False)
+            except Exception as e:
+                logger.error(f"Помилка паралельної генерації: {e}")
+                # Fallback до звичайної генерації
+                return await self._try_generate(
+                    full_prompt,
+                    base_params,
+                    max_retries=3,
+                    priority=priority,
+                    budget=budget,
+                    question_type=question_type
+                ) or self._generation_failed_response()
+        
+        # Фільтруємо помилки (кандидат, що не отримав відповіді, - OllamaRequestError)
         valid_candidates = [
             c for c in candidates
             if isinstance(c, str) and len(c.strip()) > 20
@@ -902,23 +1525,39 @@ class OptimizedOllamaClient:
         
         if not valid_candidates:
             # Якщо всі невалідні - використовуємо fallback
-            return await self._generate_with_retry(
+            return await self._try_generate(
                 full_prompt,
                 base_params,
                 max_retries=3,
-                context=context if context else []
-            )
+                priority=priority,
+                budget=budget,
+                question_type=question_type
+            ) or self._generation_failed_response()
         
         # Вибираємо найкращий варіант
-        best_response = self._select_best_response(valid_candidates, prompt, question_type)
-        
-        # Валідуємо найкращий варіант
-        validation_result = self.validator.validate(best_response, prompt)
+        with self.tracer.span("candidate_select"):
+            best_response = self._select_best_response(valid_candidates, prompt, question_type)
+        return self._finish_parallel(
+            best_response, prompt, question_type, fingerprint, use_cache, start_time
+        )
+    
+    def _finish_parallel(
+        self,
+        best_response: str,
+        prompt: str,
+        question_type: str,
+        fingerprint: str,
+        use_cache: bool,
+        start_time: float
+    ) -> str:
+        """Валідація, кешування та метрики для обраного кандидата"""
+        with self.tracer.span("validation"):
+            validation_result = self.validator.validate(best_response, prompt)
         
         # Зберігаємо в кеш
         if validation_result.is_valid and use_cache:
-            self.cache.set(prompt, optimized_context, best_response)
-            self.semantic_cache.set(prompt, optimized_context, best_response)
+            with self.tracer.span("cache_store"):
+                self._store_response(prompt, fingerprint, best_response, question_type)
         
         # Записуємо метрики
         response_time = time.time() - start_time
@@ -930,6 +1569,90 @@ class OptimizedOllamaClient:
         
         return best_response
     
+    async def _race_candidates(
+        self,
+        factories: List,
+        prompt: str,
+        hedge_delay: Optional[float] = None
+    ) -> Tuple[Optional[str], List[str]]:
+        """
+        Перегони кандидатів: перший, що пройшов валідацію та поріг оцінки, перемагає,
+        решта HTTP-запитів скасовується
+        
+        Args:
+            hedge_delay: None - всі кандидати стартують одразу; інакше наступний
+                стартує, якщо попередні не відповіли за цей час (або завершились невдало)
+        
+        Returns:
+            (переможець або None, усі завершені придатні кандидати)
+        """
+        pending = set()
+        finished: List[str] = []
+        launched = 0
+        
+        def launch():
+            nonlocal launched
+            pending.add(asyncio.ensure_future(factories[launched]()))
+            launched += 1
+        
+        if hedge_delay is None:
+            while launched < len(factories):
+                launch()
+        else:
+            launch()
+        
+        winner = None
+        try:
+            while True:
+                if not pending:
+                    if launched >= len(factories):
+                        break
+                    launch()
+                    continue
+                
+                timeout = hedge_delay if hedge_delay is not None and launched < len(factories) else None
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Hedge: попередній кандидат запізнюється - запускаємо наступний
+                    launch()
+                    continue
+                
+                for task in done:
+                    if task.cancelled() or task.exception() is not None:
+                        continue
+                    candidate = task.result()
+                    if not isinstance(candidate, str) or len(candidate.strip()) <= 20:
+                        continue
+                    finished.append(candidate)
+                    if (
+                        self._score_response(candidate, prompt) >= OLLAMA_RACE_SCORE_THRESHOLD
+                        and self.validator.validate(candidate, prompt).is_valid
+                    ):
+                        winner = candidate
+                        break
+                if winner is not None:
+                    break
+        finally:
+            cancelled = len(pending)
+            for task in pending:
+                task.cancel()
+            self.metrics.record_parallel(launched, cancelled, early_win=winner is not None)
+        
+        return winner, finished
+    
+    def _hedge_delay(self) -> float:
+        """Затримка hedged-запиту: перцентиль часу успішних генерацій по всіх endpoint-ах"""
+        latencies = sorted(
+            latency for endpoint in self.endpoints.endpoints for latency in endpoint.latencies
+        )
+        if len(latencies) < 5:
+            # Мало даних - орієнтуємось на середній час генерації в черзі
+            return self.scheduler.service_time
+        index = min(len(latencies) - 1, int(len(latencies) * OLLAMA_HEDGE_PERCENTILE / 100))
+        return latencies[index]
+    
     def _create_param_variations(self, base_params: Dict, num_variations: int) -> List[Dict]:
         """Створення варіацій параметрів для паралельної генерації"""
         variations = []
@@ -968,56 +1691,57 @@ class OptimizedOllamaClient:
         if len(candidates) == 1:
             return candidates[0]
         
-        scores = []
-        
-        for candidate in candidates:
-            score = 0.0
-            
-            # 1. Довжина відповіді (оптимальна 100-500 символів)
-            length = len(candidate)
-            if 100 <= length <= 500:
-                score += 0.3
-            elif 50 <= length < 100 or 500 < length <= 1000:
-                score += 0.2
-            else:
-                score += 0.1
-            
-            # 2. Наявність ключових слів для типу питання
-            candidate_lower = candidate.lower()
-            prompt_lower = prompt.lower()
-            
-            # Перевіряємо, чи відповідь містить ключові слова з питання
-            prompt_keywords = set(re.findall(r'\b\w{4,}\b', prompt_lower))
-            candidate_keywords = set(re.findall(r'\b\w{4,}\b', candidate_lower))
-            common_keywords = prompt_keywords & candidate_keywords
-            
-            if prompt_keywords:
-                keyword_score = len(common_keywords) / len(prompt_keywords)
-                score += keyword_score * 0.3
-            
-            # 3. Структурованість (наявність списків, форматування)
-            has_structure = bool(
-                re.search(r'[•\-\d+\.]', candidate) or
-                '\n' in candidate or
-                ':' in candidate
-            )
-            if has_structure:
-                score += 0.2
-            
-            # 4. Відсутність заборонених слів
-            forbidden_words = ['хну', 'кну', 'львівський', 'одеський', 'харківський']
-            has_forbidden = any(word in candidate_lower for word in forbidden_words)
-            if not has_forbidden:
-                score += 0.2
-            else:
-                score -= 1.0  # Великий штраф за заборонені слова
-            
-            scores.append(score)
+        scores = [self._score_response(candidate, prompt) for candidate in candidates]
         
         # Вибираємо варіант з найвищим балом
         best_index = scores.index(max(scores))
         return candidates[best_index]
     
+    def _score_response(self, candidate: str, prompt: str) -> float:
+        """Оцінка кандидата (0..1; заборонені університети дають від'ємний бал)"""
+        score = 0.0
+        
+        # 1. Довжина відповіді (оптимальна 100-500 символів)
+        length = len(candidate)
+        if 100 <= length <= 500:
+            score += 0.3
+        elif 50 <= length < 100 or 500 < length <= 1000:
+            score += 0.2
+        else:
+            score += 0.1
+        
+        # 2. Наявність ключових слів для типу питання
+        candidate_lower = candidate.lower()
+        prompt_lower = prompt.lower()
+        
+        # Перевіряємо, чи відповідь містить ключові слова з питання
+        prompt_keywords = set(re.findall(r'\b\w{4,}\b', prompt_lower))
+        candidate_keywords = set(re.findall(r'\b\w{4,}\b', candidate_lower))
+        common_keywords = prompt_keywords & candidate_keywords
+        
+        if prompt_keywords:
+            keyword_score = len(common_keywords) / len(prompt_keywords)
+            score += keyword_score * 0.3
+        
+        # 3. Структурованість (наявність списків, форматування)
+        has_structure = bool(
+            re.search(r'[•\-\d+\.]', candidate) or
+            '\n' in candidate or
+            ':' in candidate
+        )
+        if has_structure:
+            score += 0.2
+        
+        # 4. Відсутність заборонених слів
+        forbidden_words = ['хну', 'кну', 'львівський', 'одеський', 'харківський']
+        has_forbidden = any(word in candidate_lower for word in forbidden_words)
+        if not has_forbidden:
+            score += 0.2
+        else:
+            score -= 1.0  # Великий штраф за заборонені слова
+        
+        return score
+    
     def _get_admission_fallback(self, query: str) -> str:
         """Fallback відповідь для питань про вступ"""
         try:
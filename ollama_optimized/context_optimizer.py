@@ -2,8 +2,10 @@
 Оптимізація контексту для зменшення використання токенів
 """
 import re
-import json
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from ollama_optimized.section_index import SectionIndex
+from utils.text_normalizer import TextNormalizer
 
 
 class ContextOptimizer:
@@ -18,12 +20,16 @@ class ContextOptimizer:
         "low": ["achievements", "international"]
     }
     
+    def __init__(self):
+        # Текст, основи слів і розміри секцій - один раз на версію секції
+        self.section_index = SectionIndex()
+    
     def optimize_context(self, query: str, full_knowledge: Dict) -> Dict:
         """Оптимізація контексту на основі запиту"""
         # 1. Визначаємо ключові слова
         keywords = self._extract_keywords(query)
         
-        # 2. Знаходимо релевантні секції
+        # 2. Знаходимо релевантні секції (перетин основ слів з індексом)
         relevant_sections = self._find_relevant_sections(keywords, full_knowledge)
         
         # 3. Пріоритизуємо секції
@@ -60,14 +66,15 @@ class ContextOptimizer:
         if not keywords:
             return relevant
         
+        keyword_stems = _keyword_stems(tuple(keywords))
+        
         for section_key, section_data in knowledge.items():
             if section_data is None:
                 continue
             
-            section_str = str(section_data).lower()
-            
-            # Рахуємо збіги ключових слів
-            matches = sum(1 for kw in keywords if kw in section_str)
+            # Рахуємо збіги ключових слів (основи слів секції - з індексу)
+            section_stems = self.section_index.entry(section_key, section_data).stems
+            matches = sum(1 for stem in keyword_stems if stem in section_stems)
             
             if matches > 0:
                 relevant[section_key] = {
@@ -98,13 +105,8 @@ class ContextOptimizer:
     
     def _limit_context_size(self, context: Dict) -> Dict:
         """Обмеження розміру контексту"""
-        # Перевіряємо розмір
-        try:
-            context_str = json.dumps(context, ensure_ascii=False)
-        except (TypeError, ValueError):
-            context_str = str(context)
-        
-        estimated_chars = len(context_str)
+        # Перевіряємо розмір (сума попередньо обчислених розмірів секцій, без json.dumps)
+        estimated_chars = self.section_index.context_size(context)
         
         if estimated_chars <= self.MAX_CONTEXT_TOKENS:
             return context
@@ -116,12 +118,7 @@ class ContextOptimizer:
         for priority_level in ["high", "medium", "low"]:
             for section_key in self.SECTION_PRIORITY[priority_level]:
                 if section_key in context:
-                    try:
-                        section_str = json.dumps(context[section_key], ensure_ascii=False)
-                    except (TypeError, ValueError):
-                        section_str = str(context[section_key])
-                    
-                    section_chars = len(section_str)
+                    section_chars = self.section_index.entry(section_key, context[section_key]).size
                     
                     if current_chars + section_chars <= self.MAX_CONTEXT_TOKENS:
                         limited[section_key] = context[section_key]
@@ -133,4 +130,13 @@ class ContextOptimizer:
                         break
         
         return limited
+    
+    def get_stats(self) -> Dict:
+        """Статистика індексу секцій"""
+        return self.section_index.get_stats()
+
 
+@lru_cache(maxsize=2048)
+def _keyword_stems(keywords: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Основи ключових слів запиту (той самий стемінг, що й в індексі секцій)"""
+    return tuple(TextNormalizer.stem(kw) for kw in keywords)
@@ -0,0 +1,107 @@
+"""
+Вектори текстів через embeddings API OLLAMA (для embedding-пошуку уривків бази знань)
+Вектор запиту мемоізується за нормалізованим ключем, тож повторні й переформульовані
+питання не роблять повторного запиту до OLLAMA
+"""
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from typing import List, Optional
+from ollama_optimized.endpoint_pool import EndpointPool
+from ollama_optimized.transport import OllamaTransport
+from utils.text_normalizer import TextNormalizer
+from config import EMBEDDING_MODEL, EMBEDDING_TIMEOUT
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Модель без OLLAMA: детерміновані вектори з хешів нормалізованих слів (локальна перевірка, CI)
+HASHING_MODEL = "hashing"
+HASHING_DIMENSIONS = 256
+
+
+def hashing_vector(text: str, dimensions: int = HASHING_DIMENSIONS) -> List[float]:
+    """Мішок канонічних токенів, розкладений хешем по вимірах (той самий текст - той самий вектор)"""
+    vector = [0.0] * dimensions
+    for term in TextNormalizer.terms(text):
+        bucket = int.from_bytes(hashlib.md5(term.encode("utf-8")).digest()[:4], "little") % dimensions
+        vector[bucket] += 1.0
+    return vector
+
+
+class OllamaEmbedder:
+    """Клієнт embeddings API з LRU-пам'яттю векторів запитів"""
+
+    def __init__(self, endpoints: EndpointPool, model: str = EMBEDDING_MODEL, memo_size: int = 2048):
+        self.endpoints = endpoints
+        self.model = model
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.requests = 0
+        self.memo_hits = 0
+        self.failures = 0
+
+    async def embed(self, texts: List[str], timeout: float = 120) -> List[List[float]]:
+        """
+        Вектори для списку текстів
+
+        /api/embed приймає пакет текстів; старі сервери мають лише /api/embeddings (по одному).
+        Модель HASHING_MODEL рахується локально, без запитів до OLLAMA.
+        """
+        self.requests += 1
+        if self.model == HASHING_MODEL:
+            return [hashing_vector(text) for text in texts]
+        async with self.endpoints.lease() as endpoint:
+            body = OllamaTransport.encode_payload({"model": self.model, "input": texts})
+            async with endpoint.transport.post("/api/embed", body, timeout=timeout) as response:
+                if response.status == 200:
+                    data = json.loads(await response.read())
+                    return data.get("embeddings", [])
+                if response.status != 404:
+                    raise RuntimeError(f"OLLAMA embeddings: HTTP {response.status} - {await response.text()}")
+
+            vectors = []
+            for text in texts:
+                body = OllamaTransport.encode_payload({"model": self.model, "prompt": text})
+                async with endpoint.transport.post("/api/embeddings", body, timeout=timeout) as response:
+                    if response.status != 200:
+                        raise RuntimeError(f"OLLAMA embeddings: HTTP {response.status} - {await response.text()}")
+                    vectors.append(json.loads(await response.read()).get("embedding", []))
+            return vectors
+
+    async def embed_query(self, query: str, timeout: float = EMBEDDING_TIMEOUT) -> Optional[List[float]]:
+        """Вектор питання користувача або None (помилка чи перевищено ліміт часу - лише BM25)"""
+        if not query:
+            return None
+        key = TextNormalizer.cache_key(query)
+        vector = self._memo.get(key)
+        if vector is not None:
+            self._memo.move_to_end(key)
+            self.memo_hits += 1
+            return vector
+
+        try:
+            vectors = await asyncio.wait_for(self.embed([query], timeout=timeout), timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failures += 1
+            logger.debug(f"Вектор запиту не отримано: {e}")
+            return None
+        if not vectors or not vectors[0]:
+            return None
+
+        self._memo[key] = vectors[0]
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        return vectors[0]
+
+    def get_stats(self) -> dict:
+        return {
+            "model": self.model,
+            "requests": self.requests,
+            "memo_hits": self.memo_hits,
+            "memo_size": len(self._memo),
+            "failures": self.failures
+        }
@@ -0,0 +1,246 @@
+"""
+Пул OLLAMA endpoint-ів з маршрутизацією за найменшою кількістю активних запитів
+Ефект: горизонтальне масштабування (кілька серверів OLLAMA) без окремого балансувальника
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Iterable, AsyncIterator
+from config import OLLAMA_API_URL, OLLAMA_API_URLS, OLLAMA_MODEL, OLLAMA_HEALTH_INTERVAL
+from ollama_optimized.transport import OllamaTransport
+from ollama_optimized.capabilities import OllamaCapabilities, probe_capabilities
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaEndpoint:
+    """Один сервер OLLAMA: транспорт, вага, модель, стан здоров'я та метрики"""
+
+    # Скільки помилок поспіль переводять endpoint у нездоровий стан
+    FAILURE_THRESHOLD = 3
+    MAX_LATENCIES = 200
+    # Пауза (секунди) перед повторною перевіркою можливостей недоступного сервера
+    CAPABILITY_RETRY_INTERVAL = 30.0
+
+    def __init__(self, url: str, weight: float = 1.0, model: Optional[str] = None):
+        self.url = url.rstrip("/")
+        self.weight = max(weight, 0.01)
+        self.model = model
+        self.transport = OllamaTransport(self.url)
+
+        self.outstanding = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.latencies: List[float] = []
+        self.capabilities: Optional[OllamaCapabilities] = None
+        self._capabilities_failed_at: Optional[float] = None
+        self._capabilities_lock = asyncio.Lock()
+
+    @property
+    def load(self) -> float:
+        """Навантаження з урахуванням ваги (менше - краще)"""
+        return self.outstanding / self.weight
+
+    def record_success(self, latency: float):
+        """Пасивна перевірка здоров'я: успішний запит"""
+        self.requests += 1
+        self.consecutive_failures = 0
+        if not self.healthy:
+            logger.info(f"OLLAMA endpoint {self.url} знову доступний")
+        self.healthy = True
+        self.latencies.append(latency)
+        if len(self.latencies) > self.MAX_LATENCIES:
+            self.latencies.pop(0)
+
+    def record_failure(self, error: str):
+        """Пасивна перевірка здоров'я: помилка запиту"""
+        self.requests += 1
+        self.errors += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.healthy and self.consecutive_failures >= self.FAILURE_THRESHOLD:
+            self.healthy = False
+            logger.warning(f"OLLAMA endpoint {self.url} позначено недоступним: {error}")
+
+    async def refresh_capabilities(self) -> Optional[OllamaCapabilities]:
+        """Повторна перевірка можливостей сервера (при старті та після відновлення)"""
+        capabilities = await probe_capabilities(self.transport)
+        if capabilities is None:
+            self._capabilities_failed_at = time.monotonic()
+        else:
+            self._capabilities_failed_at = None
+            self.capabilities = capabilities
+            model = self.model or OLLAMA_MODEL
+            if not capabilities.has_model(model):
+                logger.warning(f"OLLAMA endpoint {self.url}: модель {model} не знайдена на сервері")
+        return self.capabilities
+
+    async def get_capabilities(self) -> OllamaCapabilities:
+        """
+        Можливості сервера (перевіряються один раз і кешуються)
+
+        Невдала перевірка повторюється не частіше ніж раз на CAPABILITY_RETRY_INTERVAL,
+        і одночасні запити чекають одну перевірку, а не запускають кожен свою.
+        """
+        if self.capabilities is None and not self._capabilities_backoff():
+            async with self._capabilities_lock:
+                if self.capabilities is None and not self._capabilities_backoff():
+                    await self.refresh_capabilities()
+        # Сервер недоступний - тимчасово вважаємо його сучасним, не кешуючи
+        return self.capabilities or OllamaCapabilities()
+
+    def _capabilities_backoff(self) -> bool:
+        """Чи ще триває пауза після невдалої перевірки можливостей"""
+        return (
+            self._capabilities_failed_at is not None
+            and time.monotonic() - self._capabilities_failed_at < self.CAPABILITY_RETRY_INTERVAL
+        )
+
+    async def check_health(self) -> bool:
+        """Активна перевірка здоров'я (/api/tags, потім /api/version)"""
+        for path in ("/api/tags", "/api/version"):
+            try:
+                async with self.transport.get(path, timeout=5) as response:
+                    if response.status == 200:
+                        return True
+            except Exception as e:
+                self.last_error = str(e)
+        return False
+
+    def get_stats(self) -> Dict:
+        """Метрики endpoint"""
+        latencies = sorted(self.latencies)
+        return {
+            "url": self.url,
+            "model": self.model,
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": (self.errors / self.requests * 100) if self.requests > 0 else 0,
+            "avg_latency": sum(latencies) / len(latencies) if latencies else 0,
+            "p95_latency": latencies[int(len(latencies) * 0.95)] if latencies else 0,
+            "last_error": self.last_error,
+            "capabilities": self.capabilities.to_dict() if self.capabilities else None
+        }
+
+
+def parse_endpoints(spec: str) -> List[OllamaEndpoint]:
+    """
+    Розбір списку endpoint-ів з конфігурації
+
+    Формат: "url[|вага[|модель]]" через кому, наприклад:
+    "http://gpu1:11434|2|llama3.1,http://cpu1:11434"
+    """
+    endpoints = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        parts = [p.strip() for p in item.split("|")]
+        weight = 1.0
+        if len(parts) > 1 and parts[1]:
+            try:
+                weight = float(parts[1])
+            except ValueError:
+                logger.warning(f"Некоректна вага endpoint '{item}', використовуємо 1")
+        model = parts[2] if len(parts) > 2 and parts[2] else None
+        endpoints.append(OllamaEndpoint(parts[0], weight, model))
+    return endpoints
+
+
+class EndpointPool:
+    """Маршрутизація запитів між endpoint-ами з пасивною та активною перевіркою здоров'я"""
+
+    def __init__(self, endpoints: List[OllamaEndpoint], health_interval: float = OLLAMA_HEALTH_INTERVAL):
+        if not endpoints:
+            raise ValueError("Потрібен хоча б один OLLAMA endpoint")
+        self.endpoints = endpoints
+        self.health_interval = health_interval
+        self._health_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls) -> "EndpointPool":
+        """Пул з OLLAMA_API_URLS (або одного OLLAMA_API_URL)"""
+        endpoints = parse_endpoints(OLLAMA_API_URLS) if OLLAMA_API_URLS else []
+        if not endpoints:
+            endpoints = [OllamaEndpoint(OLLAMA_API_URL)]
+        return cls(endpoints)
+
+    def pick(self, exclude: Iterable[OllamaEndpoint] = ()) -> Optional[OllamaEndpoint]:
+        """Endpoint з найменшим навантаженням (здорові мають перевагу)"""
+        excluded = set(exclude)
+        candidates = [ep for ep in self.endpoints if ep not in excluded]
+        if not candidates:
+            return None
+        healthy = [ep for ep in candidates if ep.healthy]
+        return min(healthy or candidates, key=lambda ep: ep.load)
+
+    def has_alternative(self, exclude: Iterable[OllamaEndpoint]) -> bool:
+        """Чи є ще не випробуваний здоровий endpoint"""
+        excluded = set(exclude)
+        return any(ep.healthy and ep not in excluded for ep in self.endpoints)
+
+    @asynccontextmanager
+    async def lease(self, exclude: Iterable[OllamaEndpoint] = ()) -> AsyncIterator[OllamaEndpoint]:
+        """Endpoint для одного запиту (лічильник активних запитів)"""
+        endpoint = self.pick(exclude) or self.pick()
+        endpoint.outstanding += 1
+        try:
+            yield endpoint
+        finally:
+            endpoint.outstanding -= 1
+
+    async def check_all(self) -> bool:
+        """Активна перевірка всіх endpoint-ів; True якщо хоча б один доступний"""
+        results = await asyncio.gather(*(ep.check_health() for ep in self.endpoints))
+        for endpoint, ok in zip(self.endpoints, results):
+            if ok and (not endpoint.healthy or endpoint.capabilities is None):
+                if not endpoint.healthy:
+                    logger.info(f"OLLAMA endpoint {endpoint.url} відновлено перевіркою")
+                # Після відновлення сервер міг оновитися - перевіряємо можливості знову
+                await endpoint.refresh_capabilities()
+            if ok:
+                endpoint.healthy = True
+                endpoint.consecutive_failures = 0
+            elif endpoint.healthy:
+                logger.warning(f"OLLAMA endpoint {endpoint.url} не відповідає на перевірку")
+                endpoint.healthy = False
+        return any(results)
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_all()
+            except Exception as e:
+                logger.error(f"Помилка перевірки OLLAMA endpoint-ів: {e}")
+
+    async def start(self):
+        """Відкриття транспортів та запуск фонової перевірки здоров'я"""
+        for endpoint in self.endpoints:
+            await endpoint.transport.start()
+        await asyncio.gather(*(ep.refresh_capabilities() for ep in self.endpoints))
+        if self._health_task is None and self.health_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self):
+        """Зупинка перевірки здоров'я та закриття транспортів"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        for endpoint in self.endpoints:
+            await endpoint.transport.close()
+
+    def get_stats(self) -> List[Dict]:
+        """Метрики всіх endpoint-ів"""
+        return [ep.get_stats() for ep in self.endpoints]
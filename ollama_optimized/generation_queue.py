@@ -0,0 +1,161 @@
+"""
+Черга генерацій OLLAMA з обмеженням паралельності, пріоритетами та скиданням навантаження
+Ефект: OLLAMA не перевантажується, а користувач замість таймауту отримує детерміновану відповідь
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Tuple, Optional, AsyncIterator
+from config import OLLAMA_MAX_CONCURRENCY, OLLAMA_QUEUE_WAIT_BUDGET
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Пріоритети (менше значення - раніше в черзі)
+PRIORITY_HIGH = 0    # вступ, вартість навчання
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2     # довгі CoT промпти, порівняння
+
+
+class GenerationShed(Exception):
+    """Запит скинуто: очікуваний час у черзі перевищує бюджет"""
+
+    def __init__(self, estimated_wait: float):
+        super().__init__(f"Очікуваний час у черзі {estimated_wait:.1f}s перевищує бюджет")
+        self.estimated_wait = estimated_wait
+
+
+class GenerationScheduler:
+    """Обмежена пріоритетна черга генерацій перед OLLAMA"""
+
+    def __init__(
+        self,
+        max_concurrency: int = OLLAMA_MAX_CONCURRENCY,
+        wait_budget: float = OLLAMA_QUEUE_WAIT_BUDGET,
+        initial_service_time: float = 10.0,
+        smoothing: float = 0.2
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.wait_budget = wait_budget
+        # Ковзне середнє (EWMA) тривалості однієї генерації
+        self.service_time = initial_service_time
+        self.smoothing = smoothing
+
+        self._running = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+        self.admitted = 0
+        self.shed = 0
+        self.max_queue_depth = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Кількість запитів, що чекають на слот"""
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    def estimate_wait(self, priority: int = PRIORITY_NORMAL) -> float:
+        """Оцінка часу очікування (секунди) для нового запиту з даним пріоритетом"""
+        ahead = sum(
+            1 for p, _, fut in self._waiters
+            if p <= priority and not fut.done()
+        )
+        free = self.max_concurrency - self._running
+        if ahead < free:
+            return 0.0
+        rounds = (ahead - free) // self.max_concurrency + 1
+        return rounds * self.service_time
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: int = PRIORITY_NORMAL,
+        max_wait: Optional[float] = None
+    ) -> AsyncIterator[None]:
+        """
+        Слот для однієї генерації
+
+        Args:
+            max_wait: додаткове обмеження очікування (залишок дедлайну запиту)
+
+        Raises:
+            GenerationShed: якщо очікуваний час у черзі перевищує бюджет
+                або слот не звільнився до max_wait
+        """
+        await self._acquire(priority, max_wait)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._observe(time.monotonic() - started)
+            self._release()
+
+    async def _acquire(self, priority: int, max_wait: Optional[float] = None):
+        if self._running < self.max_concurrency and self.queue_depth == 0:
+            self._running += 1
+            self.admitted += 1
+            return
+
+        estimated_wait = self.estimate_wait(priority)
+        budget = self.wait_budget if max_wait is None else min(self.wait_budget, max_wait)
+        if estimated_wait > budget:
+            self.shed += 1
+            logger.warning(
+                f"Генерацію скинуто: черга {self.queue_depth}, "
+                f"очікування ~{estimated_wait:.1f}s > {budget:.1f}s"
+            )
+            raise GenerationShed(estimated_wait)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            # Оцінка могла помилитися - дедлайн запиту обмежує і фактичне очікування
+            await asyncio.wait_for(future, max_wait)
+        except asyncio.TimeoutError:
+            self._abandon(future)
+            self.shed += 1
+            logger.warning(f"Генерацію скинуто: слот не звільнився за {max_wait:.1f}s (дедлайн запиту)")
+            raise GenerationShed(max_wait)
+        except asyncio.CancelledError:
+            self._abandon(future)
+            raise
+        self.admitted += 1
+
+    def _abandon(self, future: asyncio.Future):
+        """Прибирає запит, що перестав чекати, з черги"""
+        if future.done() and not future.cancelled():
+            # Слот вже передано цьому запиту - віддаємо наступному
+            self._release()
+        else:
+            future.cancel()
+            self._waiters = [w for w in self._waiters if not w[2].done()]
+            heapq.heapify(self._waiters)
+
+    def _release(self):
+        """Передає слот наступному в черзі або звільняє його"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._running -= 1
+
+    def _observe(self, duration: float):
+        self.service_time += self.smoothing * (duration - self.service_time)
+
+    def get_stats(self) -> Dict:
+        """Статистика черги генерацій"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self._running,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "estimated_wait": self.estimate_wait(PRIORITY_LOW),
+            "avg_service_time": self.service_time,
+            "admitted": self.admitted,
+            "shed": self.shed
+        }
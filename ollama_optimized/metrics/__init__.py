@@ -2,6 +2,7 @@
 Метрики для моніторингу роботи OLLAMA
 """
 from ollama_optimized.metrics.collector import MetricsCollector
+from ollama_optimized.metrics.tracing import Tracer, RequestTrace, StageHistogram
+from ollama_optimized.metrics.ollama_timings import OllamaTimings
 
-__all__ = ['MetricsCollector']
-
+__all__ = ['MetricsCollector', 'Tracer', 'RequestTrace', 'StageHistogram', 'OllamaTimings']
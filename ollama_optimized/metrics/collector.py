@@ -3,6 +3,8 @@
 """
 from typing import Dict, List
 from datetime import datetime
+from config import OLLAMA_RELOAD_THRESHOLD
+from ollama_optimized.metrics.ollama_timings import OllamaTimings
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,6 +19,20 @@ class MetricsCollector:
             "cache_hits": 0,
             "validation_failures": 0,
             "regeneration_count": 0,
+            "coalesced_requests": 0,
+            "shed_requests": 0,
+            "fallbacks_by_reason": {},
+            "parallel": {
+                "runs": 0,
+                "early_wins": 0,
+                "candidates_launched": 0,
+                "candidates_cancelled": 0
+            },
+            # Лічильники OLLAMA (prompt_eval/eval/load) за типом питання та endpoint
+            "ollama_timings": {
+                "by_question_type": {},
+                "by_endpoint": {}
+            },
             "response_times": [],
             "response_lengths": [],
             "question_types": {},
@@ -70,6 +86,92 @@ class MetricsCollector:
         # except Exception as e:
         #     logger.warning(f"Помилка збереження метрик: {e}")
     
+    def record_coalesced(self):
+        """Запит приєднався до вже запущеної генерації такого ж питання"""
+        self.metrics["coalesced_requests"] += 1
+    
+    def record_shed(self):
+        """Запит отримав детерміновану відповідь через перевантаження черги генерацій"""
+        self.metrics["shed_requests"] += 1
+    
+    def record_fallback(self, reason: str):
+        """Детермінована відповідь без OLLAMA (circuit breaker, вичерпаний бюджет тощо)"""
+        self.metrics["fallbacks_by_reason"][reason] = \
+            self.metrics["fallbacks_by_reason"].get(reason, 0) + 1
+    
+    def record_parallel(self, launched: int, cancelled: int, early_win: bool):
+        """Результат паралельної генерації (скільки кандидатів запущено та скасовано)"""
+        parallel = self.metrics["parallel"]
+        parallel["runs"] += 1
+        parallel["candidates_launched"] += launched
+        parallel["candidates_cancelled"] += cancelled
+        if early_win:
+            parallel["early_wins"] += 1
+    
+    def record_ollama_timings(
+        self,
+        timings: OllamaTimings,
+        question_type: str = None,
+        endpoint: str = None,
+        prompt_chars: int = 0
+    ):
+        """Лічильники однієї генерації OLLAMA (prefill, генерація, завантаження моделі)"""
+        reload = timings.is_reload(OLLAMA_RELOAD_THRESHOLD)
+        if reload:
+            logger.warning(
+                f"OLLAMA {endpoint or ''}: модель завантажувалась {timings.load_duration:.1f}s під час запиту"
+            )
+        
+        groups = self.metrics["ollama_timings"]
+        for group, key in (("by_question_type", question_type or "unknown"), ("by_endpoint", endpoint or "unknown")):
+            totals = groups[group].setdefault(key, {
+                "requests": 0,
+                "prompt_tokens": 0,
+                "prompt_chars": 0,
+                "max_prompt_tokens": 0,
+                "prompt_eval_time": 0.0,
+                "eval_tokens": 0,
+                "eval_time": 0.0,
+                "load_time": 0.0,
+                "reloads": 0
+            })
+            totals["requests"] += 1
+            totals["prompt_tokens"] += timings.prompt_eval_count
+            totals["prompt_chars"] += prompt_chars
+            totals["max_prompt_tokens"] = max(totals["max_prompt_tokens"], timings.prompt_eval_count)
+            totals["prompt_eval_time"] += timings.prompt_eval_duration
+            totals["eval_tokens"] += timings.eval_count
+            totals["eval_time"] += timings.eval_duration
+            totals["load_time"] += timings.load_duration
+            if reload:
+                totals["reloads"] += 1
+    
+    @staticmethod
+    def _summarize_timings(totals: Dict) -> Dict:
+        """Середні значення та швидкість (токени/с) з накопичених лічильників"""
+        requests = totals["requests"]
+        return {
+            "requests": requests,
+            "avg_prompt_tokens": totals["prompt_tokens"] / requests if requests else 0,
+            "max_prompt_tokens": totals["max_prompt_tokens"],
+            "avg_prompt_chars": totals["prompt_chars"] / requests if requests else 0,
+            "avg_prefill_time": totals["prompt_eval_time"] / requests if requests else 0,
+            "prefill_tokens_per_sec": (
+                totals["prompt_tokens"] / totals["prompt_eval_time"] if totals["prompt_eval_time"] > 0 else 0
+            ),
+            "avg_eval_tokens": totals["eval_tokens"] / requests if requests else 0,
+            "avg_decode_time": totals["eval_time"] / requests if requests else 0,
+            "decode_tokens_per_sec": (
+                totals["eval_tokens"] / totals["eval_time"] if totals["eval_time"] > 0 else 0
+            ),
+            "prefill_share": (
+                totals["prompt_eval_time"] / (totals["prompt_eval_time"] + totals["eval_time"])
+                if totals["prompt_eval_time"] + totals["eval_time"] > 0 else 0
+            ),
+            "load_time": totals["load_time"],
+            "reloads": totals["reloads"]
+        }
+    
     def get_statistics(self) -> Dict:
         """Отримання статистики"""
         total = self.metrics["total_requests"]
@@ -84,6 +186,14 @@ class MetricsCollector:
             "total_requests": total,
             "cache_hit_rate": (self.metrics["cache_hits"] / total * 100) if total > 0 else 0,
             "validation_failure_rate": (self.metrics["validation_failures"] / total * 100) if total > 0 else 0,
+            "coalesced_requests": self.metrics["coalesced_requests"],
+            "shed_requests": self.metrics["shed_requests"],
+            "fallbacks_by_reason": self.metrics["fallbacks_by_reason"].copy(),
+            "parallel": self.metrics["parallel"].copy(),
+            "ollama_timings": {
+                group: {key: self._summarize_timings(totals) for key, totals in groups.items()}
+                for group, groups in self.metrics["ollama_timings"].items()
+            },
             "avg_response_time": sum(response_times) / len(response_times) if response_times else 0,
             "avg_response_length": sum(response_lengths) / len(response_lengths) if response_lengths else 0,
             "question_types_distribution": self.metrics["question_types"].copy()
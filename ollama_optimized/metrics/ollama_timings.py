@@ -0,0 +1,80 @@
+"""
+Лічильники часу з відповіді OLLAMA (prompt_eval, eval, load)
+Ефект: видно, скільки коштує обробка великого системного промпту (prefill) і генерація токенів
+"""
+from typing import Dict, Optional
+
+
+# OLLAMA повертає тривалості в наносекундах
+NANOSECONDS = 1_000_000_000
+
+
+class OllamaTimings:
+    """Лічильники однієї генерації (тривалості в секундах)"""
+
+    def __init__(
+        self,
+        prompt_eval_count: int = 0,
+        prompt_eval_duration: float = 0.0,
+        eval_count: int = 0,
+        eval_duration: float = 0.0,
+        load_duration: float = 0.0,
+        total_duration: float = 0.0
+    ):
+        self.prompt_eval_count = prompt_eval_count
+        self.prompt_eval_duration = prompt_eval_duration
+        self.eval_count = eval_count
+        self.eval_duration = eval_duration
+        self.load_duration = load_duration
+        self.total_duration = total_duration
+
+    @classmethod
+    def from_response(cls, data: Dict) -> Optional["OllamaTimings"]:
+        """
+        Лічильники з фінальної відповіді /api/chat або /api/generate (або done-рядка streaming)
+
+        Returns:
+            OllamaTimings або None, якщо сервер не повернув лічильники
+        """
+        if not isinstance(data, dict) or "eval_count" not in data and "prompt_eval_count" not in data:
+            return None
+
+        def seconds(key: str) -> float:
+            return (data.get(key) or 0) / NANOSECONDS
+
+        return cls(
+            prompt_eval_count=data.get("prompt_eval_count") or 0,
+            prompt_eval_duration=seconds("prompt_eval_duration"),
+            eval_count=data.get("eval_count") or 0,
+            eval_duration=seconds("eval_duration"),
+            load_duration=seconds("load_duration"),
+            total_duration=seconds("total_duration")
+        )
+
+    @property
+    def prefill_tokens_per_sec(self) -> float:
+        if self.prompt_eval_duration <= 0:
+            return 0.0
+        return self.prompt_eval_count / self.prompt_eval_duration
+
+    @property
+    def decode_tokens_per_sec(self) -> float:
+        if self.eval_duration <= 0:
+            return 0.0
+        return self.eval_count / self.eval_duration
+
+    def is_reload(self, threshold: float) -> bool:
+        """Чи завантажувалась модель у пам'ять під час цього запиту"""
+        return self.load_duration >= threshold
+
+    def to_dict(self) -> Dict:
+        return {
+            "prompt_eval_count": self.prompt_eval_count,
+            "prompt_eval_duration": self.prompt_eval_duration,
+            "eval_count": self.eval_count,
+            "eval_duration": self.eval_duration,
+            "load_duration": self.load_duration,
+            "total_duration": self.total_duration,
+            "prefill_tokens_per_sec": self.prefill_tokens_per_sec,
+            "decode_tokens_per_sec": self.decode_tokens_per_sec
+        }
@@ -0,0 +1,187 @@
+"""
+Трасування етапів генерації відповіді (span-и з гістограмами часу)
+Ефект: видно, скільки часу займає кожен етап - класифікація, контекст, кеш, промпт,
+черга, OLLAMA, регенерації, валідація - і які запити найповільніші
+"""
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from config import TRACE_SLOWEST_N
+
+
+# Поточна траса запиту; успадковується задачами asyncio (single-flight, кандидати)
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("ollama_request_trace", default=None)
+
+
+class StageHistogram:
+    """Гістограма тривалостей одного етапу (секунди)"""
+
+    # Верхні межі кошиків; останній кошик - усе, що довше
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self, max_samples: int = 1000):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        # Останні значення для перцентилів
+        self.samples = deque(maxlen=max_samples)
+
+    def observe(self, duration: float):
+        for i, bound in enumerate(self.BUCKETS):
+            if duration <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.samples.append(duration)
+
+    def percentile(self, p: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def get_stats(self) -> Dict:
+        buckets = {f"<={bound}s": n for bound, n in zip(self.BUCKETS, self.counts)}
+        buckets[f">{self.BUCKETS[-1]}s"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "buckets": buckets
+        }
+
+
+class RequestTrace:
+    """Етапи одного запиту: (етап, зсув від початку, тривалість)"""
+
+    def __init__(self, operation: str, query: str):
+        self.operation = operation
+        self.query = query[:100] if query else ""
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []
+        self.attributes: Dict = {}
+        self.total = 0.0
+
+    def add_span(self, name: str, started: float, duration: float):
+        self.spans.append((name, started - self._started, duration))
+
+    def finish(self):
+        self.total = time.perf_counter() - self._started
+
+    def breakdown(self) -> Dict[str, float]:
+        """Сумарний час за етапами (етап може повторюватися: спроби, регенерації)"""
+        result: Dict[str, float] = {}
+        for name, _, duration in self.spans:
+            result[name] = result.get(name, 0.0) + duration
+        return result
+
+    def to_dict(self) -> Dict:
+        return {
+            "operation": self.operation,
+            "query": self.query,
+            "started_at": self.started_at,
+            "total": self.total,
+            "breakdown": self.breakdown(),
+            "spans": [
+                {"stage": name, "offset": offset, "duration": duration}
+                for name, offset, duration in self.spans
+            ],
+            "attributes": dict(self.attributes)
+        }
+
+
+class Tracer:
+    """Гістограми за етапами та найповільніші запити з повною розбивкою"""
+
+    def __init__(self, slowest_size: int = TRACE_SLOWEST_N, max_samples: int = 1000):
+        self.slowest_size = slowest_size
+        self.max_samples = max_samples
+        self.stages: Dict[str, StageHistogram] = {}
+        self.operations: Dict[str, StageHistogram] = {}
+        # Мін-купа (тривалість, порядковий номер, траса): найшвидша з N найповільніших - на вершині
+        self._slowest: List[Tuple[float, int, Dict]] = []
+        self._seq = itertools.count()
+
+    @contextmanager
+    def trace(self, operation: str, query: str) -> Iterator[RequestTrace]:
+        """Траса одного запиту; span-и всередині (і в дочірніх задачах) потрапляють у неї"""
+        request_trace = RequestTrace(operation, query)
+        token = _current_trace.set(request_trace)
+        try:
+            yield request_trace
+        finally:
+            try:
+                _current_trace.reset(token)
+            except ValueError:
+                # Async-генератор закрито з іншого контексту - змінна там вже не наша
+                pass
+            request_trace.finish()
+            self._finish(request_trace)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Вимірювання одного етапу"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started, started)
+
+    def record(self, name: str, duration: float, started: Optional[float] = None):
+        """Запис етапу, виміряного окремо (наприклад, очікування слоту)"""
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages[name] = StageHistogram(self.max_samples)
+        histogram.observe(duration)
+
+        request_trace = _current_trace.get()
+        if request_trace is not None:
+            if started is None:
+                started = time.perf_counter() - duration
+            request_trace.add_span(name, started, duration)
+
+    def annotate(self, **attributes):
+        """Атрибути поточної траси (тип питання, кеш, режим тощо)"""
+        request_trace = _current_trace.get()
+        if request_trace is not None:
+            request_trace.attributes.update(attributes)
+
+    def _finish(self, request_trace: RequestTrace):
+        histogram = self.operations.get(request_trace.operation)
+        if histogram is None:
+            histogram = self.operations[request_trace.operation] = StageHistogram(self.max_samples)
+        histogram.observe(request_trace.total)
+
+        if self.slowest_size <= 0:
+            return
+        # Знімок зараз: пізні span-и (скасовані кандидати) не змінюють збережену розбивку
+        entry = (request_trace.total, next(self._seq), request_trace.to_dict())
+        if len(self._slowest) < self.slowest_size:
+            heapq.heappush(self._slowest, entry)
+        elif request_trace.total > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def get_slowest(self, limit: Optional[int] = None) -> List[Dict]:
+        """Найповільніші запити (від найповільнішого)"""
+        ordered = [entry[2] for entry in sorted(self._slowest, reverse=True)]
+        return ordered[:limit] if limit else ordered
+
+    def get_stats(self) -> Dict:
+        return {
+            "stages": {name: h.get_stats() for name, h in self.stages.items()},
+            "operations": {name: h.get_stats() for name, h in self.operations.items()},
+            "slowest": self.get_slowest()
+        }
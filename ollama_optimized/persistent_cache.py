@@ -0,0 +1,326 @@
+"""
+Постійний рівень кешу відповідей (SQLite у змонтованому томі)
+Ефект: після перезапуску бота кеш не порожній - перші години не йдуть повністю в OLLAMA
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+from config import (
+    PERSISTENT_CACHE_PATH, PERSISTENT_CACHE_TTL_HOURS, PERSISTENT_CACHE_MAX_ENTRIES,
+    PERSISTENT_CACHE_FLUSH_INTERVAL
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _join_tags(tags: Iterable[str]) -> str:
+    """Теги для колонки SQLite: ",t1,t2," - пошук тегу через LIKE '%,t1,%'"""
+    tags = list(tags)
+    return f",{','.join(tags)}," if tags else ""
+
+
+def knowledge_version(knowledge_text: str) -> str:
+    """Версія бази знань - відповіді, згенеровані на іншій версії, не повертаються"""
+    return hashlib.md5((knowledge_text or "").encode("utf-8")).hexdigest()[:16]
+
+
+class SQLiteCacheStore:
+    """Сховище записів у SQLite; методи синхронні й викликаються через asyncio.to_thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                knowledge_version TEXT NOT NULL,
+                query TEXT NOT NULL,
+                response TEXT NOT NULL,
+                question_type TEXT,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                tags TEXT NOT NULL DEFAULT ''
+            )
+        """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(response_cache)")}
+        if "tags" not in columns:
+            # Файл, створений до появи тегів
+            conn.execute("ALTER TABLE response_cache ADD COLUMN tags TEXT NOT NULL DEFAULT ''")
+        return conn
+
+    def load(self, version: str, ttl_seconds: float, limit: int) -> List[Dict]:
+        """Записи поточної версії (найсвіжіше використані); застарілі видаляються"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "DELETE FROM response_cache WHERE knowledge_version != ? OR created_at < ?",
+                    (version, time.time() - ttl_seconds)
+                )
+            rows = conn.execute(
+                """
+                SELECT key, query, response, question_type, created_at, last_used, tags
+                FROM response_cache
+                ORDER BY last_used DESC
+                LIMIT ?
+                """,
+                (limit,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return [
+            {
+                "key": key,
+                "query": query,
+                "response": response,
+                "question_type": question_type,
+                "created_at": created_at,
+                "last_used": last_used,
+                "tags": tuple(t for t in tags.split(",") if t)
+            }
+            for key, query, response, question_type, created_at, last_used, tags in rows
+        ]
+
+    def write(self, version: str, entries: List[Dict]):
+        """Пакетний запис (INSERT OR REPLACE)"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO response_cache
+                        (key, knowledge_version, query, response, question_type, created_at, last_used, tags)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (
+                            e["key"], version, e["query"], e["response"], e["question_type"],
+                            e["created_at"], e["last_used"], _join_tags(e["tags"])
+                        )
+                        for e in entries
+                    ]
+                )
+        finally:
+            conn.close()
+
+    def delete_tags(self, tags: List[str]) -> int:
+        """Видалення записів з будь-яким із тегів (включно з тими, що не завантажені в пам'ять)"""
+        conn = self._connect()
+        try:
+            with conn:
+                deleted = 0
+                for tag in tags:
+                    deleted += conn.execute(
+                        "DELETE FROM response_cache WHERE tags LIKE ?", (f"%,{tag},%",)
+                    ).rowcount
+        finally:
+            conn.close()
+        return deleted
+
+
+class PersistentCache:
+    """
+    Другий рівень кешу: записи за тим самим ключем, що й ResponseCache
+    (нормалізований запит + відбиток контексту), з версією бази знань
+
+    Завантаження - у фоні при старті (до його завершення рівень просто промахується),
+    запис - відкладений: нові записи накопичуються й скидаються пакетом раз на інтервал.
+    """
+
+    def __init__(
+        self,
+        store: Optional[SQLiteCacheStore] = None,
+        version: str = "",
+        ttl_hours: float = PERSISTENT_CACHE_TTL_HOURS,
+        max_entries: int = PERSISTENT_CACHE_MAX_ENTRIES,
+        flush_interval: float = PERSISTENT_CACHE_FLUSH_INTERVAL
+    ):
+        if store is None and PERSISTENT_CACHE_PATH:
+            store = SQLiteCacheStore(PERSISTENT_CACHE_PATH)
+        self.store = store
+        self.version = version
+        self.ttl = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+
+        # Порядок LRU: найдавніше використані записи на початку
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._pending: Dict[str, Dict] = {}
+        # Теги, записи з якими ще треба видалити з диску
+        self._pending_tags: Set[str] = set()
+        self.loaded = False
+        self._load_task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.written = 0
+        self.invalidated = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    async def start(self):
+        """Фонове завантаження збережених записів та запуск відкладеного запису"""
+        if not self.enabled:
+            return
+        if self._load_task is None:
+            self._load_task = asyncio.create_task(self._load())
+        if self._flush_task is None and self.flush_interval > 0:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def wait_loaded(self):
+        """Очікування фонового завантаження (для прогріву кешу, щоб не генерувати збережене)"""
+        if self._load_task is not None:
+            await asyncio.shield(self._load_task)
+
+    async def close(self):
+        """Зупинка фонових задач та скидання незаписаних записів"""
+        for task in (self._load_task, self._flush_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._load_task = None
+        self._flush_task = None
+        await self.flush()
+
+    async def _load(self):
+        started = time.perf_counter()
+        try:
+            rows = await asyncio.to_thread(self.store.load, self.version, self.ttl, self.max_entries)
+        except Exception as e:
+            logger.error(f"Не вдалося завантажити постійний кеш: {e}")
+            return
+        # Рядки від найсвіжішого: кожен наступний стає на початок черги LRU,
+        # а записи, додані під час завантаження, лишаються новішими
+        for row in rows:
+            # Інвалідація, що сталася під час завантаження, ще не дійшла до диску
+            if self._pending_tags.intersection(row["tags"]):
+                continue
+            if row["key"] not in self.entries:
+                self.entries[row["key"]] = row
+                self.entries.move_to_end(row["key"], last=False)
+        self.loaded = True
+        logger.info(
+            f"Постійний кеш: завантажено {len(rows)} записів "
+            f"(версія {self.version}) за {time.perf_counter() - started:.2f}s"
+        )
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Запис накопичених змін у сховище одним пакетом"""
+        if not self.enabled:
+            return
+        if self._pending_tags:
+            # Видалення - перед записом: нові записи з тими самими тегами вже актуальні
+            tags = list(self._pending_tags)
+            self._pending_tags = set()
+            try:
+                await asyncio.to_thread(self.store.delete_tags, tags)
+            except Exception as e:
+                logger.error(f"Не вдалося інвалідувати постійний кеш ({tags}): {e}")
+        if not self._pending:
+            return
+        batch = list(self._pending.values())
+        self._pending = {}
+        try:
+            await asyncio.to_thread(self.store.write, self.version, batch)
+            self.written += len(batch)
+        except Exception as e:
+            logger.error(f"Не вдалося записати постійний кеш ({len(batch)} записів): {e}")
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        """Відповідь за ключем ResponseCache або None (без звернення до диску)"""
+        if not self.enabled or not key:
+            return None
+        entry = self.entries.get(key)
+        if entry is None or entry["created_at"] + self.ttl <= time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        entry["last_used"] = time.time()
+        self._pending[key] = entry
+        return entry["response"]
+
+    def set(
+        self,
+        key: Optional[str],
+        query: str,
+        response: str,
+        question_type: Optional[str] = None,
+        tags: Iterable[str] = ()
+    ):
+        """Збереження запису (на диск потрапить з наступним скиданням)"""
+        if not self.enabled or not key or not response:
+            return
+        now = time.time()
+        entry = {
+            "key": key,
+            "query": query,
+            "response": response,
+            "question_type": question_type,
+            "created_at": now,
+            "last_used": now,
+            "tags": tuple(tags)
+        }
+        self.entries.pop(key, None)
+        while self.entries and len(self.entries) >= self.max_entries:
+            # Пам'ять обмежена: найдавніше використаний запис лишається лише на диску
+            self.entries.popitem(last=False)
+        self.entries[key] = entry
+        self._pending[key] = entry
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """
+        Видалення записів з будь-яким із тегів: з пам'яті - одразу,
+        з диску - з наступним скиданням (разом із незаписаними змінами)
+        """
+        tags = set(tags)
+        if not self.enabled or not tags:
+            return 0
+        keys = [key for key, entry in self.entries.items() if tags.intersection(entry["tags"])]
+        for key in keys:
+            del self.entries[key]
+        # Незаписані записи могли вже бути витіснені з пам'яті
+        for key in [key for key, entry in self._pending.items() if tags.intersection(entry["tags"])]:
+            del self._pending[key]
+        self._pending_tags.update(tags)
+        self.invalidated += len(keys)
+        return len(keys)
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "loaded": self.loaded,
+            "version": self.version,
+            "size": len(self.entries),
+            "pending": len(self._pending),
+            "written": self.written,
+            "invalidated": self.invalidated,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups * 100) if lookups > 0 else 0
+        }
@@ -2,7 +2,24 @@
 Побудова оптимізованих промптів для OLLAMA
 """
 import json
-from typing import Dict
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class PromptMessages(NamedTuple):
+    """Структурований промпт: системна частина, історія діалогу, питання та текст для generate API"""
+    system: str
+    history: Tuple[Dict[str, str], ...]
+    user: str
+    text: str
+    
+    def to_messages(self) -> List[Dict[str, str]]:
+        """Повідомлення для chat API"""
+        return [{"role": "system", "content": self.system}, *self.history, {"role": "user", "content": self.user}]
+    
+    def with_note(self, note: str) -> "PromptMessages":
+        """Додаткова інструкція до питання (наприклад, при регенерації після помилок валідації)"""
+        return self._replace(user=f"{self.user}\n\n{note}", text=f"{self.text}\n\n{note}")
 
 
 class PromptBuilder:
@@ -47,6 +64,47 @@ class PromptBuilder:
 - Російські/англійські слова
 - Вигадана інформація"""
     
+    # Покрокові інструкції для складних питань (Chain-of-Thought)
+    COT_INSTRUCTIONS = """Відповідай на питання крок за кроком:
+
+КРОК 1: Розуміння питання
+- Про що питають? (спеціальності, вартість, документи, контакти)
+- Яка конкретна інформація потрібна?
+
+КРОК 2: Пошук в базі знань
+- Яка секція бази знань містить відповідь?
+- Які конкретні дані потрібні?
+
+КРОК 3: Формування відповіді
+- Як структурувати відповідь?
+- Які конкретні дані включити?
+
+КРОК 4: Перевірка
+- Чи немає заборонених університетів?
+- Чи правильна орфографія?
+- Чи відповідь відповідає на питання?
+
+ВІДПОВІДЬ (після всіх кроків, структурована, тільки про ХДУ):"""
+    
+    # Повний текстовий промпт для generate API (chat API отримує питання окремим повідомленням)
+    QUESTION_TEMPLATE = """{system}
+
+═══════════════════════════════════════
+ПИТАННЯ КОРИСТУВАЧА:
+{query}
+
+ПРОАНАЛІЗОВАНЕ ПИТАННЯ:
+{analyzed_query}
+═══════════════════════════════════════
+
+ТВОЯ ЗАДАЧА:
+1. Уважно прочитай питання
+2. Знайди відповідну інформацію в базі знань вище
+3. Сформуй точну, структуровану відповідь
+4. Перевір відповідь за списком самоперевірки
+
+ВІДПОВІДЬ (структурована, конкретна, з даними з бази знань):"""
+    
     # Приклади для різних типів питань
     FEW_SHOT_EXAMPLES = {
         "factual": """
@@ -75,6 +133,82 @@ class PromptBuilder:
 """
     }
     
+    def __init__(self, knowledge_version: str = "", max_cached: int = 256):
+        # Системні промпти: (тип питання, відбиток контексту, версія бази знань, CoT) -> текст
+        self.knowledge_version = knowledge_version
+        self.max_cached = max_cached
+        self._system_cache: "OrderedDict[Tuple[str, str, str, bool], str]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def build_messages(
+        self,
+        question_type: str,
+        context: Dict,
+        query: str,
+        fingerprint: Optional[str] = None,
+        history: Optional[List[Dict]] = None,
+        analyzed_query: str = "",
+        cot: bool = False
+    ) -> PromptMessages:
+        """
+        Структурований промпт для chat API (system, історія, питання) та текст для generate API
+        
+        Системна частина для того самого типу питання й відбитку контексту береться з пам'яті:
+        менше роботи на запит, а однакові байти промпту дають OLLAMA перевикористати кеш префіксу.
+        """
+        system = self.get_system_prompt(question_type, context, fingerprint, cot)
+        if cot:
+            text = f"{system}\n\nПИТАННЯ: {analyzed_query}\n\n"
+        else:
+            text = self.QUESTION_TEMPLATE.format(system=system, query=query, analyzed_query=analyzed_query)
+        return PromptMessages(system, self.history_messages(history), query, text)
+    
+    def get_system_prompt(
+        self,
+        question_type: str,
+        context: Dict,
+        fingerprint: Optional[str] = None,
+        cot: bool = False
+    ) -> str:
+        """Системний промпт (мемоізований за відбитком контексту, якщо він є)"""
+        key = (question_type, fingerprint, self.knowledge_version, cot) if fingerprint else None
+        if key is not None:
+            cached = self._system_cache.get(key)
+            if cached is not None:
+                self._system_cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached
+        self.cache_misses += 1
+        
+        system = self.build_system_prompt(question_type, context)
+        if cot:
+            system = f"{system}\n\n{self.COT_INSTRUCTIONS}"
+        
+        if key is not None:
+            self._system_cache[key] = system
+            if len(self._system_cache) > self.max_cached:
+                self._system_cache.popitem(last=False)
+        return system
+    
+    @staticmethod
+    def history_messages(history: Optional[List[Dict]]) -> Tuple[Dict[str, str], ...]:
+        """Попередні повідомлення діалогу у форматі chat API"""
+        messages = []
+        for item in history or ():
+            if isinstance(item, dict) and "user_message" in item and "bot_response" in item:
+                messages.append({"role": "user", "content": item["user_message"]})
+                messages.append({"role": "assistant", "content": item["bot_response"]})
+        return tuple(messages)
+    
+    def get_stats(self) -> Dict:
+        """Ефективність пам'яті системних промптів"""
+        return {
+            "size": len(self._system_cache),
+            "hits": self.cache_hits,
+            "misses": self.cache_misses
+        }
+    
     def build_system_prompt(self, question_type: str, context: Dict, user_query: str = "") -> str:
         """Побудова системного промпту з покращеним розумінням"""
         # Базові інструкції
@@ -170,6 +304,11 @@ class PromptBuilder:
     
     def _format_context(self, context: Dict) -> str:
         """Форматування контексту для промпту"""
+        # Уривки бази знань (id -> текст) - простим текстом: без ключів і екранування JSON,
+        # розмір уже обмежено бюджетом токенів пошуку
+        if context and all(isinstance(value, str) for value in context.values()):
+            return "\n\n".join(context.values())
+        
         # Обмежуємо розмір контексту
         try:
             context_str = json.dumps(context, ensure_ascii=False, indent=2)
@@ -0,0 +1,93 @@
+"""
+Попередньо обчислений індекс секцій бази знань для ContextOptimizer
+Ефект: текст секції в нижньому регістрі, множина основ слів і розмір JSON рахуються
+один раз на версію секції, а не серіалізацією кілобайтів словників на кожне повідомлення
+"""
+import json
+import re
+from typing import Dict, FrozenSet, NamedTuple, Tuple
+from services.knowledge_service import section_version
+from utils.text_normalizer import TextNormalizer
+
+
+_WORD_RE = re.compile(r"\b\w+\b")
+
+# Приблизно 4 символи на токен (див. ContextOptimizer.MAX_CONTEXT_TOKENS)
+CHARS_PER_TOKEN = 4
+
+
+class SectionEntry(NamedTuple):
+    """Незмінні характеристики однієї версії секції"""
+    version: str
+    text: str
+    stems: FrozenSet[str]
+    size: int
+    tokens: int
+    key_size: int
+
+
+def word_stems(text: str) -> FrozenSet[str]:
+    """Основи слів тексту (той самий стемінг, що й для ключів кешу)"""
+    return frozenset(TextNormalizer.stem(word) for word in _WORD_RE.findall(text.lower()))
+
+
+class SectionIndex:
+    """
+    Індекс секцій: (назва, версія секції) -> SectionEntry
+
+    Версія - хеш вмісту (services.knowledge_service.section_version), тож нова версія
+    бази знань після деплою просто дає нові записи; старі витісняються за лімітом.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, str], SectionEntry] = {}
+        self.hits = 0
+        self.builds = 0
+
+    def entry(self, name: str, data) -> SectionEntry:
+        version = section_version(name, data)
+        key = (name, version)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        try:
+            serialized = json.dumps(data, ensure_ascii=False)
+        except (TypeError, ValueError):
+            serialized = str(data)
+        # Пошуковий текст - як і раніше, str() секції (JSON-розмір - для обмеження контексту)
+        text = str(data).lower()
+        entry = SectionEntry(
+            version=version,
+            text=text,
+            stems=word_stems(text),
+            size=len(serialized),
+            tokens=len(serialized) // CHARS_PER_TOKEN,
+            # '"назва": ' у JSON усього контексту
+            key_size=len(json.dumps(name, ensure_ascii=False)) + 2,
+        )
+        if len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = entry
+        self.builds += 1
+        return entry
+
+    def context_size(self, context: Dict) -> int:
+        """Довжина json.dumps(context, ensure_ascii=False) без серіалізації"""
+        if not context:
+            return 2
+        total = 2 + 2 * (len(context) - 1)
+        for name, data in context.items():
+            entry = self.entry(name, data)
+            total += entry.key_size + entry.size
+        return total
+
+    def get_stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "builds": self.builds,
+            "tokens": sum(entry.tokens for entry in self._entries.values()),
+        }
@@ -3,60 +3,59 @@
 Ефект: +20-30% cache hit rate
 """
 import hashlib
-import json
-import re
-from typing import Optional, Dict, List, Tuple
-from datetime import datetime, timedelta
+import math
+from typing import Optional, Dict, Iterable, List, Set, Tuple
 from collections import defaultdict
+from .cache_core import CacheCore, text_size
+from config import SEMANTIC_CACHE_MAX_BYTES, CACHE_TTL_HOURS
+from utils.text_normalizer import TextNormalizer
 
 
 class SemanticCache:
     """Семантичне кешування на основі ключових слів та структури"""
     
-    def __init__(self, max_size: int = 200, ttl_hours: int = 24, similarity_threshold: float = 0.7):
-        self.cache: Dict[str, Dict] = {}
-        self.max_size = max_size
-        self.ttl = timedelta(hours=ttl_hours)
+    # Слова, що дають бонус до схожості (див. _calculate_similarity), у канонічній формі
+    IMPORTANT_WORDS = {
+        token
+        for word in ('хду', 'університет', 'вступ', 'вартість', 'факультет',
+                     'спеціальність', 'документ', 'нмт', 'кампанія')
+        for token in TextNormalizer.tokens(word)
+    }
+    MAX_IMPORTANT_BOOST = 0.2
+    
+    def __init__(
+        self,
+        max_bytes: int = SEMANTIC_CACHE_MAX_BYTES,
+        ttl_hours: float = CACHE_TTL_HOURS,
+        similarity_threshold: float = 0.7
+    ):
+        # LRU + TTL з лімітом пам'яті; записи {response, query, fingerprint, keywords}
+        self.cache = CacheCore(max_bytes, ttl_hours * 3600, on_remove=self._unindex)
         self.similarity_threshold = similarity_threshold
         
-        # Індекс для швидкого пошуку за ключовими словами
-        self.keyword_index: Dict[str, List[str]] = defaultdict(list)
+        # Інвертований індекс: (відбиток контексту, ключове слово) -> ключі записів
+        self.keyword_index: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        
+        self.lookups = 0
+        self.candidates_scored = 0
         
-        # Стоп-слова для фільтрації
-        self.stop_words = {
+        # Стоп-слова для фільтрації (frozenset - аргумент мемоізованого TextNormalizer.tokens)
+        self.stop_words = frozenset({
             'як', 'що', 'де', 'коли', 'чому', 'чи', 'або', 'та', 'і', 'в', 'на', 'з', 'до', 'для',
-            'про', 'про', 'про', 'про', 'про', 'про', 'про', 'про', 'про', 'про', 'про', 'про',
-            'можна', 'може', 'можуть', 'бути', 'є', 'було', 'буде', 'були', 'будуть'
-        }
+            'про', 'можна', 'може', 'можуть', 'бути', 'є', 'було', 'буде', 'були', 'будуть'
+        })
     
     def _extract_keywords(self, text: str) -> List[str]:
-        """Витягування ключових слів з тексту"""
+        """Витягування ключових слів з тексту (канонічні токени TextNormalizer)"""
         if not text:
             return []
         
-        # Нормалізуємо текст
-        normalized = text.lower().strip()
-        normalized = re.sub(r'[^\w\s]', ' ', normalized)
-        normalized = re.sub(r'\s+', ' ', normalized)
-        
-        # Розбиваємо на слова
-        words = normalized.split()
-        
-        # Фільтруємо стоп-слова та короткі слова
-        keywords = [
-            word for word in words
-            if len(word) > 3 and word not in self.stop_words
+        # Стемінг, синоніми та згортання варіантів написання - у TextNormalizer;
+        # тут лише відкидаємо стоп-слова та надто короткі токени
+        return [
+            token for token in TextNormalizer.tokens(text, self.stop_words)
+            if len(token) > 2
         ]
-        
-        # Видаляємо дублікати, зберігаючи порядок
-        seen = set()
-        unique_keywords = []
-        for word in keywords:
-            if word not in seen:
-                seen.add(word)
-                unique_keywords.append(word)
-        
-        return unique_keywords
     
     def _calculate_similarity(self, keywords1: List[str], keywords2: List[str]) -> float:
         """Розрахунок семантичної схожості між двома наборами ключових слів"""
@@ -77,133 +76,142 @@ class SemanticCache:
         jaccard = intersection / union
         
         # Додаткова перевірка: чи є спільні важливі слова
-        important_words = {'хду', 'університет', 'вступ', 'вартість', 'факультет', 
-                          'спеціальність', 'документ', 'нмт', 'кампанія'}
-        important_match = len(set1 & set2 & important_words)
-        important_boost = min(0.2, important_match * 0.1)
+        important_match = len(set1 & set2 & self.IMPORTANT_WORDS)
+        important_boost = min(self.MAX_IMPORTANT_BOOST, important_match * 0.1)
         
         return min(1.0, jaccard + important_boost)
     
-    def _get_cache_key(self, query: str, context_hash: str) -> str:
+    def _candidate_keywords(self, fingerprint: str, query_keywords: List[str]) -> List[str]:
+        """
+        Префіксна фільтрація: ключові слова запиту, хоча б одне з яких
+        обов'язково має бути в записі зі схожістю не нижче порогу
+        
+        Схожість >= поріг означає Jaccard >= поріг - максимальний бонус, а отже
+        спільних слів >= ceil(t * |запит|). Запис, що не містить жодного з
+        |запит| - ceil(t * |запит|) + 1 найрідкісніших слів запиту, поріг не пройде.
+        """
+        min_jaccard = self.similarity_threshold - self.MAX_IMPORTANT_BOOST
+        if min_jaccard <= 0:
+            return query_keywords
+        
+        required_overlap = math.ceil(min_jaccard * len(query_keywords))
+        prefix_length = len(query_keywords) - required_overlap + 1
+        by_rarity = sorted(
+            query_keywords,
+            key=lambda word: len(self.keyword_index.get((fingerprint, word), ()))
+        )
+        return by_rarity[:prefix_length]
+    
+    def _get_cache_key(self, query: str, fingerprint: str) -> str:
         """Генерація ключа кешу"""
         normalized_query = self._normalize_query(query)
         return hashlib.md5(
-            f"{normalized_query}:{context_hash}".encode('utf-8')
+            f"{normalized_query}:{fingerprint}".encode('utf-8')
         ).hexdigest()
     
     def _normalize_query(self, query: str) -> str:
         """Нормалізація запиту"""
-        if not query:
-            return ""
-        
-        normalized = query.lower().strip()
-        normalized = re.sub(r'\s+', ' ', normalized)
-        normalized = re.sub(r'[^\w\s?]', '', normalized)
-        words = normalized.split()
-        return ' '.join(sorted(set(words)))
+        return TextNormalizer.cache_key(query) if query else ""
     
-    def get(self, query: str, context: Dict) -> Optional[Tuple[str, float]]:
+    def get(self, query: str, fingerprint: str, question_type: Optional[str] = None) -> Optional[Tuple[str, float]]:
         """
-        Отримання з кешу з семантичним пошуком
+        Отримання з кешу з семантичним пошуком (серед записів з тим самим відбитком контексту)
         Повертає (відповідь, коефіцієнт схожості) або None
         """
-        if not query or not context:
+        if not query or not fingerprint:
             return None
         
-        try:
-            context_hash = hashlib.md5(
-                json.dumps(context, sort_keys=True, ensure_ascii=False).encode('utf-8')
-            ).hexdigest()
-        except (TypeError, ValueError):
-            return None
+        self.lookups += 1
         
-        # 1. Точний пошук
-        exact_key = self._get_cache_key(query, context_hash)
-        if exact_key in self.cache:
-            entry = self.cache[exact_key]
-            if datetime.now() - entry["timestamp"] < self.ttl:
-                return (entry["response"], 1.0)
-            else:
-                del self.cache[exact_key]
+        # 1. Точний пошук (прострочені записи прибирає purge_expired, не пошук)
+        exact_key = self._get_cache_key(query, fingerprint)
+        entry = self.cache.peek(exact_key)
+        if entry is not None:
+            self.cache.touch(exact_key, question_type)
+            return (entry["response"], 1.0)
         
-        # 2. Семантичний пошук
+        # 2. Семантичний пошук лише серед записів зі спільними ключовими словами
         query_keywords = self._extract_keywords(query)
         if not query_keywords:
+            self.cache.record_miss(question_type)
             return None
         
+        candidates: Set[str] = set()
+        for keyword in self._candidate_keywords(fingerprint, query_keywords):
+            candidates.update(self.keyword_index.get((fingerprint, keyword), ()))
+        
+        best_key = None
         best_match = None
         best_similarity = 0.0
         
-        # Перевіряємо всі записи в кеші
-        for key, entry in list(self.cache.items()):
-            # Перевіряємо TTL
-            if datetime.now() - entry["timestamp"] >= self.ttl:
-                del self.cache[key]
-                continue
-            
-            # Перевіряємо контекст
-            if entry.get("context_hash") != context_hash:
+        for key in candidates:
+            entry = self.cache.peek(key)
+            if entry is None:
                 continue
             
-            # Розраховуємо схожість
-            cached_keywords = entry.get("keywords", [])
-            if not cached_keywords:
-                # Якщо немає ключових слів, витягуємо з оригінального запиту
-                cached_keywords = self._extract_keywords(entry.get("query", ""))
-                entry["keywords"] = cached_keywords
-            
-            similarity = self._calculate_similarity(query_keywords, cached_keywords)
+            self.candidates_scored += 1
+            similarity = self._calculate_similarity(query_keywords, entry["keywords"])
             
             if similarity > best_similarity and similarity >= self.similarity_threshold:
                 best_similarity = similarity
+                best_key = key
                 best_match = entry
         
         if best_match:
+            self.cache.touch(best_key, question_type)
             return (best_match["response"], best_similarity)
         
+        self.cache.record_miss(question_type)
         return None
     
-    def set(self, query: str, context: Dict, response: str):
+    def set(
+        self,
+        query: str,
+        fingerprint: str,
+        response: str,
+        question_type: Optional[str] = None,
+        tags: Iterable[str] = ()
+    ):
         """Збереження в кеш з індексацією ключових слів"""
-        if not query or not response:
-            return
-        
-        # Якщо кеш переповнений - видаляємо найстаріший
-        if len(self.cache) >= self.max_size:
-            oldest_key = min(
-                self.cache.keys(),
-                key=lambda k: self.cache[k]["timestamp"]
-            )
-            # Видаляємо з індексу
-            old_entry = self.cache[oldest_key]
-            old_keywords = old_entry.get("keywords", [])
-            for keyword in old_keywords:
-                if oldest_key in self.keyword_index.get(keyword, []):
-                    self.keyword_index[keyword].remove(oldest_key)
-            del self.cache[oldest_key]
-        
-        try:
-            context_hash = hashlib.md5(
-                json.dumps(context, sort_keys=True, ensure_ascii=False).encode('utf-8')
-            ).hexdigest()
-        except (TypeError, ValueError):
+        if not query or not fingerprint or not response:
             return
         
-        key = self._get_cache_key(query, context_hash)
+        key = self._get_cache_key(query, fingerprint)
         keywords = self._extract_keywords(query)
         
-        # Додаємо в індекс
-        for keyword in keywords:
-            if key not in self.keyword_index[keyword]:
-                self.keyword_index[keyword].append(key)
-        
-        self.cache[key] = {
-            "response": response,
-            "timestamp": datetime.now(),
-            "query": query,
-            "context_hash": context_hash,
-            "keywords": keywords
-        }
+        # Заміна, витіснення та TTL - у CacheCore; індекс чиститься через _unindex
+        self.cache.set(
+            key,
+            {
+                "response": response,
+                "query": query,
+                "fingerprint": fingerprint,
+                "keywords": keywords
+            },
+            text_size(response, query, key, *keywords),
+            question_type,
+            tags
+        )
+        
+        # Запис міг не вміститися в ліміт - індексуємо лише збережений
+        if self.cache.peek(key) is not None:
+            for keyword in keywords:
+                self.keyword_index[(fingerprint, keyword)].add(key)
+    
+    def _unindex(self, key: str, entry: Dict):
+        """Видалення ключових слів запису з індексу (викликається CacheCore)"""
+        fingerprint = entry["fingerprint"]
+        for keyword in entry["keywords"]:
+            index_key = (fingerprint, keyword)
+            keys = self.keyword_index.get(index_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keyword_index[index_key]
+    
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """Видалення записів, що залежать від змінених даних (за тегами)"""
+        return self.cache.invalidate_tags(tags)
     
     def clear(self):
         """Очищення кешу"""
@@ -212,13 +220,11 @@ class SemanticCache:
     
     def get_stats(self) -> Dict:
         """Статистика кешу"""
-        return {
-            "size": len(self.cache),
-            "max_size": self.max_size,
-            "usage_percent": (len(self.cache) / self.max_size) * 100 if self.max_size > 0 else 0,
+        stats = self.cache.get_stats()
+        stats.update({
             "indexed_keywords": len(self.keyword_index),
-            "similarity_threshold": self.similarity_threshold
-        }
-
-
-
+            "similarity_threshold": self.similarity_threshold,
+            "lookups": self.lookups,
+            "avg_candidates_scored": self.candidates_scored / self.lookups if self.lookups > 0 else 0
+        })
+        return stats
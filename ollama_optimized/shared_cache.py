@@ -0,0 +1,161 @@
+"""
+Спільний кеш відповідей для кількох реплік бота (UNLOGGED-таблиця PostgreSQL)
+Ефект: hit rate не падає з додаванням воркерів - репліки використовують генерації одна одної
+"""
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional, Set
+from config import SHARED_CACHE_ENABLED, SHARED_CACHE_TTL_HOURS, SHARED_CACHE_TIMEOUT
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCache:
+    """
+    Рівень кешу за ResponseCache/SemanticCache (L1 у пам'яті процесу)
+
+    Читання - з коротким таймаутом (повільна БД не гальмує відповідь),
+    запис - у фонових задачах, щоб збереження не затримувало користувача.
+    """
+
+    def __init__(
+        self,
+        version: str = "",
+        enabled: bool = SHARED_CACHE_ENABLED,
+        ttl_hours: float = SHARED_CACHE_TTL_HOURS,
+        timeout: float = SHARED_CACHE_TIMEOUT
+    ):
+        self.version = version
+        self.enabled = enabled
+        self.ttl = int(ttl_hours * 3600)
+        self.timeout = timeout
+        self._tasks: Set[asyncio.Task] = set()
+        # Останній застосований запис журналу інвалідацій (None - ще не читали)
+        self._last_invalidation_id: Optional[int] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.written = 0
+        self.invalidated = 0
+        self.lookup_time = 0.0
+
+    @staticmethod
+    def _db():
+        # Лінивий імпорт: пакет ollama_optimized не залежить від asyncpg при імпорті
+        from database import db
+        return db
+
+    def _available(self) -> bool:
+        return self.enabled and self._db().pool is not None
+
+    async def get(self, key: Optional[str]) -> Optional[str]:
+        """Відповідь зі спільного кешу або None (помилка чи таймаут БД - це промах)"""
+        if not key or not self._available():
+            return None
+
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                self._db().get_cached_answer(key, self.version), timeout=self.timeout
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Спільний кеш недоступний: {type(e).__name__}: {e}")
+            return None
+        finally:
+            self.lookup_time += time.perf_counter() - started
+
+        if response:
+            self.hits += 1
+            return response
+        self.misses += 1
+        return None
+
+    def set(
+        self,
+        key: Optional[str],
+        query: str,
+        response: str,
+        question_type: Optional[str] = None,
+        tags: Iterable[str] = ()
+    ):
+        """Фонове збереження відповіді (без очікування БД)"""
+        if not key or not response or not self._available():
+            return
+        task = asyncio.create_task(self._write(key, query, response, question_type, list(tags)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(
+        self, key: str, query: str, response: str, question_type: Optional[str], tags: List[str]
+    ):
+        try:
+            await self._db().set_cached_answer(
+                key, self.version, query, response, question_type, self.ttl, tags
+            )
+            self.written += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Не вдалося записати спільний кеш: {type(e).__name__}: {e}")
+
+    async def invalidate(self, tags: Iterable[str]) -> int:
+        """
+        Видалення відповідей з будь-яким із тегів для всіх реплік
+
+        Спершу дочікуємося фонових записів - інакше відповідь, згенерована
+        до зміни даних, може записатися вже після видалення.
+        """
+        tags = list(tags)
+        if not tags or not self._available():
+            return 0
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        try:
+            deleted = await self._db().invalidate_cached_answers(tags)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Не вдалося інвалідувати спільний кеш: {type(e).__name__}: {e}")
+            return 0
+        self.invalidated += deleted
+        return deleted
+
+    async def poll_invalidations(self, since_seconds: float = 0) -> List[List[str]]:
+        """
+        Теги інвалідацій, зроблених будь-якою реплікою після попереднього виклику
+
+        Перший виклик повертає інвалідації за останні since_seconds: поки репліка була
+        зупинена, її постійний кеш міг зберегти вже застарілі відповіді.
+        """
+        if not self._available():
+            return []
+        try:
+            rows = await self._db().get_cache_invalidations(self._last_invalidation_id, int(since_seconds))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Не вдалося прочитати журнал інвалідацій: {type(e).__name__}: {e}")
+            return []
+        if rows:
+            self._last_invalidation_id = rows[-1]["id"]
+        return [list(row["tags"]) for row in rows]
+
+    async def close(self):
+        """Очікування незавершених записів (викликається при зупинці бота)"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.errors
+        return {
+            "enabled": self.enabled,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "written": self.written,
+            "invalidated": self.invalidated,
+            "pending_writes": len(self._tasks),
+            "hit_rate": (self.hits / lookups * 100) if lookups > 0 else 0,
+            "avg_lookup_ms": (self.lookup_time / lookups * 1000) if lookups > 0 else 0
+        }
@@ -0,0 +1,79 @@
+"""
+Об'єднання однакових запитів, що генеруються одночасно (single-flight)
+Ефект: одна генерація OLLAMA на хвилю однакових питань після розсилки/дедлайну
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class SingleFlight:
+    """Один виконавець на ключ, решта викликів чекає на його результат"""
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Виконує factory() для ключа або приєднується до вже запущеного виконання
+
+        Returns:
+            (результат, чи був виклик об'єднаний з уже запущеним)
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            # shield: скасування одного з очікувачів не скасовує спільну генерацію
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(factory())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda t: self._forget(key, t))
+        self.leaders += 1
+        return await asyncio.shield(task), False
+
+    def lead(self, key: str) -> Optional[asyncio.Future]:
+        """
+        Реєстрація виконавця, що віддає результат частинами (streaming)
+
+        Returns:
+            future, яке виконавець сам завершує результатом або винятком,
+            чи None, якщо ключ уже виконується (тоді - join)
+        """
+        if key in self._in_flight:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        future.add_done_callback(lambda f: self._forget(key, f))
+        self.leaders += 1
+        return future
+
+    async def join(self, key: str) -> Any:
+        """
+        Очікування результату вже запущеного виконання
+
+        Raises:
+            KeyError: якщо для ключа нічого не виконується
+        """
+        task = self._in_flight[key]
+        self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future):
+        """Прибирає завершену генерацію з таблиці"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Позначаємо виняток як оброблений, якщо всі очікувачі вже скасовані
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict:
+        """Статистика об'єднання запитів"""
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._in_flight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_rate": (self.coalesced / total * 100) if total > 0 else 0
+        }
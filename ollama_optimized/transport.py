@@ -0,0 +1,98 @@
+"""
+HTTP транспорт до OLLAMA з довготривалою сесією та пулом keep-alive з'єднань
+"""
+import json
+import aiohttp
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, AsyncIterator
+from config import OLLAMA_CONNECTION_LIMIT, OLLAMA_KEEPALIVE_TIMEOUT
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Помилки рівня з'єднання: сервер недоступний, запит варто перенаправити на інший endpoint.
+# Таймаути теж є їх підкласами (TimeoutError -> OSError, ServerTimeoutError), тому
+# except asyncio.TimeoutError має стояти перед except CONNECTION_ERRORS
+CONNECTION_ERRORS = (aiohttp.ClientConnectionError, OSError)
+
+
+class OllamaRequestError(Exception):
+    """OLLAMA не дала відповіді (HTTP-помилка, обрив streaming, вичерпано спроби)"""
+
+
+class OllamaTransport:
+    """Одна довготривала aiohttp-сесія на один OLLAMA endpoint"""
+
+    def __init__(
+        self,
+        base_url: str,
+        connection_limit: int = OLLAMA_CONNECTION_LIMIT,
+        keepalive_timeout: float = OLLAMA_KEEPALIVE_TIMEOUT
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.connection_limit = connection_limit
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def closed(self) -> bool:
+        return self._session is None or self._session.closed
+
+    async def start(self):
+        """Створення сесії (викликається при старті бота)"""
+        self._get_session()
+
+    async def close(self):
+        """Закриття сесії та всіх з'єднань пулу"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Ліниве створення сесії (якщо start() не викликали або сесію закрито)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connection_limit,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=5)
+            )
+            logger.info(
+                f"OLLAMA transport: нова сесія для {self.base_url} "
+                f"(limit={self.connection_limit}, keepalive={self.keepalive_timeout}s)"
+            )
+        return self._session
+
+    @staticmethod
+    def encode_payload(payload: Dict) -> bytes:
+        """Одноразове кодування тіла запиту (повторно використовується між спробами)"""
+        return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+    @asynccontextmanager
+    async def post(self, path: str, body: bytes, timeout: float) -> AsyncIterator[aiohttp.ClientResponse]:
+        """POST із заздалегідь закодованим JSON тілом"""
+        session = self._get_session()
+        async with session.post(
+            f"{self.base_url}{path}",
+            data=body,
+            headers=JSON_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            yield response
+
+    @asynccontextmanager
+    async def get(self, path: str, timeout: float) -> AsyncIterator[aiohttp.ClientResponse]:
+        """GET запит до endpoint"""
+        session = self._get_session()
+        async with session.get(
+            f"{self.base_url}{path}",
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            yield response
@@ -0,0 +1,91 @@
+"""
+Прогрів моделі OLLAMA: завантаження в пам'ять, keep_alive та прогрів системних промптів
+Ефект: холодний старт моделі відбувається до першого питання, а не під час нього
+"""
+import time
+from typing import Dict, Optional
+from ollama_optimized.endpoint_pool import OllamaEndpoint
+from ollama_optimized.transport import OllamaTransport
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Параметри "порожньої" генерації: одна лексема, щоб лише обробити промпт
+PRIME_OPTIONS = {"num_predict": 1, "temperature": 0.0}
+
+
+def _with_keep_alive(payload: Dict, endpoint: OllamaEndpoint, keep_alive: Optional[str]) -> Dict:
+    """Додає keep_alive, якщо сервер його підтримує"""
+    if keep_alive and endpoint.capabilities is not None and endpoint.capabilities.supports_keep_alive:
+        payload["keep_alive"] = keep_alive
+    return payload
+
+
+async def preload_model(
+    endpoint: OllamaEndpoint,
+    model: str,
+    keep_alive: Optional[str],
+    timeout: float = 300
+) -> bool:
+    """
+    Завантаження моделі в пам'ять (порожній промпт у generate API)
+
+    Returns:
+        True якщо модель завантажена
+    """
+    capabilities = await endpoint.get_capabilities()
+    payload = {"model": model, "prompt": "", "stream": False}
+    if not capabilities.supports_keep_alive:
+        # Старі сервери не приймають порожній промпт як "лише завантажити"
+        payload["prompt"] = "."
+        payload["options"] = PRIME_OPTIONS
+    body = OllamaTransport.encode_payload(_with_keep_alive(payload, endpoint, keep_alive))
+
+    started = time.time()
+    try:
+        async with endpoint.transport.post("/api/generate", body, timeout=timeout) as response:
+            if response.status != 200:
+                logger.warning(f"Прогрів {endpoint.url}: HTTP {response.status} - {await response.text()}")
+                return False
+            await response.read()
+    except Exception as e:
+        logger.warning(f"Прогрів {endpoint.url}: не вдалося завантажити модель {model}: {e}")
+        return False
+
+    logger.info(f"Модель {model} завантажена на {endpoint.url} за {time.time() - started:.1f}s")
+    return True
+
+
+async def prime_prompt(
+    endpoint: OllamaEndpoint,
+    model: str,
+    system_prompt: str,
+    keep_alive: Optional[str],
+    timeout: float = 120
+) -> bool:
+    """Обробка системного промпту сервером (кеш префіксу в OLLAMA)"""
+    capabilities = await endpoint.get_capabilities()
+    if capabilities.supports_chat:
+        path = "/api/chat"
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": "."}
+            ],
+            "stream": False,
+            "options": PRIME_OPTIONS
+        }
+    else:
+        path = "/api/generate"
+        payload = {"model": model, "prompt": system_prompt, "stream": False, "options": PRIME_OPTIONS}
+    body = OllamaTransport.encode_payload(_with_keep_alive(payload, endpoint, keep_alive))
+
+    try:
+        async with endpoint.transport.post(path, body, timeout=timeout) as response:
+            await response.read()
+            return response.status == 200
+    except Exception as e:
+        logger.debug(f"Прогрів промпту на {endpoint.url} не вдався: {e}")
+        return False
@@ -1,9 +1,10 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from datetime import date
+from apscheduler.triggers.interval import IntervalTrigger
+from datetime import date, datetime
 from database import db
 from aiogram import Bot
-from config import BOT_TOKEN
+from config import BOT_TOKEN, OLLAMA_WARM_HOURS, OLLAMA_KEEP_WARM_INTERVAL, CACHE_WARM_HOUR
 
 scheduler = AsyncIOScheduler()
 bot = Bot(token=BOT_TOKEN)
@@ -47,6 +48,34 @@ async def check_and_send_reminders():
                     except Exception as e:
                         print(f"Помилка відправки нагадування: {e}")
 
+def _parse_warm_hours(spec: str) -> tuple:
+    """"7-22" -> (7, 22)"""
+    try:
+        start, end = (int(part) for part in spec.split("-", 1))
+        return start, end
+    except (ValueError, AttributeError):
+        return 7, 22
+
+async def keep_ollama_warm():
+    """У робочі години тримаємо модель OLLAMA завантаженою"""
+    start_hour, end_hour = _parse_warm_hours(OLLAMA_WARM_HOURS)
+    if not (start_hour <= datetime.now().hour < end_hour):
+        return
+    
+    from ollama_client import ollama
+    try:
+        await ollama.keep_warm()
+    except Exception as e:
+        print(f"Помилка keep-warm OLLAMA: {e}")
+
+async def warm_response_cache():
+    """Поза піком генеруємо відповіді на найпопулярніші питання"""
+    from services.cache_warmer import warm_response_cache as warm
+    try:
+        await warm()
+    except Exception as e:
+        print(f"Помилка прогріву кешу відповідей: {e}")
+
 def start_scheduler():
     scheduler.add_job(
         check_and_send_reminders,
@@ -54,6 +83,20 @@ def start_scheduler():
         id='daily_reminders',
         replace_existing=True
     )
+    if OLLAMA_KEEP_WARM_INTERVAL > 0:
+        scheduler.add_job(
+            keep_ollama_warm,
+            IntervalTrigger(minutes=OLLAMA_KEEP_WARM_INTERVAL),
+            id='ollama_keep_warm',
+            replace_existing=True
+        )
+    if CACHE_WARM_HOUR >= 0:
+        scheduler.add_job(
+            warm_response_cache,
+            CronTrigger(hour=CACHE_WARM_HOUR, minute=0),
+            id='response_cache_warm',
+            replace_existing=True
+        )
     scheduler.start()
     print("✅ Планувальник нагадувань запущено")
 
@@ -3,8 +3,6 @@
 """
 from .response_service import ResponseService
 from .knowledge_service import KnowledgeService
+from .answer_engine import AnswerEngine, StructuredAnswer
 
-__all__ = ['ResponseService', 'KnowledgeService']
-
-
-
+__all__ = ['ResponseService', 'KnowledgeService', 'AnswerEngine', 'StructuredAnswer']
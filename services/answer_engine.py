@@ -0,0 +1,350 @@
+"""
+Детерміновані структуровані відповіді без OLLAMA
+Ефект: питання про вартість, факультети, спеціальності, документи та контакти
+відповідаються шаблонами з бази знань і таблиці tuition_prices, не доходячи до моделі
+"""
+import re
+from typing import Dict, List, Optional
+from knowledge_base import (
+    get_knu_contacts,
+    get_documents_text,
+    get_faculty_header_only,
+    get_admissions_committee_phones,
+)
+from tuition_helper import find_tuition_info, extract_specialty_from_message
+from ollama_optimized.question_classifier import QuestionClassifier
+from utils.message_parser import MessageParser
+from utils.intent_matcher import intent_matcher
+from utils.intent_taxonomy import FACULTY_INTENTS
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Клавіатури, які обробник додає до структурованої відповіді
+KEYBOARD_FEEDBACK = "feedback"          # кнопка "Повідомити про помилку"
+KEYBOARD_FACULTIES = "faculties"        # вибір факультету
+KEYBOARD_SPECIALTIES = "specialties"    # вибір спеціальності факультету
+KEYBOARD_TUITION_BACK = "tuition_back"  # повернення до спеціальностей/факультетів + feedback
+
+# Ключові слова галузей -> факультет: наміри "faculty.<id>" у таксономії (порядок - пріоритет);
+# ключові слова маршрутів нижче - наміри "engine.*" там само
+FACULTY_INTENT_ORDER = [intent for intent, _ in FACULTY_INTENTS]
+
+# Спеціальності факультету для зведеної вартості (назви як у tuition_prices)
+FACULTY_TUITION_SPECIALTIES = {
+    "faculty_7": [  # Бізнес і право
+        "економіка", "менеджмент", "фінанси, банківська справа та страхування",
+        "підприємництво та торгівля", "право", "публічне управління та адміністрування",
+        "туризм та рекреація", "готельно-ресторанна справа"
+    ],
+    "faculty_8": [  # ІТ
+        "інженерія програмного забезпечення", "комп'ютерні науки", "інформаційні системи та технології"
+    ],
+    "faculty_3": [  # Медицина/здоров'я
+        "фізична терапія, ерготерапія", "соціальна робота та консультування",
+        "медицина", "фізична реабілітація", "фармація"
+    ],
+    "faculty_4": [  # Природничі
+        "біологія та біохімія", "екологія", "географія та регіональні студії",
+        "хімія", "фізика та астрономія"
+    ],
+    "faculty_5": [  # Спорт
+        "фізична культура і спорт"
+    ],
+    "faculty_6": [  # Педагогіка / освіта
+        "дошкільна освіта", "початкова освіта", "спеціальна освіта",
+        "середня освіта (історія)", "середня освіта (біологія)",
+        "середня освіта (географія)", "середня освіта (хімія)",
+        "середня освіта (українська мова і література)",
+        "середня освіта (англійська мова)", "середня освіта (німецька мова)",
+        "середня освіта (іспанська мова)", "середня освіта (математика)",
+        "середня освіта (фізика та астрономія)", "середня освіта (інформатика)",
+        "фізична культура і спорт"
+    ],
+    "faculty_2": [  # Психологія / соц
+        "психологія", "соціологія", "історія та археологія", "журналістика"
+    ],
+    "faculty_1": [  # Філологія / мистецтва
+        "філологія", "журналістика", "культурологія та музеєзнавство",
+        "хореографія", "музичне мистецтво", "образотворче мистецтво"
+    ],
+}
+
+# "А на 121?", "а щодо F6?" - продовження попереднього питання про вартість
+CONTINUATION_PATTERN = re.compile(r'^(а|а на|а щодо|а про|а по)\s+')
+
+# Короткі питання про контакти відповідаються шаблоном, довгі - моделлю
+MAX_CONTACT_QUESTION_WORDS = 6
+
+TUITION_HEADER = "💰 <b>Вартість навчання</b>"
+TUITION_FACULTIES_TEXT = (
+    f"{TUITION_HEADER}\n\n"
+    "💡 <b>Обери факультет, щоб побачити спеціальності та їх вартість</b> 🎓"
+)
+FACULTIES_TEXT = "📚 <b>Факультети ХДУ</b>\n\n💡 <b>Обери факультет, щоб побачити спеціальності</b> 🎓"
+
+
+def detect_faculty_by_keywords(text: str) -> Optional[str]:
+    """Факультет за ключовими словами галузі"""
+    intent = intent_matcher.first(text, FACULTY_INTENT_ORDER)
+    return intent.split(".", 1)[1] if intent else None
+
+
+def has_tuition_prices(tuition_info: Optional[str]) -> bool:
+    """Чи містить відповідь find_tuition_info саме ціни (а не "вартість не вказана")"""
+    return bool(tuition_info) and "💰" in tuition_info
+
+
+class StructuredAnswer:
+    """Готова відповідь з бази знань: HTML-текст, маршрут та клавіатура"""
+
+    def __init__(
+        self,
+        text: str,
+        route: str,
+        keyboard: str = KEYBOARD_FEEDBACK,
+        faculty_id: Optional[str] = None,
+        prefix: str = ""
+    ):
+        self.text = text
+        self.route = route
+        self.keyboard = keyboard
+        self.faculty_id = faculty_id
+        # Префікс лише для показу (в історію зберігається text)
+        self.prefix = prefix
+
+    @property
+    def display_text(self) -> str:
+        return f"{self.prefix}{self.text}"
+
+
+class AnswerEngine:
+    """Маршрутизація питань до шаблонних відповідей до виклику OLLAMA"""
+
+    # Як часто (у запитах) писати покриття в лог
+    LOG_EVERY = 100
+
+    def __init__(self):
+        self.classifier = QuestionClassifier()
+        self.parser = MessageParser()
+
+        self.total = 0
+        self.answered = 0
+        self.routes: Dict[str, int] = {}
+        self.by_question_type: Dict[str, Dict[str, int]] = {}
+
+    async def answer(
+        self,
+        user_message: str,
+        recent_messages: List[Dict] = None,
+        record: bool = True
+    ) -> Optional[StructuredAnswer]:
+        """
+        Детермінована відповідь на питання
+
+        Args:
+            user_message: Повідомлення користувача
+            recent_messages: Останні повідомлення користувача (для "а на 121?")
+            record: Чи враховувати питання в статистиці покриття (False - для службових перевірок)
+
+        Returns:
+            StructuredAnswer або None, якщо потрібна генерація OLLAMA
+        """
+        question_type = self.classifier.classify(user_message)
+        result = await self._route(user_message, user_message.lower(), question_type, recent_messages or [])
+        if record:
+            self._record(question_type, result)
+        return result
+
+    async def _route(
+        self,
+        user_message: str,
+        text: str,
+        question_type: str,
+        recent_messages: List[Dict]
+    ) -> Optional[StructuredAnswer]:
+        # Один прохід автомата намірів на повідомлення; порядок перевірок має значення:
+        # від конкретніших маршрутів до загальних
+        intents = intent_matcher.intents(text)
+        if "engine.documents" in intents:
+            return StructuredAnswer(
+                _markdown_to_html(get_documents_text()), "documents", prefix="💬 Відповідь:\n\n"
+            )
+
+        # Право - одразу шаблон, щоб уникнути галюцинацій щодо кодів
+        if "engine.law" in intents:
+            return await self._law_answer()
+
+        has_tuition_keyword = "engine.tuition" in intents
+        has_specific_reference = "engine.specific" in intents
+        is_short_question = len(text.split()) <= 5
+
+        # Загальне питання про вартість без спеціальності - вибір факультету
+        if has_tuition_keyword and not has_specific_reference and is_short_question:
+            return StructuredAnswer(TUITION_FACULTIES_TEXT, "tuition_faculties", KEYBOARD_FACULTIES)
+
+        # Конкретна спеціальність у питанні - вартість з tuition_prices
+        specialty_name, specialty_code = extract_specialty_from_message(user_message)
+        if specialty_name or specialty_code:
+            tuition_info = await find_tuition_info(specialty_name=specialty_name, specialty_code=specialty_code)
+            if tuition_info:
+                if specialty_name:
+                    response = f"{TUITION_HEADER}\n\n<b>📚 {specialty_name}</b>\n\n{tuition_info}"
+                else:
+                    response = f"{TUITION_HEADER}\n\n{tuition_info}"
+                return StructuredAnswer(
+                    response, "tuition_specialty", KEYBOARD_TUITION_BACK,
+                    faculty_id=detect_faculty_by_keywords(text)
+                )
+
+        # Галузь - заголовок факультету з кнопками спеціальностей
+        faculty_id = detect_faculty_by_keywords(text)
+        if faculty_id:
+            faculty_text = get_faculty_header_only(faculty_id)
+            faculty_text += "\n\n💡 <b>Обери спеціальність, щоб побачити вартість навчання</b> 💰"
+            return StructuredAnswer(faculty_text, "faculty", KEYBOARD_SPECIALTIES, faculty_id=faculty_id)
+
+        if "engine.specialty" in intents:
+            if "engine.specific_fields" not in intents:
+                return StructuredAnswer(FACULTIES_TEXT, "specialties", KEYBOARD_FACULTIES)
+
+        if "engine.faculty_list" in intents:
+            return StructuredAnswer(FACULTIES_TEXT, "faculties", KEYBOARD_FACULTIES)
+
+        if has_tuition_keyword:
+            return await self._tuition_from_context(recent_messages)
+
+        # Код спеціальності без слів про вартість ("121", "а на F6?")
+        is_continuation = bool(CONTINUATION_PATTERN.search(text)) and bool(specialty_code)
+        if question_type == "tuition" or self.parser.is_tuition_question(user_message) or is_continuation:
+            answer = await self._tuition_by_code(specialty_name, specialty_code, recent_messages)
+            if answer is not None:
+                return answer
+
+        if (
+            self.parser.get_question_type(user_message) == "contact"
+            and question_type not in ("comparison", "procedural")
+            and len(text.split()) <= MAX_CONTACT_QUESTION_WORDS
+        ):
+            return StructuredAnswer(get_knu_contacts(), "contacts")
+
+        return None
+
+    async def _law_answer(self) -> StructuredAnswer:
+        law_text = (
+            "<b>⚖️ Спеціальність Право (D8)</b>\n\n"
+            "• Рівні: бакалавр, магістр\n"
+            "• Форма: денна / заочна\n"
+            "• Факультет бізнесу і права\n"
+        )
+        tuition = await find_tuition_info(specialty_name="право")
+        if tuition and "немає даних" not in tuition.lower():
+            law_text += "\n" + tuition
+        law_text += (
+            f"\n\n{get_admissions_committee_phones()}\n"
+            "📍 м. Херсон, вул. Університетська, 27"
+        )
+        return StructuredAnswer(law_text, "law")
+
+    async def _tuition_from_context(self, recent_messages: List[Dict]) -> StructuredAnswer:
+        """Питання про вартість без спеціальності: шукаємо її у попередніх повідомленнях"""
+        specialty_name, specialty_code = None, None
+        for ctx in recent_messages:
+            sn, sc = extract_specialty_from_message(ctx.get("user_message") or "")
+            if sn or sc:
+                specialty_name, specialty_code = sn, sc
+                break
+
+        phones = get_admissions_committee_phones()
+        if specialty_name or specialty_code:
+            tuition_info = await find_tuition_info(specialty_name=specialty_name, specialty_code=specialty_code)
+            if tuition_info and "немає даних" not in tuition_info.lower():
+                response = f"{TUITION_HEADER}\n\n{tuition_info}\n\n{phones}"
+            else:
+                response = f"На жаль, не знайшов точну вартість для цієї спеціальності.\n\n{phones}"
+        else:
+            response = (
+                "Назви спеціальність або її код (наприклад, 121, F2, F3), "
+                f"щоб показати точну вартість навчання.\n\n{phones}"
+            )
+        return StructuredAnswer(response, "tuition_context")
+
+    async def _tuition_by_code(
+        self,
+        specialty_name: Optional[str],
+        specialty_code: Optional[str],
+        recent_messages: List[Dict]
+    ) -> Optional[StructuredAnswer]:
+        """Вартість за кодом або за спеціальністю/факультетом з попередніх повідомлень"""
+        faculty_id = None
+        if not specialty_name and not specialty_code:
+            for ctx in recent_messages:
+                prev_user = (ctx.get("user_message") or "").lower()
+                specialty_name, specialty_code = extract_specialty_from_message(prev_user)
+                if specialty_name or specialty_code:
+                    break
+                faculty_id = detect_faculty_by_keywords(prev_user)
+                if faculty_id:
+                    break
+
+        if specialty_name or specialty_code:
+            tuition_info = await find_tuition_info(specialty_name, specialty_code)
+            if has_tuition_prices(tuition_info):
+                return StructuredAnswer(tuition_info, "tuition_code")
+            return None
+
+        if faculty_id:
+            # Зведена вартість усіх спеціальностей факультету з попереднього питання
+            blocks = []
+            for spec in FACULTY_TUITION_SPECIALTIES.get(faculty_id, []):
+                info = await find_tuition_info(specialty_name=spec)
+                if has_tuition_prices(info):
+                    blocks.append(info)
+            if blocks:
+                return StructuredAnswer("\n\n".join(blocks), "tuition_faculty")
+        return None
+
+    def _record(self, question_type: str, result: Optional[StructuredAnswer]):
+        self.total += 1
+        per_type = self.by_question_type.setdefault(question_type, {"total": 0, "answered": 0})
+        per_type["total"] += 1
+        if result is not None:
+            self.answered += 1
+            per_type["answered"] += 1
+            self.routes[result.route] = self.routes.get(result.route, 0) + 1
+            logger.debug(f"Структурована відповідь без OLLAMA: {result.route} ({question_type})")
+
+        if self.total % self.LOG_EVERY == 0:
+            stats = self.get_stats()
+            logger.info(
+                f"Покриття структурованих відповідей: {stats['coverage']:.1f}% "
+                f"({self.answered}/{self.total}), маршрути: {self.routes}"
+            )
+
+    def get_stats(self) -> Dict:
+        """Покриття: яка частка питань не дійшла до OLLAMA"""
+        return {
+            "total": self.total,
+            "answered": self.answered,
+            "to_llm": self.total - self.answered,
+            "coverage": (self.answered / self.total * 100) if self.total > 0 else 0,
+            "routes": dict(self.routes),
+            "by_question_type": {
+                q_type: {
+                    **counts,
+                    "coverage": (counts["answered"] / counts["total"] * 100) if counts["total"] > 0 else 0
+                }
+                for q_type, counts in self.by_question_type.items()
+            }
+        }
+
+
+def _markdown_to_html(text: str) -> str:
+    # Імпорт тут: пакет handlers сам імпортує цей модуль (циклічний імпорт)
+    from handlers.utils import _convert_markdown_to_html
+    return _convert_markdown_to_html(text)
+
+
+# Глобальний екземпляр (спільні метрики покриття)
+answer_engine = AnswerEngine()
@@ -0,0 +1,95 @@
+"""
+Прогрів кешу відповідей популярними питаннями з message_history
+Ефект: під час вступної кампанії найчастіші питання мають готові відповіді ще до ранкового піку
+"""
+import re
+from typing import Dict, List, Optional
+from database import db
+from services.answer_engine import answer_engine
+from utils.text_normalizer import TextNormalizer
+from config import CACHE_WARM_DAYS, CACHE_WARM_LIMIT, CACHE_WARM_MIN_COUNT
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def get_questions_to_warm(
+    days: int = CACHE_WARM_DAYS,
+    limit: int = CACHE_WARM_LIMIT,
+    min_count: int = CACHE_WARM_MIN_COUNT
+) -> List[str]:
+    """
+    Найчастіші питання, на які потрібна генерація OLLAMA
+
+    Питання, на які AnswerEngine відповідає шаблоном, пропускаються - їх прогрівати не треба.
+    """
+    rows = await db.get_top_questions(days=days, limit=limit, min_count=min_count)
+
+    questions = []
+    for row in rows:
+        question = row["question"]
+        if not question:
+            continue
+        if await answer_engine.answer(question, record=False) is not None:
+            continue
+        questions.append(question)
+    return questions
+
+
+async def warm_response_cache(
+    days: int = CACHE_WARM_DAYS,
+    limit: int = CACHE_WARM_LIMIT,
+    min_count: int = CACHE_WARM_MIN_COUNT
+) -> Optional[Dict]:
+    """
+    Прогрів кешу відповідей (при старті, з планувальника або через main.py warm_cache)
+
+    Returns:
+        Лічильники прогріву або None, якщо БД недоступна
+    """
+    if not db.pool:
+        logger.warning("Прогрів кешу пропущено: немає підключення до БД")
+        return None
+
+    from ollama_client import ollama
+
+    questions = await get_questions_to_warm(days, limit, min_count)
+    logger.info(f"Прогрів кешу: {len(questions)} популярних питань за {days} дн.")
+    if not questions:
+        return {"total": 0}
+    return await ollama.warm_cache(questions)
+
+
+def _basic_cache_key(question: str) -> str:
+    """Попередня нормалізація ключа кешу (нижній регістр, без пунктуації, відсортовані слова)"""
+    words = re.sub(r'[^\w\s?]', '', question.lower()).split()
+    return ' '.join(sorted(set(words)))
+
+
+async def estimate_normalization_gain(days: int = CACHE_WARM_DAYS, limit: int = 10000) -> Optional[Dict]:
+    """
+    Оцінка hit rate кешу за історією питань: частка повторних питань, що отримали б
+    той самий ключ, з попередньою нормалізацією та з TextNormalizer
+    (верхня межа - без урахування TTL та відбитку контексту)
+
+    Returns:
+        Лічильники (питань, унікальних ключів, hit rate %) або None, якщо БД недоступна
+    """
+    if not db.pool:
+        return None
+
+    rows = await db.get_top_questions(days=days, limit=limit, min_count=1)
+    total = sum(row["asked"] for row in rows)
+    basic_keys = {_basic_cache_key(row["question"]) for row in rows if row["question"]}
+    normalized_keys = {TextNormalizer.cache_key(row["question"]) for row in rows if row["question"]}
+
+    def hit_rate(keys) -> float:
+        return (1 - len(keys) / total) * 100 if total else 0.0
+
+    return {
+        "questions": total,
+        "basic_keys": len(basic_keys),
+        "normalized_keys": len(normalized_keys),
+        "basic_hit_rate": hit_rate(basic_keys),
+        "normalized_hit_rate": hit_rate(normalized_keys)
+    }
@@ -0,0 +1,205 @@
+"""
+Щільний (embedding) пошук уривків бази знань - необов'язкове доповнення до BM25
+Вектори уривків рахуються офлайн через embeddings API OLLAMA (python main.py build_embeddings)
+і зберігаються як матриця float32 у .npy, що відкривається через memory map;
+пошук - один добуток матриці на вектор запиту. Без numpy або без файлів індексу
+бот працює лише з BM25.
+"""
+import json
+import os
+import time
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from services.passage_index import Passage, PassageIndex, get_passage_index
+from config import EMBEDDING_INDEX_DIR, EMBEDDING_MODEL, EMBEDDING_MIN_SCORE
+import logging
+
+try:
+    import numpy as np
+except ImportError:  # numpy - необов'язкова залежність
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+
+# Обчислення векторів для списку текстів (OLLAMA embeddings API або локальна заглушка)
+Embedder = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class EmbeddingIndex:
+    """
+    Матриця нормалізованих векторів уривків (memory map) та маніфест
+
+    Індекс дійсний лише для тієї версії індексу уривків і моделі, з якими його побудовано:
+    після зміни бази знань його треба перебудувати, до того пошук вимкнено.
+    """
+
+    def __init__(self, passage_index: PassageIndex, directory: str = EMBEDDING_INDEX_DIR, model: str = EMBEDDING_MODEL):
+        self.passage_index = passage_index
+        self.directory = directory
+        self.model = model
+        self._matrix = None
+        self._passages: List[Passage] = []
+        self.searches = 0
+        self.load_error: Optional[str] = None
+
+    @property
+    def available(self) -> bool:
+        return self._matrix is not None
+
+    def load(self) -> bool:
+        """Відкриття індексу з диска; False (з причиною в load_error), якщо він відсутній чи застарів"""
+        self._matrix = None
+        if np is None:
+            self.load_error = "numpy не встановлено"
+            return False
+        if not self.directory:
+            self.load_error = "EMBEDDING_INDEX_DIR не задано"
+            return False
+
+        manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+        vectors_path = os.path.join(self.directory, VECTORS_FILE)
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            matrix = np.load(vectors_path, mmap_mode="r")
+        except FileNotFoundError:
+            self.load_error = f"індекс не побудовано ({self.directory})"
+            return False
+        except (OSError, ValueError) as e:
+            self.load_error = f"не вдалося прочитати індекс: {e}"
+            return False
+
+        if manifest.get("version") != self.passage_index.version or manifest.get("model") != self.model:
+            self.load_error = (
+                f"індекс застарів (версія {manifest.get('version')}, модель {manifest.get('model')}; "
+                f"потрібні {self.passage_index.version}, {self.model})"
+            )
+            return False
+
+        by_id = {passage.id: passage for passage in self.passage_index.passages}
+        ids = manifest.get("ids", [])
+        if matrix.ndim != 2 or matrix.shape[0] != len(ids) or any(passage_id not in by_id for passage_id in ids):
+            self.load_error = "маніфест не відповідає матриці векторів"
+            return False
+
+        self._matrix = matrix
+        self._passages = [by_id[passage_id] for passage_id in ids]
+        self.load_error = None
+        logger.info(f"Embedding-індекс: {matrix.shape[0]} уривків, розмірність {matrix.shape[1]} ({self.model})")
+        return True
+
+    def search(self, query_vector: Sequence[float], top_k: int) -> List[Tuple[Passage, float]]:
+        """Уривки з найбільшою косинусною подібністю (не нижче EMBEDDING_MIN_SCORE)"""
+        if self._matrix is None or query_vector is None:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if query.shape != (self._matrix.shape[1],) or norm == 0.0:
+            return []
+
+        self.searches += 1
+        scores = self._matrix @ (query / norm)
+        top_k = min(top_k, scores.shape[0])
+        if top_k <= 0:
+            return []
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (self._passages[i], float(scores[i]))
+            for i in top
+            if scores[i] >= EMBEDDING_MIN_SCORE
+        ]
+
+    def get_stats(self) -> Dict:
+        return {
+            "available": self.available,
+            "passages": len(self._passages),
+            "model": self.model,
+            "searches": self.searches,
+            "error": self.load_error
+        }
+
+
+async def build_embedding_index(
+    passage_index: PassageIndex,
+    embed: Embedder,
+    directory: str = EMBEDDING_INDEX_DIR,
+    model: str = EMBEDDING_MODEL,
+    batch_size: int = 16
+) -> Dict:
+    """
+    Офлайн-побудова індексу: вектори всіх уривків -> vectors.npy + manifest.json
+
+    Файли пишуться поруч і замінюються атомарно, тож працюючий бот не прочитає
+    половину індексу.
+    """
+    if np is None:
+        raise RuntimeError("Для embedding-індексу потрібен numpy (pip install numpy)")
+
+    passages = passage_index.passages
+    started = time.time()
+    vectors: List[List[float]] = []
+    for offset in range(0, len(passages), batch_size):
+        batch = passages[offset:offset + batch_size]
+        embeddings = await embed([passage.text for passage in batch])
+        if len(embeddings) != len(batch):
+            raise ValueError(f"Очікувалось {len(batch)} векторів, отримано {len(embeddings)}")
+        vectors.extend(embeddings)
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+
+    os.makedirs(directory, exist_ok=True)
+    manifest = {
+        "version": passage_index.version,
+        "model": model,
+        "dimensions": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "ids": [passage.id for passage in passages],
+        "created_at": time.time()
+    }
+    vectors_tmp = os.path.join(directory, VECTORS_FILE + ".tmp")
+    manifest_tmp = os.path.join(directory, MANIFEST_FILE + ".tmp")
+    with open(vectors_tmp, "wb") as f:
+        np.save(f, matrix)
+    with open(manifest_tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(vectors_tmp, os.path.join(directory, VECTORS_FILE))
+    os.replace(manifest_tmp, os.path.join(directory, MANIFEST_FILE))
+
+    stats = {
+        "passages": len(passages),
+        "dimensions": manifest["dimensions"],
+        "version": passage_index.version,
+        "seconds": round(time.time() - started, 1)
+    }
+    logger.info(f"Embedding-індекс побудовано: {stats}")
+    return stats
+
+
+def fuse_rankings(*rankings: Sequence[Tuple[Passage, float]], k: int = 60) -> List[Tuple[Passage, float]]:
+    """Злиття рейтингів (BM25, embedding) за reciprocal rank fusion"""
+    scores: Dict[str, float] = {}
+    passages: Dict[str, Passage] = {}
+    for ranking in rankings:
+        for rank, (passage, _) in enumerate(ranking):
+            scores[passage.id] = scores.get(passage.id, 0.0) + 1.0 / (k + rank + 1)
+            passages[passage.id] = passage
+    return sorted(
+        ((passages[passage_id], score) for passage_id, score in scores.items()),
+        key=lambda item: -item[1]
+    )
+
+
+@lru_cache(maxsize=1)
+def get_embedding_index() -> EmbeddingIndex:
+    """Індекс відкривається один раз на процес (перебудова - з перезапуском бота)"""
+    index = EmbeddingIndex(get_passage_index())
+    if not index.load():
+        logger.info(f"Embedding-пошук вимкнено: {index.load_error}")
+    return index
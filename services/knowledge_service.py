@@ -1,7 +1,10 @@
 """
 Сервіс для роботи з єдиною базою знань
 """
+import hashlib
+import json
 import re
+from typing import Dict, Optional, Sequence, Tuple
 from knowledge_base import (
     KNU_KNOWLEDGE,
     KNOWLEDGE_BASE,
@@ -9,6 +12,40 @@ from knowledge_base import (
     get_structured_context,
     get_admission_2026_context,
 )
+from utils.intent_matcher import intent_matcher
+from services.passage_index import Passage, get_passage_index, select_passages, above_relative_score
+from services.embedding_index import get_embedding_index, fuse_rankings
+from config import PASSAGE_TOP_K, PASSAGE_TOKEN_BUDGET
+
+
+# Версії секцій: (назва, id об'єкта) -> (об'єкт, версія). Секції бази знань - статичні
+# об'єкти, тож версія (хеш вмісту) рахується один раз; посилання на об'єкт не дає id
+# повторно використатися іншим словником
+_SECTION_VERSIONS: Dict[Tuple[str, int], Tuple[object, str]] = {}
+
+# Мінімальний контекст, коли питання не збіглося з жодною секцією (один об'єкт - одна версія)
+_CORE_SECTION = {
+    "university": KNOWLEDGE_BASE.get("university", {}),
+    "contacts": KNOWLEDGE_BASE.get("contacts", {}),
+}
+
+
+def section_version(name: str, data) -> str:
+    """Стабільна версія секції бази знань (хеш вмісту, обчислюється один раз)"""
+    if not data:
+        # Порожні значення за замовчуванням (.get(..., {})) - щоразу нові об'єкти
+        return "empty"
+    cache_key = (name, id(data))
+    cached = _SECTION_VERSIONS.get(cache_key)
+    if cached is not None and cached[0] is data:
+        return cached[1]
+    try:
+        serialized = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    except (TypeError, ValueError):
+        serialized = repr(data)
+    version = hashlib.md5(serialized.encode("utf-8")).hexdigest()[:12]
+    _SECTION_VERSIONS[cache_key] = (data, version)
+    return version
 
 
 class KnowledgeService:
@@ -39,102 +76,110 @@ class KnowledgeService:
         """Отримує контекст лише про вступ 2026 (JSON)"""
         return get_admission_2026_context()
 
-    def get_context_for_prompt(self, query: str) -> dict:
+    def get_context_for_prompt(self, query: str, query_vector: Optional[Sequence[float]] = None) -> dict:
         """
         Повертає максимально релевантний контекст для промпту (звужений),
         щоб LLM працювала лише з потрібними даними.
+        
+        query_vector - вектор питання для embedding-пошуку уривків (якщо індекс побудовано)
         """
-        ql = (query or "").lower()
-
-        admission_keywords = [
-            "вступ", "вступ 2026", "вступна кампанія", "вступна кампанія 2026",
-            "правила вступу", "порядок вступу", "правила прийому", "правила прийому 2026",
-            "кампанія 2026", "кампанії 2026", "дата вступу", "дати вступу",
-            "коли починається вступ", "коли розпочинається вступ", "коли стартує вступ",
-            "коли починається вступна кампанія", "коли розпочинається вступна кампанія",
-            "коли стартує вступна кампанія", "початок вступної кампанії", "старт вступної кампанії",
-            "електронний кабінет", "електронні кабінети", "ksu24", "ксу24",
-            "заява", "заяви", "подача заяв", "подання заяв", "дедлайн", "термін подачі",
-            "хвиля", "хвилі", "друга хвиля", "додаткова хвиля",
-            "траєкторії", "траєкторія", "траєкторії вступу", "нмт", "національний мультипредметний тест",
-        ]
-        docs_keywords = [
-            "документ", "документи", "список документів", "перелік документів",
-            "потрібні документи", "які документи", "що потрібно подати", "пакет документів",
-            "подати документи", "подача документів",
-        ]
-        faculties_keywords = [
-            "факультет", "факультети", "спеціальності", "спеціальність", "напрям", "напрями",
-            "освітні програми", "бакалавр", "магістр", "кафедра", "кафедри",
-        ]
-        contacts_keywords = [
-            "контакт", "контакти", "адрес", "телефон", "приймальн", "email", "пошта", "сайт", "web", "вебсайт",
-        ]
-        tuition_keywords = [
-            "вартість", "вартість навчання", "ціна", "скільки коштує", "оплата", "коштує навчання", "тарифи",
-            "контракт", "контрактна вартість", "скільки платити", "ціна навчання", "оплата за семестр",
-            "оплата за рік", "оплата за місяць", "скільки коштує навчання",
-        ]
-
-        is_admission = any(kw in ql for kw in admission_keywords)
-        is_docs = any(kw in ql for kw in docs_keywords)
-        is_faculties = any(kw in ql for kw in faculties_keywords)
-        is_contacts = any(kw in ql for kw in contacts_keywords)
-        is_tuition = any(kw in ql for kw in tuition_keywords)
+        # Один прохід автомата намірів (ключові слова - в utils/intent_taxonomy.CONTEXT_INTENTS)
+        intents = intent_matcher.intents(query)
+        is_admission = "context.admission" in intents
+        is_docs = "context.documents" in intents
+        is_faculties = "context.faculties" in intents
+        is_contacts = "context.contacts" in intents
+        is_tuition = "context.tuition" in intents
 
         sections = {}
-        matched = []
 
         # admission 2026 block
         if is_admission and "admission" in KNOWLEDGE_BASE:
             sections["admission_2026"] = KNOWLEDGE_BASE["admission"].get("year_2026", {})
-            matched.append("admission")
 
         # tuition block
         if is_tuition and "tuition" in KNOWLEDGE_BASE:
             sections["tuition"] = KNOWLEDGE_BASE["tuition"]
-            matched.append("tuition")
 
         # faculties block
         if is_faculties:
             sections["faculties"] = KNOWLEDGE_BASE.get("faculties", {})
             sections["fields"] = KNOWLEDGE_BASE.get("fields", {})
-            matched.append("faculties")
 
         # documents
         if is_docs and "documents" in KNOWLEDGE_BASE:
             sections["documents"] = KNOWLEDGE_BASE["documents"]
-            matched.append("documents")
 
         # contacts
         if is_contacts:
             sections["contacts"] = KNOWLEDGE_BASE.get("contacts", {})
-            matched.append("contacts")
 
         # If nothing matched, give minimal core info + contacts
         if not sections:
-            sections["core"] = {
-                "university": KNOWLEDGE_BASE.get("university", {}),
-                "contacts": KNOWLEDGE_BASE.get("contacts", {}),
-            }
+            sections["core"] = _CORE_SECTION
 
         # Build text + structured JSON
         structured = sections
-        structured["_markers"] = {
-            "matched": matched,
-            "admission_keywords": admission_keywords,
-            "docs_keywords": docs_keywords,
-            "faculties_keywords": faculties_keywords,
-            "contacts_keywords": contacts_keywords,
-            "tuition_keywords": tuition_keywords,
-        }
-        text = KNU_KNOWLEDGE  # текстова частина (повна), щоб не втратити опис
+        # Текстова частина - найрелевантніші уривки (BM25), а не весь опис ХДУ;
+        # якщо уривків не знайдено - повний текст, щоб не втратити опис
+        passages = self.get_passages(query, query_vector=query_vector)
+        text = "\n\n".join(passage.text for passage in passages) if passages else KNU_KNOWLEDGE
 
         return {
             "text": text,
             "structured_json": structured,
+            "passages": passages,
         }
     
+    def get_passages(
+        self,
+        query: str,
+        top_k: int = PASSAGE_TOP_K,
+        token_budget: int = PASSAGE_TOKEN_BUDGET,
+        query_vector: Optional[Sequence[float]] = None
+    ) -> Tuple[Passage, ...]:
+        """
+        Найрелевантніші уривки бази знань у межах бюджету токенів
+        
+        Args:
+            query: Питання користувача
+            top_k: Максимальна кількість уривків
+            token_budget: Бюджет токенів на всі уривки
+            query_vector: Вектор питання; рейтинг BM25 зливається з embedding-пошуком
+            
+        Returns:
+            Tuple[Passage, ...]: Уривки за спаданням релевантності
+        """
+        ranked = get_passage_index().rank(query)
+        if query_vector is not None:
+            embedding_index = get_embedding_index()
+            if embedding_index.available:
+                # Кандидати обох рейтингів з запасом - бюджет відсіє зайве. Оцінки RRF (1/(k+r))
+                # майже однакові, тож слабкі збіги відсіюються до злиття: BM25 - відносно
+                # найкращого, embedding - за EMBEDDING_MIN_SCORE
+                depth = top_k * 4
+                ranked = fuse_rankings(
+                    above_relative_score(ranked[:depth]),
+                    embedding_index.search(query_vector, depth)
+                )
+                return select_passages(ranked, top_k, token_budget, min_relative_score=0)
+        return select_passages(ranked, top_k, token_budget)
+    
+    def get_context_fingerprint(self, context: dict) -> str:
+        """
+        Відбиток контексту для ключів кешу: ідентифікатори та версії секцій
+        
+        Дешевий (версії секцій обчислені заздалегідь) і не залежить від порядку ключів,
+        тож однаковий набір секцій дає однаковий ключ кешу.
+        
+        Returns:
+            str: Відбиток виду "contacts@1a2b3c4d5e6f;tuition@..."
+        """
+        return ";".join(
+            f"{name}@{section_version(name, context[name])}"
+            for name in sorted(context)
+        )
+    
     def get_knowledge_dict(self) -> dict:
         """
         Отримує структуровану базу знань як словник
@@ -0,0 +1,257 @@
+"""
+Пошук уривків бази знань (BM25) для мінімальних промптів
+Ефект: замість цілих секцій (усі факультети, весь текст про ХДУ) у промпт потрапляють
+кілька найрелевантніших уривків у межах бюджету токенів - менше prefill на CPU-OLLAMA
+"""
+import hashlib
+import json
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from knowledge_base import KNOWLEDGE_BASE, KNU_KNOWLEDGE, FACULTY_SPECIALTIES
+from utils.text_normalizer import TextNormalizer
+from config import PASSAGE_TOP_K, PASSAGE_TOKEN_BUDGET
+
+
+# Максимальна довжина уривка (символи): уривок має поміститися в контекст PromptBuilder
+MAX_PASSAGE_CHARS = 450
+# Приблизно 4 символи на токен (як у ContextOptimizer)
+CHARS_PER_TOKEN = 4
+
+# Частка від найкращої оцінки BM25, нижче якої уривки відкидаються
+MIN_RELATIVE_SCORE = 0.3
+
+# Параметри BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Питальні слова: у запиті вони є майже завжди, а в тексті бази знань - випадково
+# ("де застосовно"), тож для BM25 це шум (у ключах кешу вони лишаються - "де" і "коли" різні питання)
+QUESTION_WORDS = frozenset({
+    "де", "що", "як", "який", "яка", "яке", "які", "якої", "яких", "коли", "чи", "хто",
+    "куди", "звідки", "скільки", "чому", "навіщо", "є", "таке", "такий",
+})
+
+_HEADER_RE = re.compile(r"^(#{1,4})\s+(.*)$")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+
+class Passage(NamedTuple):
+    """Адресований уривок бази знань"""
+    id: str
+    title: str
+    text: str
+    tokens: int
+
+
+def _passage(passage_id: str, title: str, body: str) -> Passage:
+    text = f"{title}\n{body}" if title else body
+    return Passage(passage_id, title, text, len(text) // CHARS_PER_TOKEN + 1)
+
+
+def _chunk_lines(lines: List[str], limit: int) -> Iterator[str]:
+    """Рядки, згруповані в шматки до limit символів (довгий рядок - окремим шматком)"""
+    chunk: List[str] = []
+    size = 0
+    for line in lines:
+        if chunk and size + len(line) + 1 > limit:
+            yield "\n".join(chunk)
+            chunk, size = [], 0
+        chunk.append(line)
+        size += len(line) + 1
+    if chunk:
+        yield "\n".join(chunk)
+
+
+def split_markdown(source: str, text: str) -> List[Passage]:
+    """Текст з заголовками markdown -> уривки з шляхом заголовків у назві"""
+    passages: List[Passage] = []
+    headers: List[str] = []
+    body: List[str] = []
+
+    def flush():
+        # Заголовок документа (# ...) спільний для всіх уривків - у назву не йде
+        title = " / ".join(headers[1:] or headers)
+        limit = MAX_PASSAGE_CHARS - len(title) - 1
+        for index, chunk in enumerate(_chunk_lines(body, limit)):
+            passages.append(_passage(f"{source}:{title}#{index}", title, chunk))
+        body.clear()
+
+    for line in text.splitlines():
+        line = line.rstrip()
+        header = _HEADER_RE.match(line)
+        if header:
+            flush()
+            level = len(header.group(1))
+            headers[level - 1:] = [header.group(2).strip("* ")]
+        elif line.strip():
+            body.append(line)
+    flush()
+    return passages
+
+
+def split_structured(source: str, path: str, data) -> List[Passage]:
+    """
+    Словник/список -> уривки: вузол, що вміщується в ліміт, - один уривок,
+    більший - рекурсивно за ключами (дрібні сусідні ключі групуються)
+    """
+    serialized = json.dumps(data, ensure_ascii=False)
+    if len(serialized) + len(path) < MAX_PASSAGE_CHARS or not isinstance(data, (dict, list)) or not data:
+        return [_passage(f"{source}:{path}", path, serialized)]
+
+    items = list(data.items()) if isinstance(data, dict) else list(enumerate(data))
+    passages: List[Passage] = []
+    group: Dict = {}
+    group_size = 0
+
+    def flush_group():
+        if group:
+            keys = ",".join(str(key) for key in group)
+            body = json.dumps(group if isinstance(data, dict) else list(group.values()), ensure_ascii=False)
+            passages.append(_passage(f"{source}:{path}[{keys}]", path, body))
+            group.clear()
+
+    for key, value in items:
+        value_size = len(json.dumps(value, ensure_ascii=False)) + len(str(key)) + 4
+        if value_size + len(path) >= MAX_PASSAGE_CHARS:
+            flush_group()
+            group_size = 0
+            passages.extend(split_structured(source, f"{path}.{key}", value))
+            continue
+        if group_size + value_size + len(path) >= MAX_PASSAGE_CHARS:
+            flush_group()
+            group_size = 0
+        group[key] = value
+        group_size += value_size
+    flush_group()
+    return passages
+
+
+def build_passages() -> List[Passage]:
+    """Уривки всіх джерел: текст про ХДУ, структурована база знань, спеціальності факультетів"""
+    passages = split_markdown("text", KNU_KNOWLEDGE)
+    for section, data in KNOWLEDGE_BASE.items():
+        passages.extend(split_structured("kb", section, data))
+    for faculty_id, html in FACULTY_SPECIALTIES.items():
+        lines = [line.strip() for line in _HTML_TAG_RE.sub("", html).splitlines() if line.strip()]
+        if lines:
+            passages.extend(
+                _passage(f"faculty:{faculty_id}#{index}", lines[0], chunk)
+                for index, chunk in enumerate(_chunk_lines(lines[1:], MAX_PASSAGE_CHARS - len(lines[0]) - 1))
+            )
+    return passages
+
+
+def above_relative_score(
+    ranked: Sequence[Tuple[Passage, float]],
+    min_relative_score: float = MIN_RELATIVE_SCORE
+) -> Sequence[Tuple[Passage, float]]:
+    """Початок рейтингу з оцінками не нижче частки min_relative_score від найкращої"""
+    if not ranked or min_relative_score <= 0:
+        return ranked
+    threshold = ranked[0][1] * min_relative_score
+    for position, (_, score) in enumerate(ranked):
+        if score < threshold:
+            return ranked[:position]
+    return ranked
+
+
+def select_passages(
+    ranked: Sequence[Tuple[Passage, float]],
+    top_k: int = PASSAGE_TOP_K,
+    token_budget: int = PASSAGE_TOKEN_BUDGET,
+    min_relative_score: float = MIN_RELATIVE_SCORE
+) -> Tuple[Passage, ...]:
+    """
+    Перші top_k уривків рейтингу, що вміщуються в бюджет токенів
+
+    min_relative_score - частка від найкращої оцінки, нижче якої уривки відкидаються
+    (0 - без відсікання: для рейтингів, де оцінки не порівнюються відносно, як у RRF)
+    """
+    selected: List[Passage] = []
+    used = 0
+    for passage, _ in above_relative_score(ranked, min_relative_score):
+        if len(selected) >= top_k:
+            break
+        if used + passage.tokens > token_budget:
+            continue
+        selected.append(passage)
+        used += passage.tokens
+    return tuple(selected)
+
+
+class PassageIndex:
+    """
+    Інвертований індекс BM25 над уривками
+
+    Внесок кожного (терм, уривок) у BM25 обчислюється під час побудови, тож оцінка
+    запиту - лише підсумовування готових ваг зі списків уривків термів запиту.
+    """
+
+    def __init__(self, passages: List[Passage], memo_size: int = 1024):
+        self.passages = passages
+        self.version = hashlib.md5(
+            "\n\x00".join(p.id + "\x00" + p.text for p in passages).encode("utf-8")
+        ).hexdigest()[:16]
+
+        term_counts = [Counter(TextNormalizer.terms(p.text, QUESTION_WORDS)) for p in passages]
+        lengths = [sum(counts.values()) for counts in term_counts]
+        avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        document_frequency: Counter = Counter()
+        for counts in term_counts:
+            document_frequency.update(counts.keys())
+
+        total = len(passages)
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for doc_id, counts in enumerate(term_counts):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / avg_length) if avg_length else BM25_K1
+            for term, tf in counts.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                postings.setdefault(term, []).append((doc_id, idf * tf * (BM25_K1 + 1) / (tf + norm)))
+        self._postings: Dict[str, Tuple[Tuple[int, float], ...]] = {
+            term: tuple(entries) for term, entries in postings.items()
+        }
+        self._rank_memo = lru_cache(maxsize=memo_size)(self._rank)
+
+    def _rank(self, query: str) -> Tuple[Tuple[Passage, float], ...]:
+        scores: Dict[int, float] = {}
+        for term in TextNormalizer.tokens(query, QUESTION_WORDS):
+            for doc_id, weight in self._postings.get(term, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return tuple((self.passages[doc_id], score) for doc_id, score in ranked)
+
+    def rank(self, query: Optional[str]) -> Tuple[Tuple[Passage, float], ...]:
+        """Усі уривки зі збігами термів запиту з оцінками BM25 (за спаданням)"""
+        if not query:
+            return ()
+        return self._rank_memo(query)
+
+    def search(
+        self,
+        query: Optional[str],
+        top_k: int = PASSAGE_TOP_K,
+        token_budget: int = PASSAGE_TOKEN_BUDGET,
+        min_relative_score: float = MIN_RELATIVE_SCORE
+    ) -> Tuple[Passage, ...]:
+        """Найрелевантніші уривки (за спаданням оцінки) у межах бюджету токенів"""
+        return select_passages(self.rank(query), top_k, token_budget, min_relative_score)
+
+    def get_stats(self) -> Dict:
+        info = self._rank_memo.cache_info()
+        return {
+            "version": self.version,
+            "passages": len(self.passages),
+            "terms": len(self._postings),
+            "memo_hits": info.hits,
+            "memo_misses": info.misses
+        }
+
+
+@lru_cache(maxsize=1)
+def get_passage_index() -> PassageIndex:
+    """Індекс будується один раз на процес (база знань статична між деплоями)"""
+    return PassageIndex(build_passages())
@@ -2,9 +2,107 @@
 Допоміжний модуль для автоматичного пошуку вартості навчання
 """
 import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Optional, Set, Tuple
 from knowledge_base import KNU_KNOWLEDGE, get_admissions_committee_phones
 
 
+# Код спеціальності (після нормалізації): "F2", "A4.11", "D8" або числовий "121"
+SPECIALTY_CODE_RE = re.compile(r"^(?:[A-Z]\d{1,2}(?:\.\d{1,3})?|\d{3})$")
+
+# Перша літера коду кирилицею -> латинська: спершу двійники ("С4" - це C4, а не S4),
+# далі транслітерація літер, що не мають двійника ("ф6" -> F6)
+_CODE_LETTERS = {
+    "а": "A", "в": "B", "с": "C", "е": "E", "і": "I", "к": "K", "о": "O", "р": "P",
+    "т": "T", "х": "X", "н": "H", "м": "M",
+    "б": "B", "г": "G", "д": "D", "є": "E", "ж": "Zh", "з": "Z", "и": "I", "ї": "I", "й": "Y",
+    "л": "L", "п": "P", "у": "U", "ф": "F", "ц": "Ts", "ч": "Ch", "ш": "Sh", "щ": "Shch",
+    "ь": "", "ю": "Yu", "я": "Ya",
+}
+
+# Рядок бази знань зі спеціальністю та кодом: "- Право (код D8, ліцензований обсяг: ...)"
+_KB_SPECIALTY_RE = re.compile(r"^\s*-\s*([^\n(]+?)\s*\(код\s+([^,)\s]+)", re.M)
+_PARENTHESIZED_RE = re.compile(r"\(([^)]*)\)")
+_CODE_IN_TEXT_RE = re.compile(r"код\s+([^\s,)]+)", re.IGNORECASE)
+
+
+def normalize_specialty_code(code: Optional[str]) -> Optional[str]:
+    """Код спеціальності у єдиному вигляді ("ф6" -> "F6", "а4.11" -> "A4.11") або None, якщо це не код"""
+    if not code:
+        return None
+    code = code.strip()
+    if code and code[0].lower() in _CODE_LETTERS:
+        code = _CODE_LETTERS[code[0].lower()] + code[1:]
+    code = code.upper()
+    return code if SPECIALTY_CODE_RE.match(code) else None
+
+
+def specialty_base_name(name: str) -> str:
+    """Назва спеціальності без уточнення в дужках, у нижньому регістрі"""
+    return name.split("(")[0].strip().lower()
+
+
+@lru_cache(maxsize=1)
+def get_specialty_code_map() -> Tuple[Dict[str, FrozenSet[str]], Dict[str, FrozenSet[str]]]:
+    """
+    Відповідність кодів і назв спеціальностей з бази знань
+
+    Returns:
+        (код -> назви, назва -> коди); назви - у вигляді specialty_base_name.
+        Одна назва може мати кілька кодів ("Хімія": A4.06 і E3), один код - кілька назв.
+    """
+    code_names: Dict[str, Set[str]] = {}
+    name_codes: Dict[str, Set[str]] = {}
+    for match in _KB_SPECIALTY_RE.finditer(KNU_KNOWLEDGE):
+        name = specialty_base_name(match.group(1))
+        code = normalize_specialty_code(match.group(2))
+        if name and code:
+            code_names.setdefault(code, set()).add(name)
+            name_codes.setdefault(name, set()).add(code)
+    return (
+        {code: frozenset(names) for code, names in code_names.items()},
+        {name: frozenset(codes) for name, codes in name_codes.items()}
+    )
+
+
+def resolve_specialty(specialty_name: str = None, specialty_code: str = None) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """
+    Усі назви та коди, під якими відома спеціальність
+
+    Назва з адмін-меню ("Середня освіта (Математика)", "Інформаційні системи та технології
+    (код 121)") і код з питання ("F2") зводяться до тих самих наборів, тож теги кешу
+    відповіді та теги зміни вартості збігаються, хоч би з якого боку була відома лише назва чи код.
+    Уточнення в дужках вважається кодом лише якщо має вигляд коду.
+
+    Returns:
+        (назви у вигляді specialty_base_name, нормалізовані коди)
+    """
+    code_names, name_codes = get_specialty_code_map()
+    names: Set[str] = set()
+    codes: Set[str] = set()
+
+    code = normalize_specialty_code(specialty_code)
+    if code:
+        codes.add(code)
+    if specialty_name:
+        base = specialty_base_name(specialty_name)
+        if base:
+            names.add(base)
+            codes.update(name_codes.get(base, ()))
+        for detail in _PARENTHESIZED_RE.findall(specialty_name):
+            explicit = _CODE_IN_TEXT_RE.search(detail)
+            detail_code = normalize_specialty_code(explicit.group(1) if explicit else detail)
+            if detail_code:
+                codes.add(detail_code)
+            else:
+                # Спеціалізація ("Середня освіта (Математика)") - код за її назвою
+                codes.update(name_codes.get(specialty_base_name(detail), ()))
+
+    for code in tuple(codes):
+        names.update(code_names.get(code, ()))
+    return frozenset(names), frozenset(codes)
+
+
 async def find_tuition_info(specialty_name: str = None, specialty_code: str = None) -> str:
     """
     Автоматично знаходить інформацію про вартість навчання для спеціальності
@@ -212,21 +310,9 @@ def extract_specialty_from_message(message: str) -> tuple:
                     if 100 <= code_num <= 999 and not (2000 <= code_num <= 2099):
                         specialty_code = extracted_code
                 else:
-                    # Коди з літерами або з галузями: нормалізуємо (великі літери)
-                    # Конвертуємо кирилицю в латиницю для уніфікації (А -> A, Б -> B тощо)
-                    cyrillic_to_latin = {
-                        'а': 'A', 'б': 'B', 'в': 'V', 'г': 'G', 'д': 'D', 'е': 'E', 'є': 'E',
-                        'ж': 'Zh', 'з': 'Z', 'и': 'I', 'і': 'I', 'ї': 'I', 'й': 'Y', 'к': 'K',
-                        'л': 'L', 'м': 'M', 'н': 'N', 'о': 'O', 'п': 'P', 'р': 'R', 'с': 'S',
-                        'т': 'T', 'у': 'U', 'ф': 'F', 'х': 'H', 'ц': 'Ts', 'ч': 'Ch', 'ш': 'Sh',
-                        'щ': 'Shch', 'ь': '', 'ю': 'Yu', 'я': 'Ya'
-                    }
-                    # Конвертуємо першу літеру з кирилиці в латиницю (якщо потрібно)
-                    if extracted_code[0].lower() in cyrillic_to_latin:
-                        first_letter = cyrillic_to_latin[extracted_code[0].lower()].upper()
-                        specialty_code = first_letter + extracted_code[1:].upper()
-                    else:
-                        specialty_code = extracted_code.upper()
+                    # Коди з літерами або з галузями: латинська літера, великі літери
+                    # (кирилиця -> латиниця так само, як у кодах бази знань: "С4" -> "C4")
+                    specialty_code = normalize_specialty_code(extracted_code)
             if specialty_code:
                 break
     
@@ -3,8 +3,10 @@
 """
 from .text_formatter import TextFormatter
 from .message_parser import MessageParser
+from .text_normalizer import TextNormalizer
+from .intent_matcher import IntentMatcher, intent_matcher
 
-__all__ = ['TextFormatter', 'MessageParser']
+__all__ = ['TextFormatter', 'MessageParser', 'TextNormalizer', 'IntentMatcher', 'intent_matcher']
 
 
 
@@ -0,0 +1,164 @@
+"""
+Багатошаблонний пошук намірів (автомат Ахо-Корасік), скомпільований один раз при імпорті
+Ефект: повідомлення проглядається за один прохід незалежно від кількості ключових слів,
+а повторні перевірки того самого тексту (класифікатор, контекст, шаблони) беруться з пам'яті
+"""
+from collections import deque
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from utils.intent_taxonomy import build_taxonomy
+from utils.text_normalizer import TextNormalizer
+
+
+class IntentMatch(NamedTuple):
+    """Збіг ключової фрази; start/end - позиції у вихідному тексті (match_fold не змінює довжину)"""
+    intent: str
+    keyword: str
+    start: int
+    end: int
+
+
+class IntentMatcher:
+    """
+    Автомат Ахо-Корасік над ключовими фразами всіх намірів таксономії
+
+    Семантика - як у any(kw in text ...): збіг підрядком, без меж слів.
+    Текст і ключові фрази проходять однакове згортання (TextNormalizer.match_fold),
+    тож регістр, латинські двійники літер та варіанти апострофа не заважають збігу;
+    транслітерації немає - латинські слова порівнюються як латинські.
+    """
+
+    def __init__(self, taxonomy: Dict[str, Iterable[str]], memo_size: int = 2048):
+        # Стан автомата: переходи, посилання невдачі та ключові фрази, що закінчуються в стані
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[Tuple[str, Tuple[str, ...]], ...]] = [()]
+        self.intent_names = frozenset(taxonomy)
+
+        keyword_intents: Dict[str, List[str]] = {}
+        for intent, keywords in taxonomy.items():
+            for keyword in keywords:
+                folded = TextNormalizer.match_fold(keyword)
+                if folded:
+                    keyword_intents.setdefault(folded, []).append(intent)
+        self.keyword_count = len(keyword_intents)
+
+        terminal: Dict[int, Tuple[str, Tuple[str, ...]]] = {}
+        for keyword, intents in keyword_intents.items():
+            terminal[self._insert(keyword)] = (keyword, tuple(dict.fromkeys(intents)))
+        self._build_links(terminal)
+
+        self._scan_memo = lru_cache(maxsize=memo_size)(self._scan)
+        self._intents_memo = lru_cache(maxsize=memo_size)(self._intents)
+
+    def _insert(self, keyword: str) -> int:
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][char] = next_state
+            state = next_state
+        return state
+
+    def _build_links(self, terminal: Dict[int, Tuple[str, Tuple[str, ...]]]):
+        """Посилання невдачі (обхід у ширину) та злиття виходів із суфіксними станами"""
+        # Стани першого рівня посилаються на корінь (0) - їх посилання вже задані
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            own = (terminal[state],) if state in terminal else ()
+            self._output[state] = own + self._output[self._fail[state]]
+            for char, next_state in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                queue.append(next_state)
+
+    def _scan(self, text: str) -> Tuple[IntentMatch, ...]:
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        state = 0
+        for position, char in enumerate(TextNormalizer.match_fold(text)):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword, intents in output[state]:
+                start = position + 1 - len(keyword)
+                for intent in intents:
+                    matches.append(IntentMatch(intent, keyword, start, position + 1))
+        return tuple(matches)
+
+    def _intents(self, text: str) -> FrozenSet[str]:
+        return frozenset(match.intent for match in self._scan_memo(text))
+
+    def scan(self, text: Optional[str]) -> Tuple[IntentMatch, ...]:
+        """Усі збіги (з позиціями) за один прохід по тексту"""
+        if not text:
+            return ()
+        return self._scan_memo(text)
+
+    def intents(self, text: Optional[str]) -> FrozenSet[str]:
+        """Множина намірів, знайдених у тексті"""
+        if not text:
+            return frozenset()
+        return self._intents_memo(text)
+
+    def has(self, text: Optional[str], intent: str) -> bool:
+        return intent in self.intents(text)
+
+    def first(self, text: Optional[str], intents: Sequence[str]) -> Optional[str]:
+        """Перший за пріоритетом намір зі списку, знайдений у тексті"""
+        found = self.intents(text)
+        for intent in intents:
+            if intent in found:
+                return intent
+        return None
+
+    def keywords(self, text: Optional[str], intent: str) -> List[str]:
+        """Знайдені ключові фрази наміру (для логів та діагностики)"""
+        return list(dict.fromkeys(match.keyword for match in self.scan(text) if match.intent == intent))
+
+    def get_stats(self) -> Dict:
+        info = self._scan_memo.cache_info()
+        return {
+            "intents": len(self.intent_names),
+            "keywords": self.keyword_count,
+            "states": len(self._goto),
+            "memo_hits": info.hits,
+            "memo_misses": info.misses
+        }
+
+
+def _admission_2026_intents() -> Dict[str, Tuple[str, ...]]:
+    """Ключові слова розділів вступу-2026 з бази знань (search_admission_2026_by_keyword)"""
+    from knowledge_base import KNOWLEDGE_BASE
+
+    admission_2026 = KNOWLEDGE_BASE.get("admission", {}).get("year_2026", {})
+    nmt = admission_2026.get("nmt", {})
+    trajectories = admission_2026.get("trajectories", {})
+    campaign = admission_2026.get("campaign", {})
+    sources = {
+        "admission_2026.general": admission_2026,
+        "admission_2026.nmt": nmt,
+        "admission_2026.trajectories": trajectories,
+        "admission_2026.master": trajectories.get("master", {}),
+        "admission_2026.campaign": campaign,
+        "admission_2026.electronic_cabinets": campaign.get("electronic_cabinets", {}),
+        "admission_2026.support": campaign.get("support", {}),
+    }
+    intents = {
+        intent: tuple(data.get("keywords", ()))
+        for intent, data in sources.items()
+        if isinstance(data, dict)
+    }
+    intents["admission_2026.bachelor"] = ("бакалавр", "bachelor", "3 роки 10 місяців")
+    return intents
+
+
+# Один автомат на процес: таксономія бота та ключові слова бази знань
+intent_matcher = IntentMatcher({**build_taxonomy(), **_admission_2026_intents()})
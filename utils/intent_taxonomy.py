@@ -0,0 +1,232 @@
+"""
+Єдина таксономія намірів: назва наміру -> ключові фрази (збіг підрядком)
+Усі списки ключових слів бота зібрані тут і компілюються в один автомат IntentMatcher,
+тож нове слово додається в таксономію, а не в черговий any(kw in text ...)
+"""
+from typing import Dict, List, Tuple
+
+
+# KnowledgeService.get_context_for_prompt: які секції бази знань додати в контекст
+CONTEXT_INTENTS: Dict[str, Tuple[str, ...]] = {
+    "context.admission": (
+        "вступ", "вступ 2026", "вступна кампанія", "вступна кампанія 2026",
+        "правила вступу", "порядок вступу", "правила прийому", "правила прийому 2026",
+        "кампанія 2026", "кампанії 2026", "дата вступу", "дати вступу",
+        "коли починається вступ", "коли розпочинається вступ", "коли стартує вступ",
+        "коли починається вступна кампанія", "коли розпочинається вступна кампанія",
+        "коли стартує вступна кампанія", "початок вступної кампанії", "старт вступної кампанії",
+        "електронний кабінет", "електронні кабінети", "ksu24", "ксу24",
+        "заява", "заяви", "подача заяв", "подання заяв", "дедлайн", "термін подачі",
+        "хвиля", "хвилі", "друга хвиля", "додаткова хвиля",
+        "траєкторії", "траєкторія", "траєкторії вступу", "нмт", "національний мультипредметний тест",
+    ),
+    "context.documents": (
+        "документ", "документи", "список документів", "перелік документів",
+        "потрібні документи", "які документи", "що потрібно подати", "пакет документів",
+        "подати документи", "подача документів",
+    ),
+    "context.faculties": (
+        "факультет", "факультети", "спеціальності", "спеціальність", "напрям", "напрями",
+        "освітні програми", "бакалавр", "магістр", "кафедра", "кафедри",
+    ),
+    "context.contacts": (
+        "контакт", "контакти", "адрес", "телефон", "приймальн", "email", "пошта", "сайт", "web", "вебсайт",
+    ),
+    "context.tuition": (
+        "вартість", "вартість навчання", "ціна", "скільки коштує", "оплата", "коштує навчання", "тарифи",
+        "контракт", "контрактна вартість", "скільки платити", "ціна навчання", "оплата за семестр",
+        "оплата за рік", "оплата за місяць", "скільки коштує навчання",
+    ),
+}
+
+# QuestionClassifier: тип питання (порядок пріоритету - у класифікаторі)
+QUESTION_TYPE_INTENTS: Dict[str, Tuple[str, ...]] = {
+    "type.factual": (
+        "які є", "що таке", "де знаходиться",
+        "скільки є", "які спеціальності", "які факультети",
+    ),
+    "type.comparison": (
+        "порівняй", "в чому різниця", "що краще",
+        "яка різниця", "скільки різних", "як відрізняються",
+    ),
+    "type.procedural": (
+        "як подати", "які кроки", "що потрібно зробити",
+        "як вступити", "як підготуватися", "як оформити",
+    ),
+    "type.admission": (
+        "вступ", "нмт", "документ", "кампанія",
+        "правила вступу", "правила прийому", "порядок вступу",
+        "траєкторії", "електронний кабінет",
+        "ksu24", "ксу24", "вступна кампанія", "правила",
+    ),
+    "type.tuition": (
+        "вартість", "ціна", "скільки коштує",
+        "оплата", "тарифи", "коштує навчання",
+    ),
+    "type.faculties": (
+        "факультет", "спеціальність", "напрям",
+        "освітні програми", "які є факультети",
+    ),
+}
+
+# MessageParser: тип питання для шаблонних відповідей
+PARSER_INTENTS: Dict[str, Tuple[str, ...]] = {
+    "parser.tuition": (
+        "вартість", "ціна", "скільки коштує", "оплата",
+        "коштує навчання", "тарифи", "ціни",
+    ),
+    "parser.specialty": ("спеціальності", "спеціальність", "факультети", "факультет"),
+    "parser.contact": ("контакти", "телефон", "адреса", "зв'язатися", "звязатися"),
+    "parser.documents": ("документи", "документ", "потрібно", "необхідно"),
+}
+
+# AnswerEngine: маршрути детермінованих відповідей
+ENGINE_INTENTS: Dict[str, Tuple[str, ...]] = {
+    "engine.documents": (
+        "документ", "документи", "які документи", "список документів",
+        "потрібні документи", "що потрібно для вступу",
+    ),
+    "engine.law": ("право", "права", "юрид", "юриспруд", "law"),
+    "engine.tuition": (
+        "вартість", "ціна", "скільки коштує", "оплата", "коштує навчання",
+        "тарифи", "скільки коштує навчання", "вартості",
+    ),
+    # Слова, які вказують на конкретну спеціальність/факультет
+    "engine.specific": (
+        "спеціальність", "спеціальності", "факультет", "факультети",
+        "логопед", "психолог", "право", "медицина", "іт", "програмування",
+        "економіка", "менеджмент", "філолог", "журналіст", "біолог", "хімія",
+        "фізика", "географ", "туризм", "готель", "фармац", "терап", "реабіліт",
+    ),
+    "engine.specialty": (
+        "спеціальності", "спеціальність", "спеціальностей", "спеціальностях",
+        "які є спеціальності", "які спеціальності", "список спеціальностей",
+        "які спеціальності є", "перелік спеціальностей", "всі спеціальності",
+        "спеціальності в університеті", "спеціальності в хду", "спеціальності хду",
+        "які є спеціальності в хду", "які спеціальності в університеті",
+        "покажи спеціальності", "покажи мені спеціальності", "хочу подивитися спеціальності",
+        "інформація про спеціальності", "про спеціальності", "що є за спеціальності",
+    ),
+    # Конкретна галузь або вартість у питанні про спеціальності
+    "engine.specific_fields": (
+        "медицина", "іт", "програмування", "право", "економіка",
+        "психологія", "педагогіка", "філологія", "бізнес", "спорт",
+        "вартість", "ціна", "коштує", "грн", "гривень",
+    ),
+    "engine.faculty_list": ("факультет", "факультети", "які є факультети", "список факультетів"),
+}
+
+# Ключові слова галузей -> факультет (порядок - пріоритет при кількох збігах)
+FACULTY_INTENTS: List[Tuple[str, Tuple[str, ...]]] = [
+    # Бізнес і право
+    ("faculty.faculty_7", (
+        "бізнес", "бізнесу", "економ", "право", "права", "юрид", "юриспруд", "юрист", "адвокат",
+        "менедж", "фінанс", "банківсь", "страхуван", "підприємниц", "адмініструван", "маркетинг",
+    )),
+    # ІТ / програмування
+    ("faculty.faculty_8", (
+        "іт", "айті", "айти", "програмув", "програмн", "програміст", "комп'ют", "компют",
+        "інформат", "сисадмін", "data", "дата", "штучний інтелект", "машинне навчання",
+        "f2", "f3", "f6", "121",
+    )),
+    # Медицина / здоров'я
+    ("faculty.faculty_3", (
+        "медиц", "медичн", "медфак", "фармац", "терап", "реабіліт", "ерготерап", "здоров",
+        "фізична терап", "ерго", "медицина", "медик",
+    )),
+    # Природничі
+    ("faculty.faculty_4", (
+        "біолог", "біо", "еколог", "географ", "гео", "хім", "фізик", "природнич", "астрон", "науки про землю",
+    )),
+    # Спорт
+    ("faculty.faculty_5", (
+        "спорт", "спортив", "фізкульт", "фіз вих", "фізична культура", "фк", "олімп",
+    )),
+    # Педагогіка / освіта
+    ("faculty.faculty_6", (
+        "педагог", "дошкіль", "початков", "логопед", "олігофрен", "середня освіта", "вчитель",
+        "учитель", "освіта", "методика", "педфак",
+    )),
+    # Психологія / соціальні
+    ("faculty.faculty_2", (
+        "психолог", "соціолог", "істор", "соц", "суспільн", "соціальна робота", "археолог", "психологія",
+    )),
+    # Філологія / мистецтва / журналістика
+    ("faculty.faculty_1", (
+        "філолог", "філфак", "журналіст", "журфак", "мистецт", "культурол", "музич", "хореограф",
+        "образотвор", "германськ", "мов", "іноземні мови", "переклад", "мовознав", "літератур",
+    )),
+]
+
+# chat_handler: прості фрази, питання без генерації та перевірки відповіді OLLAMA
+CHAT_INTENTS: Dict[str, Tuple[str, ...]] = {
+    "chat.greeting": (
+        "привіт", "вітаю", "добрий день", "доброго дня", "добрий вечір",
+        "доброго вечора", "доброго ранку", "добрий ранок", "hello", "hi",
+    ),
+    "chat.how_are_you": ("як справи", "як справи?", "як ти", "як поживаєш", "що нового"),
+    "chat.admission": (
+        "правила вступу", "вступ 2026", "вступна кампанія 2026",
+        "порядок вступу", "правила прийому", "правила прийому 2026",
+        "кампанія 2026", "нмт", "траєкторії вступу",
+    ),
+    # Питання про подачу документів (стандартна відповідь замість незрозумілої)
+    "chat.document_submission": ("документ", "подати", "подача", "як подати"),
+    # Лише явні згадки про документи
+    "chat.document_explicit": (
+        "документ", "документи", "які документи", "список документів",
+        "потрібні документи", "що потрібно для вступу",
+    ),
+    "chat.document_question": (
+        "документ", "подати", "подача", "як подати", "де подати", "куди подати",
+        "які документи", "список документів", "потрібні документи",
+    ),
+    # Відповідь OLLAMA містить вартість
+    "chat.tuition_info": ("грн", "гривень", "місяць", "семестр", "рік", "період", "вартість", "навчання"),
+    # Відповідь OLLAMA про факультети - додається клавіатура
+    "chat.faculties_response": (
+        "8 факультетів", "оберіть факультет", "факультети хду", "факультет української",
+        "факультет психології", "медичний факультет", "факультет біології",
+        "факультет фізичного", "педагогічний факультет", "факультет бізнесу",
+        "факультет комп'ютерних", "є 8 факультетів", "в хду є",
+    ),
+}
+
+# chat_handler: емоційні повідомлення (відповіді - в обробнику, порядок - пріоритет)
+EMOTIONS: Tuple[str, ...] = ("переживаю", "хвилююсь", "страшно", "нервую", "сумно", "добре", "погано")
+
+# Застарілий ollama_client.generate_response
+LEGACY_INTENTS: Dict[str, Tuple[str, ...]] = {
+    "legacy.admission": (
+        "правила вступу", "вступ 2026", "вступна кампанія 2026",
+        "порядок вступу", "кампанії 2026", "правила прийому 2026",
+        "правила прийому до хду", "правила прийому 2026 хду",
+        "електронний кабінет", "електронні кабінети", "ksu24", "kсу24",
+        "траєкторії", "траєкторії вступу", "траєкторія вступу", "коротка програма", "скорочена програма",
+        "вступна кампанія", "коли розпочинається вступ", "коли починається вступ",
+        "коли розпочинається вступна кампанія", "коли починається вступна кампанія",
+        "початок вступної кампанії", "старт вступної кампанії",
+    ),
+    # Ознаки того, що відповідь моделі справді про вступ
+    "legacy.admission_markers": (
+        "вступ", "нмт", "траєктор", "кампан", "електрон", "ksu24", "ксу24", "правил", "кабінет", "2026",
+    ),
+    # Відповідь про вступ-2026, а не про документи загалом
+    "legacy.admission_topic": ("нмт", "траєктор", "кампан", "електронн", "ksu24", "ксу24"),
+    "legacy.it": ("програмування", "програміст", "іт", "інформатика", "комп'ютер", "121", "f6", "f2", "f3"),
+    "legacy.medicine": ("медицина", "медичні", "лікар"),
+}
+
+
+def emotion_intent(emotion: str) -> str:
+    return f"chat.emotion.{emotion}"
+
+
+def build_taxonomy() -> Dict[str, Tuple[str, ...]]:
+    """Повна статична таксономія (ключові слова вступу-2026 додаються з бази знань)"""
+    taxonomy: Dict[str, Tuple[str, ...]] = {}
+    for group in (CONTEXT_INTENTS, QUESTION_TYPE_INTENTS, PARSER_INTENTS, ENGINE_INTENTS, CHAT_INTENTS, LEGACY_INTENTS):
+        taxonomy.update(group)
+    taxonomy.update(FACULTY_INTENTS)
+    taxonomy.update((emotion_intent(emotion), (emotion,)) for emotion in EMOTIONS)
+    return taxonomy
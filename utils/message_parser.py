@@ -3,6 +3,7 @@
 """
 import re
 from typing import Optional, Tuple
+from utils.intent_matcher import intent_matcher
 
 
 class MessageParser:
@@ -21,13 +22,8 @@ class MessageParser:
         """
         message_lower = message.lower()
         
-        # Ключові слова про вартість
-        tuition_keywords = [
-            'вартість', 'ціна', 'скільки коштує', 'оплата', 
-            'коштує навчання', 'тарифи', 'ціни'
-        ]
-        
-        if any(keyword in message_lower for keyword in tuition_keywords):
+        # Ключові слова про вартість (parser.tuition у таксономії намірів)
+        if intent_matcher.has(message, 'parser.tuition'):
             return True
         
         # Перевірка на коди спеціальностей (121, F6, A4.11 тощо)
@@ -76,24 +72,18 @@ class MessageParser:
         Returns:
             str: Тип питання (tuition, specialty, general, contact, documents)
         """
-        message_lower = message.lower()
-        
         if MessageParser.is_tuition_question(message):
             return 'tuition'
         
-        if any(word in message_lower for word in [
-            'спеціальності', 'спеціальність', 'факультети', 'факультет'
-        ]):
+        intents = intent_matcher.intents(message)
+        
+        if 'parser.specialty' in intents:
             return 'specialty'
         
-        if any(word in message_lower for word in [
-            'контакти', 'телефон', 'адреса', 'зв\'язатися', 'звязатися'
-        ]):
+        if 'parser.contact' in intents:
             return 'contact'
         
-        if any(word in message_lower for word in [
-            'документи', 'документ', 'потрібно', 'необхідно'
-        ]):
+        if 'parser.documents' in intents:
             return 'documents'
         
         return 'general'
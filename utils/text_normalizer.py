@@ -0,0 +1,229 @@
+"""
+Нормалізація запитів українською для ключів кешу та маршрутизації
+Ефект: "вартість навчання на психолога" і "скільки коштує психологія" дають один ключ,
+а апострофи, латинські двійники літер, транслітерація й подвоєні літери не розщеплюють ключі
+"""
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Tuple
+
+
+# Варіанти апострофа -> "'"
+_APOSTROPHES = str.maketrans({c: "'" for c in "’ʼ`´‘ʹ′"})
+
+# Російська розкладка: літери, яких немає в українській абетці (ґ - українська, не згортається)
+_RUSSIAN_LETTERS = str.maketrans({"ы": "и", "э": "е", "ё": "е", "ъ": "'"})
+
+# Латинські літери, що виглядають як кириличні (у словах з кирилицею)
+_LOOKALIKES = str.maketrans({
+    "a": "а", "c": "с", "e": "е", "i": "і", "o": "о", "p": "р", "x": "х",
+    "y": "у", "k": "к", "m": "м", "t": "т", "h": "н", "b": "в",
+})
+
+# Зворотна транслітерація (латиниця -> кирилиця): спершу багатолітерні сполучення
+_TRANSLIT = [
+    ("shch", "щ"), ("zh", "ж"), ("kh", "х"), ("ts", "ц"), ("ch", "ч"), ("sh", "ш"),
+    ("yu", "ю"), ("ya", "я"), ("ye", "є"), ("yi", "ї"), ("iu", "ю"), ("ia", "я"), ("ie", "є"),
+    ("a", "а"), ("b", "б"), ("v", "в"), ("h", "г"), ("g", "г"), ("d", "д"), ("e", "е"),
+    ("z", "з"), ("y", "и"), ("i", "і"), ("j", "й"), ("k", "к"), ("l", "л"), ("m", "м"),
+    ("n", "н"), ("o", "о"), ("p", "п"), ("r", "р"), ("s", "с"), ("t", "т"), ("u", "у"),
+    ("f", "ф"), ("c", "ц"), ("x", "кс"), ("w", "в"), ("q", "к"),
+]
+_TRANSLIT_RE = re.compile("|".join(latin for latin, _ in _TRANSLIT))
+_TRANSLIT_MAP = dict(_TRANSLIT)
+
+# Латинські слова, що вживаються як є (не транслітеруються)
+_LATIN_KEEP = frozenset({"email", "mail", "web", "website", "telegram", "viber", "google", "online", "pdf"})
+
+_WORD_RE = re.compile(r"[a-zа-яіїєґ'0-9_]+")
+_CYRILLIC_RE = re.compile(r"[а-яіїєґ]")
+_LATIN_WORD_RE = re.compile(r"^[a-z']+$")
+# Три й більше однакових літер поспіль - друкарська помилка ("скількиии")
+_REPEATS_RE = re.compile(r"([^\W\d_])\1{2,}")
+# Подвоєні літери ("навчання", "знанням") - у ключах згортаються до однієї
+_DOUBLES_RE = re.compile(r"([^\W\d_])\1+")
+_SPACES_RE = re.compile(r"\s+")
+
+# Службові слова й ввічливі звертання, що не змінюють суті питання
+STOP_WORDS = frozenset({
+    "в", "у", "на", "з", "із", "зі", "до", "для", "про", "та", "і", "й", "а", "по", "від",
+    "при", "ж", "же", "б", "би", "ну", "будь", "ласка", "підкажіть", "підкажи", "скажіть",
+    "скажи", "привіт", "вітаю", "дякую", "доброго", "добрий", "день", "дня",
+})
+
+# Закінчення для легкого стемінгу (найдовші - першими)
+# ("-ами" не відкидається: "програми" інакше стало б "прогр", а не "програм")
+_ENDINGS = (
+    "ові", "еві", "ого", "ому", "ими", "іми", "ією", "ить", "ать", "ють", "ати", "ити",
+    "ій", "ою", "ею", "єю", "ям", "ам", "ах", "ях", "ів", "їв", "ий", "ої", "ія", "ії", "ію",
+    "ом", "ем", "єм", "ує",
+    "а", "я", "у", "ю", "і", "и", "е", "о", "ь", "є",
+)
+_MIN_STEM = 3
+
+# Синоніми: канонічний токен -> варіанти (список ведеться вручну).
+# З таксономією намірів (utils/intent_taxonomy.py) не генерується: там один намір об'єднує
+# різні поняття ("телефон" і "сайт" у контактах), а тут варіанти мають означати те саме,
+# інакше різні питання отримають один ключ кешу. Нове слово в таксономії, що є синонімом,
+# варто додати і сюди. Варіанти з кількох слів замінюються фразою, решта - після стемінгу
+SYNONYMS: Dict[str, List[str]] = {
+    "вартість": [
+        "вартість", "ціна", "ціни", "тариф", "тарифи", "оплата", "коштує", "коштують", "платити",
+        "скільки коштує", "скільки платити", "ціна навчання", "вартість навчання",
+        "коштує навчання", "скільки коштує навчання", "контрактна вартість",
+    ],
+    "документ": [
+        "документ", "документи", "список документів", "перелік документів", "пакет документів",
+        "потрібні документи",
+    ],
+    "подача_документів": ["подати документи", "подача документів", "подання документів"],
+    "подача_заяв": ["подача заяв", "подання заяв", "подати заяву", "подання заяви"],
+    "правила_вступу": ["правила вступу", "правила прийому", "порядок вступу"],
+    "вступна_кампанія": ["вступна кампанія", "вступної кампанії", "приймальна кампанія"],
+    "нмт": ["нмт", "nmt", "національний мультипредметний тест", "мультипредметний тест"],
+    "спеціальність": [
+        "спеціальність", "спеціальності", "напрям", "напрями", "освітня програма", "освітні програми",
+    ],
+    "бакалавр": ["бакалавр", "бакалаврат"],
+    "магістр": ["магістр", "магістратура"],
+    "контакт": ["контакт", "контакти", "контактні дані"],
+    "адреса": ["адреса", "знаходиться", "розташований", "розташовано", "розташування"],
+    "сайт": ["сайт", "вебсайт", "веб сайт", "web", "website"],
+    "пошта": ["пошта", "email", "e-mail", "електронна пошта", "емейл", "імейл"],
+    "ksu24": ["ksu24", "ксу24"],
+}
+
+
+class TextNormalizer:
+    """
+    Нормалізація тексту запиту (усі кроки - на попередньо скомпільованих таблицях, з мемоізацією)
+
+    match_fold - згортання для пошуку ключових слів підрядком (маршрутизація, IntentMatcher):
+    без транслітерації, позиції символів збігаються з вихідним текстом;
+    fold - повне посимвольне згортання з транслітерацією (лише для ключів кешу);
+    tokens / cache_key - канонічні токени (стемінг, синоніми, стоп-слова) для кешів.
+    """
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def match_fold(text: str) -> str:
+        """
+        Нижній регістр, апострофи та латинські двійники в словах з кирилицею
+
+        Латинські слова лишаються як є ("tuition" не стає "туітіон" і не містить "іт"),
+        а довжина рядка не змінюється, тож позиції збігів - це позиції у вихідному тексті.
+        """
+        if not text:
+            return ""
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Рідкісні літери, що в нижньому регістрі стають двома символами ("İ")
+            lowered = "".join(char.lower()[:1] for char in text)
+        return _WORD_RE.sub(_fold_lookalikes, lowered.translate(_APOSTROPHES))
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def fold(text: str) -> str:
+        """Нижній регістр, апострофи, російські літери, латинські двійники, транслітерація"""
+        if not text:
+            return ""
+        folded = text.lower().translate(_APOSTROPHES).translate(_RUSSIAN_LETTERS)
+        folded = _REPEATS_RE.sub(r"\1", folded)
+        folded = _WORD_RE.sub(_fold_word, folded)
+        return _SPACES_RE.sub(" ", folded).strip()
+
+    @staticmethod
+    @lru_cache(maxsize=16384)
+    def stem(word: str) -> str:
+        """Легкий стемінг: відкидання найдовшого закінчення, подвоєні літери - одна"""
+        word = _DOUBLES_RE.sub(r"\1", word.replace("'", ""))
+        if not _CYRILLIC_RE.search(word):
+            return word
+        for ending in _ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+                return word[:-len(ending)]
+        return word
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def tokens(text: str, extra_stop_words: FrozenSet[str] = frozenset()) -> Tuple[str, ...]:
+        """
+        Канонічні токени запиту в порядку появи, без повторів
+
+        extra_stop_words - додаткові стоп-слова (у звичайній формі, до стемінгу)
+        """
+        return tuple(dict.fromkeys(TextNormalizer.terms(text, extra_stop_words)))
+
+    @staticmethod
+    def terms(text: str, extra_stop_words: FrozenSet[str] = frozenset()) -> List[str]:
+        """
+        Канонічні токени з повторами (частоти слів для пошукового індексу)
+        
+        Без мемоізації: для довгих документів, що індексуються один раз.
+        """
+        folded = _PHRASE_RE.sub(_replace_phrase, TextNormalizer.fold(text))
+        result = []
+        for word in _WORD_RE.findall(folded):
+            word = word.strip("'")
+            if not word or word in STOP_WORDS or word in extra_stop_words:
+                continue
+            token = word if "_" in word else TextNormalizer.stem(word)
+            result.append(_WORD_SYNONYMS.get(token, token))
+        return result
+
+    @staticmethod
+    def cache_key(text: str) -> str:
+        """Нормалізований запит для ключа кешу (порядок слів не важливий)"""
+        tokens = TextNormalizer.tokens(text)
+        if not tokens:
+            # Лише стоп-слова ("привіт") - ключ з самого тексту, щоб не злити різні питання
+            return TextNormalizer.fold(text)
+        return " ".join(sorted(tokens))
+
+    @staticmethod
+    def get_stats() -> Dict:
+        """Ефективність мемоізації"""
+        return {
+            name: getattr(TextNormalizer, name).cache_info()._asdict()
+            for name in ("fold", "stem", "tokens")
+        }
+
+
+def _fold_lookalikes(match: "re.Match") -> str:
+    word = match.group(0)
+    if _CYRILLIC_RE.search(word):
+        return word.translate(_LOOKALIKES)
+    return word
+
+
+def _fold_word(match: "re.Match") -> str:
+    word = match.group(0)
+    if _CYRILLIC_RE.search(word):
+        return word.translate(_LOOKALIKES)
+    if _LATIN_WORD_RE.match(word) and len(word) > 3 and word not in _LATIN_KEEP:
+        return _TRANSLIT_RE.sub(lambda m: _TRANSLIT_MAP[m.group(0)], word)
+    return word
+
+
+def _build_synonyms() -> Tuple["re.Pattern", Dict[str, str], Dict[str, str]]:
+    phrases: Dict[str, str] = {}
+    words: Dict[str, str] = {}
+    for canonical, variants in SYNONYMS.items():
+        for variant in variants:
+            folded = TextNormalizer.fold(variant)
+            if " " in folded or "-" in folded:
+                phrases[folded] = canonical
+            else:
+                words[TextNormalizer.stem(folded)] = canonical
+    # Найдовші фрази - першими ("скільки коштує навчання" раніше за "скільки коштує")
+    pattern = re.compile(
+        r"(?<![\w'])(?:" + "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True)) + r")(?![\w'])"
+    )
+    return pattern, phrases, words
+
+
+_PHRASE_RE, _PHRASES, _WORD_SYNONYMS = _build_synonyms()
+
+
+def _replace_phrase(match: "re.Match") -> str:
+    return f" {_PHRASES[match.group(0)]} "